@@ -0,0 +1,341 @@
+"""API load-test harness.
+
+Boots the FastAPI application from 'main.py' in-process (served by uvicorn in
+a background thread) against a temporary SQLite database and an in-memory
+stand-in for Redis. A mixed workload is then sent at a configurable
+concurrency, and latency percentiles and throughput are reported per
+endpoint.
+
+Usage (from the 'bandim-api' directory):
+
+    python -m benchmarks.api_loadtest --concurrency 8 --duration 30
+"""
+import argparse
+import asyncio
+import fnmatch
+import json
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Union
+
+import httpx
+import numpy
+import uvicorn
+from sqlmodel import Session, SQLModel
+
+import database
+import main
+from database import RedisCache, create_db_engine
+from routers import public
+
+# Central location (Bissau)
+CENTER_LATITUDE = 11.852848336808085
+CENTER_LONGITUDE = -15.598465762669719
+
+# Relative frequency of each operation in the mixed workload
+DEFAULT_WEIGHTS = {
+    "bulk_insert": 2,
+    "read_dataset": 10,
+    "export_dataset": 3,
+    "assign": 1,
+}
+
+
+class InMemoryRedisCache(RedisCache):
+    # Drop-in replacement for RedisCache that keeps all keys in a dictionary
+
+    def __init__(self, url: str = "memory://") -> None:
+        super().__init__(url=url)
+        self.store: dict[str, Any] = {}
+
+    async def init_cache(self) -> None:
+        pass
+
+    async def keys(self, pattern: str) -> Union[None, Any]:
+        return [key for key in self.store if fnmatch.fnmatch(key, pattern)]
+
+    async def set(self, key: str, value: Any, expire: int = 0) -> Union[None, bool]:
+        self.store[key] = value
+        return True
+
+    async def get(self, key: str) -> Union[None, Any]:
+        return self.store.get(key)
+
+    async def close(self) -> None:
+        self.store.clear()
+
+
+class InProcessServer:
+    """Serve the application with uvicorn from a background thread."""
+
+    def __init__(self, app, host: str = "127.0.0.1"):
+        with socket.socket() as s:
+            s.bind((host, 0))
+            self.port = s.getsockname()[1]
+        self.url = f"http://{host}:{self.port}"
+        config = uvicorn.Config(app, host=host, port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "InProcessServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def random_locations(rng: numpy.random.Generator, n: int) -> dict:
+    offsets = rng.uniform(-0.015, 0.015, size=(n, 2))
+    depot = numpy.zeros(n, dtype=bool)
+    depot[0] = True
+    return {
+        "latitude": (CENTER_LATITUDE + offsets[:, 0]).tolist(),
+        "longitude": (CENTER_LONGITUDE + offsets[:, 1]).tolist(),
+        "depot": depot.tolist(),
+    }
+
+
+class Workload:
+    """A seeded mix of requests against a set of pre-created datasets."""
+
+    def __init__(
+        self,
+        weights: dict[str, int],
+        seed: int,
+        batch_size: int,
+        dataset_size: int,
+        assign_size: int,
+        num_datasets: int,
+        workers: int,
+    ):
+        self.weights = {name: weight for name, weight in weights.items() if weight > 0}
+        self.rng = numpy.random.default_rng(seed)
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.dataset_size = dataset_size
+        self.assign_size = assign_size
+        self.num_datasets = num_datasets
+        self.workers = workers
+        self.dataset_uids: list[str] = []
+        self.workplan_uids: list[str] = []
+
+    async def setup(self, client: httpx.AsyncClient) -> None:
+        for i in range(self.num_datasets):
+            response = await client.post(
+                "/api/public/datasets/with_locations",
+                params={"return_uids": False},
+                json={
+                    "name": f"Load Test Dataset {i}",
+                    "locations": random_locations(self.rng, self.dataset_size),
+                },
+            )
+            response.raise_for_status()
+            self.dataset_uids.append(response.json()["uid"])
+        # Assignments run on smaller datasets, as they are solver bound
+        response = await client.post(
+            "/api/public/datasets/with_locations",
+            params={"return_uids": False},
+            json={
+                "name": "Load Test Assignment Dataset",
+                "locations": random_locations(self.rng, self.assign_size),
+            },
+        )
+        response.raise_for_status()
+        assign_dataset_uid = response.json()["uid"]
+        start_time = time.time()
+        for _ in range(self.num_datasets):
+            response = await client.post(
+                "/api/public/workplans/",
+                json={
+                    "dataset_uid": assign_dataset_uid,
+                    "start_time": time.strftime(
+                        "%Y-%m-%dT%H:%M:%S", time.gmtime(start_time)
+                    ),
+                    "end_time": time.strftime(
+                        "%Y-%m-%dT%H:%M:%S", time.gmtime(start_time + 6 * 3600)
+                    ),
+                    "workers": self.workers,
+                },
+            )
+            response.raise_for_status()
+            self.workplan_uids.append(response.json()["uid"])
+
+    def next_operation(self) -> str:
+        names = list(self.weights)
+        return self.random.choices(names, weights=[self.weights[n] for n in names])[0]
+
+    async def execute(self, client: httpx.AsyncClient, operation: str) -> httpx.Response:
+        if operation == "bulk_insert":
+            return await client.post(
+                "/api/public/locations/bulk_insert/columnar",
+                params={"return_uids": False},
+                json=random_locations(self.rng, self.batch_size),
+            )
+        elif operation == "read_dataset":
+            dataset_uid = self.random.choice(self.dataset_uids)
+            return await client.get(f"/api/public/datasets/{dataset_uid}")
+        elif operation == "export_dataset":
+            dataset_uid = self.random.choice(self.dataset_uids)
+            return await client.get(
+                f"/api/public/datasets/{dataset_uid}/export",
+                params={"format": "ndjson"},
+            )
+        elif operation == "assign":
+            workplan_uid = self.random.choice(self.workplan_uids)
+            return await client.post(
+                "/api/public/workplans/assign", json={"uid": workplan_uid}
+            )
+        else:
+            raise ValueError(f"Unknown operation: {operation}")
+
+
+async def run_load(
+    url: str,
+    workload: Workload,
+    concurrency: int,
+    duration: float,
+    max_requests: Union[None, int],
+) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    issued = 0
+    timeout = httpx.Timeout(300.0)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+        await workload.setup(client)
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal issued
+            while time.perf_counter() < deadline:
+                if max_requests is not None and issued >= max_requests:
+                    return
+                issued += 1
+                operation = workload.next_operation()
+                start = time.perf_counter()
+                try:
+                    response = await workload.execute(client, operation)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                latencies[operation].append(time.perf_counter() - start)
+                if failed:
+                    errors[operation] += 1
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+    return latencies, errors, elapsed
+
+
+def summarize(
+    latencies: dict[str, list[float]], errors: dict[str, int], elapsed: float
+) -> dict[str, dict]:
+    summary = {}
+    all_latencies = [value for values in latencies.values() for value in values]
+    for name, values in sorted(latencies.items()) + [("total", all_latencies)]:
+        values = numpy.asarray(values) * 1000.0
+        p50, p95, p99 = (
+            numpy.percentile(values, [50, 95, 99]) if len(values) else (numpy.nan,) * 3
+        )
+        summary[name] = {
+            "requests": len(values),
+            "errors": sum(errors.values()) if name == "total" else errors[name],
+            "requests_per_second": len(values) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+        }
+    return summary
+
+
+def print_summary(summary: dict[str, dict]) -> None:
+    header = f"{'endpoint':<16}{'requests':>10}{'errors':>8}{'req/s':>10}"
+    header += f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    for name, row in summary.items():
+        print(
+            f"{name:<16}{row['requests']:>10}{row['errors']:>8}"
+            + f"{row['requests_per_second']:>10.1f}{row['p50_ms']:>10.1f}"
+            + f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+        )
+
+
+def main_loadtest():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--max-requests", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=2023)
+    parser.add_argument(
+        "--weights",
+        type=json.loads,
+        default=DEFAULT_WEIGHTS,
+        help=f"JSON object of operation weights, e.g. '{json.dumps(DEFAULT_WEIGHTS)}'",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dataset-size", type=int, default=1_000)
+    parser.add_argument("--assign-size", type=int, default=50)
+    parser.add_argument("--num-datasets", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Write the summary as JSON")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bandim-loadtest-")
+    engine = create_db_engine(f"sqlite:///{directory}/loadtest.db")
+    SQLModel.metadata.create_all(engine)
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    fake_redis = InMemoryRedisCache()
+    database.redis_cache = fake_redis
+    main.redis_cache = fake_redis
+    main.app.dependency_overrides[public.get_session] = get_session_override
+    workload = Workload(
+        weights=args.weights,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        dataset_size=args.dataset_size,
+        assign_size=args.assign_size,
+        num_datasets=args.num_datasets,
+        workers=args.workers,
+    )
+    try:
+        with InProcessServer(main.app) as server:
+            latencies, errors, elapsed = asyncio.run(
+                run_load(
+                    server.url,
+                    workload,
+                    concurrency=args.concurrency,
+                    duration=args.duration,
+                    max_requests=args.max_requests,
+                )
+            )
+    finally:
+        main.app.dependency_overrides.clear()
+        engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    summary = summarize(latencies, errors, elapsed)
+    print_summary(summary)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"config": vars(args), "elapsed": elapsed, "endpoints": summary},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main_loadtest()
@@ -0,0 +1,274 @@
+"""Solver benchmark suite.
+
+Runs every solver/initializer combination on seeded synthetic instances around
+the center of Bissau and records wall time, peak memory, fitness evaluations
+per second and the best cost over time. Results are written as JSON (including
+the cost traces) and CSV (one row per run), so they can be compared between
+releases.
+
+Usage (from the 'bandim-api' directory):
+
+    python -m benchmarks.solver_benchmark --sizes 50 100 --workers 1 3
+"""
+import argparse
+import csv
+import datetime as dt
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from vrp_solver.alns import ALNSSolver
+from vrp_solver.vrp_solver import (
+    VRP,
+    ConvergenceTrace,
+    DecompositionSolver,
+    FitnessFunctionMinimizeDistance,
+    IslandSolver,
+    KMeansRadomizedPopulationInitializer,
+    MultiStartSolver,
+    RandomPopulationInitializer,
+    RandomizedSavingsPopulationInitializer,
+    RandomizedSweepPopulationInitializer,
+    TwoOptSolver,
+)
+
+# Central location (Bissau)
+CENTER_LATITUDE = 11.852848336808085
+CENTER_LONGITUDE = -15.598465762669719
+# Approximate number of meters per degree of latitude
+METERS_PER_DEGREE = 111_320.0
+
+DEFAULT_SIZES = [50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000]
+DEFAULT_WORKERS = [1, 3, 5, 10, 20]
+
+# Solver configurations: (name, solver class, extra solver arguments, VRP
+# arguments, largest instance the configuration is run on)
+SOLVERS = [
+    ("two_opt", TwoOptSolver, {}, {"distance_storage": "dense"}, 500),
+    (
+        "multi_start",
+        MultiStartSolver,
+        {"solver_class": TwoOptSolver, "num_starts": 4, "n_jobs": 4},
+        {"distance_storage": "dense"},
+        500,
+    ),
+    (
+        "island_ga",
+        IslandSolver,
+        {"num_islands": 4, "num_generations": 200, "n_jobs": 4},
+        {"distance_storage": "dense"},
+        1_000,
+    ),
+    (
+        "alns",
+        ALNSSolver,
+        {"num_iterations": 1_000},
+        {"distance_storage": "dense"},
+        2_000,
+    ),
+    (
+        "decomposition",
+        DecompositionSolver,
+        {"subproblem_size": 100},
+        {"distance_storage": "sparse"},
+        10_000,
+    ),
+]
+INITIALIZERS = [
+    ("random", RandomPopulationInitializer),
+    ("kmeans", KMeansRadomizedPopulationInitializer),
+    ("savings", RandomizedSavingsPopulationInitializer),
+    ("sweep", RandomizedSweepPopulationInitializer),
+]
+
+CSV_FIELDS = [
+    "solver",
+    "initializer",
+    "num_locations",
+    "num_salesmen",
+    "seed",
+    "population_size",
+    "status",
+    "wall_time",
+    "peak_rss_mb",
+    "evaluations",
+    "evaluations_per_second",
+    "best_cost",
+]
+
+
+def generate_instance(
+    num_locations: int, seed: int, radius: float = 1_500.0
+) -> list[list[float]]:
+    """Generate a seeded instance of households scattered around Bissau.
+
+    Args:
+        num_locations (int): The number of locations, including the depot.
+        seed (int): Seed for the random number generator.
+        radius (float, optional): The radius (in meters) of the disc the
+            households are drawn from. Defaults to 1500.
+
+    Returns:
+        (list[list[float]]): Latitude/longitude pairs with the depot (the
+            center) at index 0.
+    """
+    rng = numpy.random.default_rng(seed)
+    n = num_locations - 1
+    # Uniform sampling over the area of the disc
+    distances = radius * numpy.sqrt(rng.uniform(0.0, 1.0, size=n))
+    angles = rng.uniform(0.0, 2 * numpy.pi, size=n)
+    latitudes = CENTER_LATITUDE + distances * numpy.sin(angles) / METERS_PER_DEGREE
+    longitudes = CENTER_LONGITUDE + distances * numpy.cos(angles) / (
+        METERS_PER_DEGREE * numpy.cos(numpy.radians(CENTER_LATITUDE))
+    )
+    return [[CENTER_LATITUDE, CENTER_LONGITUDE]] + numpy.column_stack(
+        [latitudes, longitudes]
+    ).tolist()
+
+
+def cost_trace(trace: ConvergenceTrace) -> list[tuple[float, float]]:
+    # The best cost over time (seconds since the solver started), one entry
+    # per improvement. The progress of parallel solvers is reported by the
+    # parent process, so the trace covers the work of all worker processes
+    points = []
+    for report in trace.reports:
+        if report.best_fitness > 0.0:
+            cost = 1.0 / report.best_fitness
+            if len(points) == 0 or cost < points[-1][1]:
+                points.append((report.elapsed, cost))
+    return points
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS. Worker
+    # processes of parallel solvers are accounted for as children
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def run_case(case: dict) -> dict:
+    """Run a single benchmark case. Executed in a fresh process, so that the
+    peak memory use is attributable to the case."""
+    solver_name, solver_class, solver_kwargs, vrp_kwargs, _ = next(
+        solver for solver in SOLVERS if solver[0] == case["solver"]
+    )
+    initializer_class = dict(INITIALIZERS)[case["initializer"]]
+    result = dict(case)
+    start_time = time.perf_counter()
+    vrp_instance = VRP(
+        locations=generate_instance(case["num_locations"], case["seed"]),
+        num_salesmen=case["num_salesmen"],
+        **vrp_kwargs,
+    )
+    trace = ConvergenceTrace()
+    solver = None
+    try:
+        solver = solver_class(
+            vrp_instance=vrp_instance,
+            population_size=case["population_size"],
+            population_initializer_class=initializer_class,
+            fitness_function_class=FitnessFunctionMinimizeDistance,
+            callbacks=[trace],
+            seed=case["seed"],
+            **solver_kwargs,
+        )
+        best_solution = solver.run().get_topk(k=1)[0]
+        result["status"] = "ok"
+        result["best_cost"] = (
+            1.0 / best_solution.fitness if best_solution.fitness else 0.0
+        )
+    except Exception as e:
+        result["status"] = f"error: {e!r}"
+        result["best_cost"] = None
+    wall_time = time.perf_counter() - start_time
+    # Multi-start and island solvers add up the evaluations of their workers
+    evaluations = solver.evaluations if solver is not None else 0
+    result.update(
+        wall_time=wall_time,
+        peak_rss_mb=peak_rss_mb(),
+        evaluations=evaluations,
+        evaluations_per_second=evaluations / wall_time if wall_time > 0 else None,
+        trace=cost_trace(trace),
+    )
+    return result
+
+
+def build_cases(
+    sizes: list[int], workers: list[int], seed: int, population_size: int
+) -> list[dict]:
+    cases = []
+    for num_locations in sizes:
+        for num_salesmen in workers:
+            if num_salesmen >= num_locations:
+                continue
+            for solver_name, _, _, _, max_locations in SOLVERS:
+                if num_locations > max_locations:
+                    continue
+                for initializer_name, _ in INITIALIZERS:
+                    cases.append(
+                        {
+                            "solver": solver_name,
+                            "initializer": initializer_name,
+                            "num_locations": num_locations,
+                            "num_salesmen": num_salesmen,
+                            # Same instance for every solver and initializer
+                            "seed": seed + num_locations,
+                            "population_size": population_size,
+                        }
+                    )
+    return cases
+
+
+def write_results(results: list[dict], output_dir: str) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    metadata = {
+        "created_at": dt.datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+    with open(os.path.join(output_dir, "solver_benchmark.json"), "w") as f:
+        json.dump({"metadata": metadata, "results": results}, f, indent=2)
+    with open(os.path.join(output_dir, "solver_benchmark.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--seed", type=int, default=2023)
+    parser.add_argument("--population-size", type=int, default=10)
+    parser.add_argument("--output-dir", default="benchmark_results")
+    args = parser.parse_args()
+
+    cases = build_cases(args.sizes, args.workers, args.seed, args.population_size)
+    results = []
+    for i, case in enumerate(cases):
+        # A new process per case gives an accurate peak memory measurement
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_case, case).result()
+        results.append(result)
+        print(
+            f"[{i + 1}/{len(cases)}] {case['solver']}/{case['initializer']} "
+            + f"N={case['num_locations']} workers={case['num_salesmen']}: "
+            + f"{result['status']} {result['wall_time']:.2f}s "
+            + f"{result['peak_rss_mb']:.0f}MB cost={result['best_cost']}"
+        )
+    write_results(results, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""API startup benchmark.
+
+Imports the application module ('main' by default) in fresh interpreter
+processes and reports the cold start time, the peak memory of the process and
+which heavy scientific/plotting modules were loaded by the import. Every
+uvicorn worker pays this cost on start-up, so the heavy modules should only be
+loaded once a worker actually solves a routing problem.
+
+Usage (from the 'bandim-api' directory):
+
+    python -m benchmarks.startup_benchmark --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy
+
+# Modules that the API should not load at start-up
+HEAVY_MODULES = ["pandas", "scipy", "sklearn", "matplotlib"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_time": elapsed,
+    "modules": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_startup(module: str = "main") -> dict:
+    """Import a module in a fresh interpreter.
+
+    Args:
+        module (str, optional): The module to import. Defaults to "main".
+
+    Returns:
+        (dict): The wall time of the whole process, the time spent importing
+            the module, the peak resident memory (in MB) of the process and
+            the heavy modules that were loaded.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    stdout = process.stdout.read()
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall_time = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing '{module}' failed ({process.returncode})")
+    # The probe may print other output before its result
+    result = json.loads(stdout.decode().strip().splitlines()[-1])
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    divisor = 1024**2 if sys.platform == "darwin" else 1024
+    result.update(wall_time=wall_time, peak_rss_mb=rusage.ru_maxrss / divisor)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = [measure_startup(args.module) for _ in range(args.repeat)]
+    summary = {
+        key: float(numpy.median([result[key] for result in results]))
+        for key in ["wall_time", "import_time", "peak_rss_mb"]
+    }
+    summary["heavy_modules"] = sorted(
+        {name for result in results for name in result["modules"]}
+    )
+    print(
+        f"import {args.module}: median wall time {summary['wall_time']:.3f}s, "
+        + f"import time {summary['import_time']:.3f}s, "
+        + f"peak RSS {summary['peak_rss_mb']:.1f}MB, "
+        + f"heavy modules loaded: {', '.join(summary['heavy_modules']) or 'none'}"
+    )
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"config": vars(args), "summary": summary, "runs": results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+import csv
+import io
+import json
+import os
+import uuid
+from typing import Iterator, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from models import DataSetLocationLink, Location
+
+# The columns (in order) that are written when exporting locations
+EXPORT_COLUMNS = ("uid", "latitude", "longitude", "demand", "depot")
+
+
+# Accepted spellings (compared in lower case) of depot flags in columns that
+# are not boolean, e.g. text read from a CSV file
+DEPOT_TRUE_VALUES = ["true", "t", "yes", "y", "1", "1.0"]
+DEPOT_FALSE_VALUES = ["false", "f", "no", "n", "0", "0.0"]
+
+
+class LocationColumnsError(ValueError):
+    pass
+
+
+def validate_location_columns(
+    latitude: Sequence[float],
+    longitude: Sequence[float],
+    demand: Optional[Sequence[int]] = None,
+    depot: Optional[Sequence[bool]] = None,
+) -> dict[str, np.ndarray]:
+    """Validate columnar location data with vectorized range checks.
+
+    Args:
+        latitude (Sequence[float]): Latitudes in degrees, within [-90, 90].
+        longitude (Sequence[float]): Longitudes in degrees, within [-180, 180].
+        demand (Sequence[int], optional): Non-negative whole demands. Defaults
+            to 0.
+        depot (Sequence[bool], optional): Depot flags, either booleans or
+            true/false, yes/no or 1/0 values. Defaults to False.
+
+    Raises:
+        LocationColumnsError: If the columns differ in length or contain values
+            that are out of range (or demands that are not whole numbers and
+            depot flags that are not true/false).
+
+    Returns:
+        (dict[str, np.ndarray]): The validated columns as numpy arrays.
+    """
+    try:
+        columns = {
+            "latitude": np.asarray(latitude, dtype=np.float64),
+            "longitude": np.asarray(longitude, dtype=np.float64),
+        }
+        n = len(columns["latitude"])
+        columns["demand"] = (
+            np.zeros(n, dtype=np.int64) if demand is None else np.asarray(demand)
+        )
+        if columns["demand"].dtype.kind in "iub":
+            columns["demand"] = columns["demand"].astype(np.int64)
+        else:
+            # Parsed (e.g. from CSV) as floats or strings. Checked to be whole
+            # numbers below before they are cast
+            columns["demand"] = columns["demand"].astype(np.float64)
+        columns["depot"] = (
+            np.zeros(n, dtype=np.bool_) if depot is None else np.asarray(depot)
+        )
+    except (TypeError, ValueError) as e:
+        raise LocationColumnsError(f"Columns could not be converted: {e}")
+    for name, values in columns.items():
+        if values.ndim != 1 or len(values) != n:
+            raise LocationColumnsError(
+                f"Column '{name}' must be a flat array with {n} values"
+            )
+    if columns["demand"].dtype.kind == "f":
+        demand_values = columns["demand"]
+        nonintegral = (
+            ~np.isfinite(demand_values)
+            | (demand_values != np.round(demand_values))
+            | (np.abs(demand_values) >= 2.0**63)
+        )
+        if nonintegral.any():
+            rows = np.flatnonzero(nonintegral)
+            raise LocationColumnsError(
+                f"Column 'demand' must contain whole numbers, {len(rows)} "
+                + f"value(s) are not, e.g. at rows {rows[:10].tolist()}"
+            )
+        columns["demand"] = demand_values.astype(np.int64)
+    if columns["depot"].dtype.kind != "b":
+        # Casting to bool would turn NaN (e.g. an empty CSV cell) and any
+        # non-empty string (e.g. 'no') into True, so the flags are matched
+        # against an explicit vocabulary instead
+        flags = np.char.lower(np.char.strip(columns["depot"].astype(str)))
+        true_flags = np.isin(flags, DEPOT_TRUE_VALUES)
+        unknown = ~true_flags & ~np.isin(flags, DEPOT_FALSE_VALUES)
+        if unknown.any():
+            rows = np.flatnonzero(unknown)
+            raise LocationColumnsError(
+                "Column 'depot' must contain true/false (or 1/0) values, "
+                + f"{len(rows)} value(s) are not, e.g. at rows {rows[:10].tolist()}"
+            )
+        columns["depot"] = true_flags
+    invalid = {
+        "latitude": ~np.isfinite(columns["latitude"])
+        | (np.abs(columns["latitude"]) > 90.0),
+        "longitude": ~np.isfinite(columns["longitude"])
+        | (np.abs(columns["longitude"]) > 180.0),
+        "demand": columns["demand"] < 0,
+    }
+    for name, mask in invalid.items():
+        if mask.any():
+            rows = np.flatnonzero(mask)
+            raise LocationColumnsError(
+                f"Column '{name}' has {len(rows)} invalid value(s), "
+                + f"e.g. at rows {rows[:10].tolist()}"
+            )
+    return columns
+
+
+def read_location_table(content: bytes, filename: str) -> dict[str, np.ndarray]:
+    """Parse an uploaded CSV or Parquet file into validated location columns.
+
+    Args:
+        content (bytes): The raw file content.
+        filename (str): The name of the uploaded file. Files ending in
+            '.parquet' or '.pq' are read as Parquet, anything else as CSV.
+
+    Raises:
+        LocationColumnsError: If the file can not be parsed or is invalid.
+
+    Returns:
+        (dict[str, np.ndarray]): The validated columns as numpy arrays.
+    """
+    import pandas as pd
+
+    try:
+        if filename.lower().endswith((".parquet", ".pq")):
+            df = pd.read_parquet(io.BytesIO(content))
+        else:
+            df = pd.read_csv(io.BytesIO(content))
+    except ImportError:
+        raise LocationColumnsError(
+            "Parquet uploads are unavailable. Package 'pyarrow' is not installed"
+        )
+    except ValueError as e:
+        raise LocationColumnsError(f"The file could not be parsed: {e}")
+    missing = {"latitude", "longitude"} - set(df.columns)
+    if missing:
+        raise LocationColumnsError(f"Missing required column(s): {sorted(missing)}")
+    return validate_location_columns(
+        latitude=df["latitude"].to_numpy(),
+        longitude=df["longitude"].to_numpy(),
+        demand=df["demand"].to_numpy() if "demand" in df else None,
+        depot=df["depot"].to_numpy() if "depot" in df else None,
+    )
+
+
+def generate_uuids(n: int) -> list[uuid.UUID]:
+    # Draw the random bits for all identifiers at once and set the version (4)
+    # and variant (RFC 4122) bits in a vectorized manner
+    data = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    data[:, 6] = (data[:, 6] & 0x0F) | 0x40
+    data[:, 8] = (data[:, 8] & 0x3F) | 0x80
+    return [uuid.UUID(bytes=row) for row in map(bytes, data)]
+
+
+def insert_locations(
+    session: Session,
+    columns: dict[str, np.ndarray],
+    batch_size: int,
+    commit: bool = True,
+) -> list[uuid.UUID]:
+    """Insert validated location columns with batched multi-row inserts.
+
+    Args:
+        session (Session): An active database session.
+        columns (dict[str, np.ndarray]): Columns as returned by
+            validate_location_columns().
+        batch_size (int): The number of rows inserted per statement.
+        commit (bool, optional): Commit after every batch. If False, the caller
+            is responsible for committing, so that all rows are inserted in a
+            single transaction. Defaults to True.
+
+    Returns:
+        (list[uuid.UUID]): The identifiers of the inserted locations in input
+            order.
+    """
+    uids = generate_uuids(len(columns["latitude"]))
+    latitudes = columns["latitude"].tolist()
+    longitudes = columns["longitude"].tolist()
+    demands = columns["demand"].tolist()
+    depots = columns["depot"].tolist()
+    statement = insert(Location.__table__)
+    for start in range(0, len(uids), batch_size):
+        stop = start + batch_size
+        session.connection().execute(
+            statement,
+            [
+                {
+                    "uid": uid,
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "demand": demand,
+                    "depot": depot,
+                }
+                for uid, latitude, longitude, demand, depot in zip(
+                    uids[start:stop],
+                    latitudes[start:stop],
+                    longitudes[start:stop],
+                    demands[start:stop],
+                    depots[start:stop],
+                )
+            ],
+        )
+        if commit:
+            session.commit()
+    return uids
+
+
+def select_dataset_locations(dataset_uid: uuid.UUID):
+    # Column-only projection of the locations in a dataset. Rows are returned as
+    # plain tuples of (uid, latitude, longitude, demand, depot) in a single query
+    return (
+        select(
+            Location.uid,
+            Location.latitude,
+            Location.longitude,
+            Location.demand,
+            Location.depot,
+        )
+        .join(DataSetLocationLink, DataSetLocationLink.location_uid == Location.uid)
+        .where(DataSetLocationLink.dataset_uid == dataset_uid)
+        .order_by(Location.uid)
+    )
+
+
+def iter_dataset_locations(
+    session: Session, dataset_uid: uuid.UUID, chunk_size: int
+) -> Iterator[list[tuple]]:
+    """Stream the locations of a dataset in chunks of plain row tuples.
+
+    Only the required columns are selected, so no ORM objects are created, and
+    rows are fetched from the database cursor 'chunk_size' rows at a time.
+
+    Args:
+        session (Session): An active database session.
+        dataset_uid (uuid.UUID): The dataset to export locations from.
+        chunk_size (int): The maximum number of rows per yielded chunk.
+
+    Yields:
+        (list[tuple]): Rows of (uid, latitude, longitude, demand, depot).
+    """
+    statement = select_dataset_locations(dataset_uid).execution_options(
+        yield_per=chunk_size
+    )
+    for partition in session.exec(statement).partitions():
+        yield partition
+
+
+def encode_csv(chunks: Iterator[list[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows(
+            (str(uid), latitude, longitude, demand, int(depot))
+            for uid, latitude, longitude, demand, depot in chunk
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Make sure the header is written even if the dataset is empty
+    if buffer.tell() > 0:
+        yield buffer.getvalue()
+
+
+def encode_ndjson(chunks: Iterator[list[tuple]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(
+                {
+                    "uid": str(uid),
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "demand": demand,
+                    "depot": bool(depot),
+                }
+            )
+            + "\n"
+            for uid, latitude, longitude, demand, depot in chunk
+        )
+
+
+def encode_arrow(chunks: Iterator[list[tuple]]) -> Iterator[bytes]:
+    # Optional dependency: Only needed when data is exported in Arrow IPC format
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [
+            ("uid", pa.string()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("demand", pa.int64()),
+            ("depot", pa.bool_()),
+        ]
+    )
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            uids, latitudes, longitudes, demands, depots = (
+                zip(*chunk) if chunk else ((),) * len(EXPORT_COLUMNS)
+            )
+            batch = pa.record_batch(
+                [
+                    pa.array([str(uid) for uid in uids], type=pa.string()),
+                    pa.array(latitudes, type=pa.float64()),
+                    pa.array(longitudes, type=pa.float64()),
+                    pa.array(demands, type=pa.int64()),
+                    pa.array(depots, type=pa.bool_()),
+                ],
+                schema=schema,
+            )
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    # Flush the end-of-stream marker (and the schema if no batches were written)
+    yield sink.getvalue()
+
+
+def insert_dataset_links(
+    session: Session,
+    dataset_uid: uuid.UUID,
+    location_uids: Sequence[uuid.UUID],
+    batch_size: int,
+) -> None:
+    """Link locations to a dataset with batched multi-row inserts.
+
+    The link rows are written directly, bypassing the ORM relationship
+    collection, which would otherwise be loaded and appended to one location
+    at a time. The caller is responsible for committing.
+
+    Args:
+        session (Session): An active database session.
+        dataset_uid (uuid.UUID): The dataset to link the locations to.
+        location_uids (Sequence[uuid.UUID]): The locations to link.
+        batch_size (int): The number of rows inserted per statement.
+    """
+    statement = insert(DataSetLocationLink.__table__)
+    for start in range(0, len(location_uids), batch_size):
+        session.connection().execute(
+            statement,
+            [
+                {"dataset_uid": dataset_uid, "location_uid": location_uid}
+                for location_uid in location_uids[start : start + batch_size]
+            ],
+        )
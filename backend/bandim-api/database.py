@@ -1,8 +1,11 @@
 import logging
-from typing import Union, Any
+from typing import Union, Any, Optional
 
 from redis import asyncio as aioredis
 
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import StaticPool
 from sqlmodel import SQLModel, create_engine
 
 # from sqlalchemy import create_engine
@@ -12,10 +15,21 @@ from settings import (
     REDIS_HOST,
     REDIS_PORT,
     REDIS_DB,
-    # POSTGRES_USER,
-    # POSTGRES_PASSWORD,
-    # POSTGRES_PORT,
-    # POSTGRES_DB,
+    POSTGRES_USER,
+    POSTGRES_PASSWORD,
+    POSTGRES_HOST,
+    POSTGRES_PORT,
+    POSTGRES_DB,
+    DATABASE_BACKEND,
+    DATABASE_URL,
+    DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW,
+    SQLITE_PATH,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT,
 )
 
 
@@ -79,8 +93,88 @@ class RedisCache:
             return None
 
 
-SQLALCHEMY_DATABASE_URL = f"sqlite:///bandim.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+SQLITE_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SQLITE_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def get_database_url() -> Union[str, URL]:
+    if DATABASE_URL:
+        return DATABASE_URL
+    if DATABASE_BACKEND == "sqlite":
+        return f"sqlite:///{SQLITE_PATH}"
+    elif DATABASE_BACKEND == "postgres":
+        # Built from its parts, so credentials with characters that are special
+        # in URLs ('@', '/', ':', '%') need no escaping
+        return URL.create(
+            "postgresql",
+            username=POSTGRES_USER,
+            password=POSTGRES_PASSWORD,
+            host=POSTGRES_HOST,
+            port=int(POSTGRES_PORT),
+            database=POSTGRES_DB,
+        )
+    else:
+        raise ValueError(f"Unknown database backend: {DATABASE_BACKEND}")
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # Pragmas are per connection, so they are applied whenever the pool opens
+    # a new connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE:d}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE:d}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT:d}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def create_db_engine(url: Union[str, URL, None] = None) -> Engine:
+    """Create a database engine tuned for the given database backend.
+
+    Args:
+        url (str | URL, optional): A database URL. Defaults to the URL derived
+            from the settings, see get_database_url().
+
+    Returns:
+        (Engine): The database engine.
+    """
+    if url is None:
+        url = get_database_url()
+    if make_url(url).get_backend_name() == "sqlite":
+        if SQLITE_JOURNAL_MODE.upper() not in SQLITE_JOURNAL_MODES:
+            raise ValueError(f"Unknown SQLite journal mode: {SQLITE_JOURNAL_MODE}")
+        if SQLITE_SYNCHRONOUS.upper() not in SQLITE_SYNCHRONOUS_MODES:
+            raise ValueError(f"Unknown SQLite synchronous mode: {SQLITE_SYNCHRONOUS}")
+        if make_url(url).database in (None, "", ":memory:"):
+            # An in-memory database only exists within a single connection
+            pool_options = {"poolclass": StaticPool}
+        else:
+            pool_options = {
+                "pool_size": DATABASE_POOL_SIZE,
+                "max_overflow": DATABASE_MAX_OVERFLOW,
+            }
+        engine = create_engine(
+            url,
+            # Connections are shared between the event loop and the threadpool
+            connect_args={"check_same_thread": False},
+            **pool_options,
+        )
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    else:
+        engine = create_engine(
+            url,
+            pool_size=DATABASE_POOL_SIZE,
+            max_overflow=DATABASE_MAX_OVERFLOW,
+            # Transparently replace connections dropped by the database server
+            pool_pre_ping=True,
+        )
+    return engine
+
+
+SQLALCHEMY_DATABASE_URL = get_database_url()
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 
 # def create_db_and_tables():
 #     SQLModel.metadata.create_all(engine)
@@ -3,10 +3,10 @@ import logging
 import json
 import os
 from fastapi import FastAPI, Depends, HTTPException
-from routers import public
+from routers import admin, public
 from fastapi.params import Header
 from starlette.responses import Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from database import redis_cache
 from sqlalchemy.orm import Session
@@ -14,12 +14,14 @@ from sqlalchemy.orm import Session
 # from database import SessionLocal, engine
 from database import engine
 # import crud, models, schemas
-from middleware import ContentSizeLimitMiddleware
+from middleware import ContentSizeLimitMiddleware, TimingMiddleware
+from metrics import instrument_queries, render_metrics
 from common import check_api_key, load_cors
 from settings import (
     API_KEY,
     VERSION,
     REDIS_TTL,
+    METRICS_LOG_REQUESTS,
     # SNIPPET_DIR,
 )
 from sqlmodel import SQLModel
@@ -51,6 +53,10 @@ tags_metadata = [
         "name": "default",
         "description": "Retrieve backend metadata",
     },
+    {
+        "name": "admin",
+        "description": "Diagnostics for administrators. Requires the API key.",
+    },
 ]
 
 # app = FastAPI(docs_url = None, redoc_url = None)
@@ -75,6 +81,18 @@ app = FastAPI(
 # app = FastAPI()
 
 app.include_router(public.router, prefix="/api/public")
+app.include_router(admin.router, prefix="/api/admin")
+
+# Record request, database query and solver phase timings
+app.add_middleware(TimingMiddleware, log_requests=METRICS_LOG_REQUESTS)
+instrument_queries()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["default"])
+async def metrics():
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 # CORS_CONFIG = load_cors()
 # if CORS_CONFIG:
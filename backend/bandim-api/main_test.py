@@ -1,13 +1,28 @@
 from fastapi.testclient import TestClient
 import uuid
+from typing import Optional
 import json
-from database import engine
+import marshal
+import numpy as np
+import database
+from database import engine, create_db_engine
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 from main import app
 import pytest
 from datetime import datetime, timedelta
 from routers import public
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from migrations import migrate
+from models import Location
+from spatial import (
+    encode_polyline,
+    has_spatial_index,
+    haversine,
+    select_locations_in_bounding_box,
+)
+from benchmarks.startup_benchmark import measure_startup
 
 
 @pytest.fixture(name="session")
@@ -31,6 +46,134 @@ def client_fixture(session: Session):
     app.dependency_overrides.clear()
 
 
+def test_create_db_engine_sqlite_pragmas(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+    engine.dispose()
+    assert journal_mode == "wal"
+    # NORMAL
+    assert synchronous == 1
+
+
+def test_get_database_url_postgres(monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", None)
+    monkeypatch.setattr(database, "DATABASE_BACKEND", "postgres")
+    monkeypatch.setattr(database, "POSTGRES_PASSWORD", "p@ss/w:rd%2F")
+    url = database.get_database_url()
+    # Special characters in the password neither move the host nor change the
+    # password, also after rendering the URL
+    for url in [url, make_url(url.render_as_string(hide_password=False))]:
+        assert url.password == "p@ss/w:rd%2F"
+        assert url.host == database.POSTGRES_HOST
+        assert url.port == int(database.POSTGRES_PORT)
+        assert url.database == database.POSTGRES_DB
+
+
+def test_migrate_indexes(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    # Mimic a database created with an older version of the schema
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_timestamp_route_uid_datetime")
+        connection.exec_driver_sql(
+            "CREATE INDEX ix_location_latitude ON location (latitude)"
+        )
+    migrate(engine)
+    migrate(engine)
+    location_indexes = {idx["name"] for idx in inspect(engine).get_indexes("location")}
+    timestamp_indexes = {
+        idx["name"] for idx in inspect(engine).get_indexes("timestamp")
+    }
+    assert "ix_location_latitude" not in location_indexes
+    assert "ix_timestamp_route_uid_datetime" in timestamp_indexes
+
+    # Timestamps of a route are read in order straight from the index
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT location_uid, datetime FROM timestamp "
+            + "WHERE route_uid = ? ORDER BY datetime",
+            (uuid.uuid4().hex,),
+        ).all()
+    engine.dispose()
+    assert "COVERING INDEX ix_timestamp_route_uid_datetime" in plan[0][-1]
+
+
+def test_migrate_columns(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    # Mimic a table created with an older version of the schema
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE algorithmrun (uid CHAR(32) NOT NULL, PRIMARY KEY (uid))"
+        )
+    migrate(engine)
+    migrate(engine)
+    columns = {column["name"] for column in inspect(engine).get_columns("algorithmrun")}
+    engine.dispose()
+    assert {"solver", "runtime", "evaluations", "best_fitness", "trace"} <= columns
+
+
+def test_migrate_spatial_index(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    # Mimic a database with the spatial index of an older version of the
+    # schema, keyed by the rowid of the location table
+    with engine.begin() as connection:
+        for name in ["insert", "update", "delete"]:
+            connection.exec_driver_sql(f"DROP TRIGGER location_rtree_{name}")
+        connection.exec_driver_sql(
+            "CREATE TRIGGER location_rtree_insert AFTER INSERT ON location "
+            + "BEGIN INSERT INTO location_rtree VALUES (new.rowid, new.latitude, "
+            + "new.latitude, new.longitude, new.longitude); END"
+        )
+        for latitude in [11.85, 11.86, 11.87]:
+            connection.exec_driver_sql(
+                "INSERT INTO location (uid, latitude, longitude, demand, depot) "
+                + "VALUES (?, ?, -15.6, 0, 0)",
+                (uuid.uuid4().hex, latitude),
+            )
+    migrate(engine)
+    migrate(engine)
+    with Session(engine) as session:
+        location = Location(latitude=11.88, longitude=-15.6)
+        session.add(location)
+        session.commit()
+        # Dump/restore and VACUUM may renumber the rowids
+        session.exec(text("UPDATE location SET rowid = rowid + 100"))
+        session.commit()
+        locations = session.exec(
+            select_locations_in_bounding_box(session, 11.855, -15.61, 11.885, -15.59)
+        ).all()
+        assert sorted(loc.latitude for loc in locations) == [11.86, 11.87, 11.88]
+        session.delete(location)
+        session.commit()
+        rtree_size = session.exec(text("SELECT count(*) FROM location_rtree")).one()
+    engine.dispose()
+    assert rtree_size == (3,)
+
+
+def test_has_spatial_index_after_migration(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE location (uid CHAR(32) NOT NULL, latitude FLOAT NOT NULL, "
+            + "longitude FLOAT NOT NULL, PRIMARY KEY (uid))"
+        )
+    assert not has_spatial_index(engine)
+    # The index is picked up once a migration creates it
+    migrate(engine)
+    assert has_spatial_index(engine)
+    engine.dispose()
+
+
+def test_startup_does_not_load_heavy_modules():
+    # pandas, scipy, scikit-learn and matplotlib are only loaded once a worker
+    # assigns routes, which keeps the start-up time and memory of workers low
+    result = measure_startup("main")
+    assert result["modules"] == []
+
+
 def create_bulk_locations_succeed(client: TestClient):
     req = [
         {
@@ -75,6 +218,136 @@ def test_create_bulk_locations_fail(client: TestClient):
     assert response.status_code == 422
 
 
+def test_create_locations_columnar(client: TestClient):
+    req = {
+        "latitude": [11.85345134655994, 11.84812109448719, 11.859027970025654],
+        "longitude": [-15.598089853772322, -15.600460066985532, -15.588562570690168],
+        "depot": [True, False, False],
+    }
+    response = client.post("/api/public/locations/bulk_insert/columnar", json=req)
+    assert response.status_code == 200
+    res = response.json()
+    assert res["count"] == 3
+    assert len(set(res["uids"])) == 3
+    res = get_location_succeed(client=client, location_uid=res["uids"][0])
+    assert res["depot"] is True
+
+    response = client.post(
+        "/api/public/locations/bulk_insert/columnar",
+        params={"return_uids": False},
+        json=req,
+    )
+    assert response.status_code == 200
+    assert response.json() == {"count": 3, "uids": None}
+
+    # Create error: Latitude out of range
+    req["latitude"][1] = 91.0
+    response = client.post("/api/public/locations/bulk_insert/columnar", json=req)
+    assert response.status_code == 422
+
+    # Create error: Columns of different length
+    req = {"latitude": [11.85], "longitude": [-15.59, -15.60]}
+    response = client.post("/api/public/locations/bulk_insert/columnar", json=req)
+    assert response.status_code == 422
+
+
+def test_create_locations_upload(client: TestClient):
+    content = (
+        "latitude,longitude,demand\n"
+        "11.85345134655994,-15.598089853772322,2\n"
+        "11.84812109448719,-15.600460066985532,0\n"
+    )
+    response = client.post(
+        "/api/public/locations/bulk_insert/upload",
+        files={"file": ("households.csv", content, "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.json()["count"] == 2
+
+    # Create error: Missing longitude column
+    response = client.post(
+        "/api/public/locations/bulk_insert/upload",
+        files={"file": ("households.csv", "latitude\n11.85\n", "text/csv")},
+    )
+    assert response.status_code == 422
+
+    # Create error: Fractional and missing demands
+    for demand in ["1.5", ""]:
+        response = client.post(
+            "/api/public/locations/bulk_insert/upload",
+            files={
+                "file": (
+                    "households.csv",
+                    f"latitude,longitude,demand\n11.85,-15.59,{demand}\n",
+                    "text/csv",
+                )
+            },
+        )
+        assert response.status_code == 422
+        assert "whole numbers" in response.json()["detail"]
+
+    # Depot flags are read from text, an empty cell is an error (instead of
+    # a depot)
+    content = "latitude,longitude,depot\n11.85,-15.59,yes\n11.86,-15.59,no\n"
+    response = client.post(
+        "/api/public/locations/bulk_insert/upload",
+        files={"file": ("households.csv", content, "text/csv")},
+    )
+    assert response.status_code == 200
+    uids = response.json()["uids"]
+    assert get_location_succeed(client=client, location_uid=uids[0])["depot"] is True
+    assert get_location_succeed(client=client, location_uid=uids[1])["depot"] is False
+    response = client.post(
+        "/api/public/locations/bulk_insert/upload",
+        files={
+            "file": (
+                "households.csv",
+                "latitude,longitude,depot\n11.85,-15.59,True\n11.86,-15.59,\n",
+                "text/csv",
+            )
+        },
+    )
+    assert response.status_code == 422
+    assert "true/false" in response.json()["detail"]
+
+
+def test_read_locations_spatial(client: TestClient):
+    # Two households close to the center and one about 1.1 km further north
+    req = {
+        "latitude": [11.852848336808085, 11.853748336808085, 11.862848336808085],
+        "longitude": [-15.598465762669719, -15.598465762669719, -15.598465762669719],
+    }
+    response = client.post("/api/public/locations/bulk_insert/columnar", json=req)
+    assert response.status_code == 200
+    uids = response.json()["uids"]
+
+    response = client.get(
+        "/api/public/locations/nearby",
+        params={
+            "latitude": 11.852848336808085,
+            "longitude": -15.598465762669719,
+            "radius": 500,
+        },
+    )
+    assert response.status_code == 200
+    res = response.json()
+    assert [loc["uid"] for loc in res] == uids[:2]
+    assert res[0]["distance"] < 1.0
+    assert 99.0 < res[1]["distance"] < 101.0
+
+    response = client.get(
+        "/api/public/locations/within",
+        params={
+            "min_latitude": 11.853,
+            "min_longitude": -15.6,
+            "max_latitude": 11.87,
+            "max_longitude": -15.59,
+        },
+    )
+    assert response.status_code == 200
+    assert sorted(loc["uid"] for loc in response.json()) == sorted(uids[1:])
+
+
 def create_location_succeed(client: TestClient):
     req = {
         "latitude": 11.85345134655994,
@@ -145,6 +418,31 @@ def get_dataset_succeed(client: TestClient, dataset_uid, locations):
     return res
 
 
+def test_create_dataset_with_locations(client: TestClient):
+    req = {
+        "name": "Census Round",
+        "locations": {
+            "latitude": [11.85345134655994, 11.84812109448719],
+            "longitude": [-15.598089853772322, -15.600460066985532],
+        },
+    }
+    response = client.post("/api/public/datasets/with_locations", json=req)
+    assert response.status_code == 200
+    res = response.json()
+    assert "uid" in res
+    assert res["name"] == "Census Round"
+    assert res["count"] == 2
+    locations = [{"uid": uid} for uid in res["location_uids"]]
+    get_dataset_succeed(client=client, dataset_uid=res["uid"], locations=locations)
+
+    # Create error: Longitude out of range. Nothing should be created
+    req["locations"]["longitude"][0] = -181.0
+    response = client.post("/api/public/datasets/with_locations", json=req)
+    assert response.status_code == 422
+    response = client.get("/api/public/datasets/")
+    assert len(response.json()) == 1
+
+
 def create_workplan_succeed(client: TestClient, dataset_uid: str):
     start_time = datetime.utcnow()
     end_time = start_time + timedelta(hours=1)
@@ -204,6 +502,85 @@ def test_all_succeed(client: TestClient):
     )
 
 
+def test_locations_cursor_pagination(client: TestClient):
+    locations = [
+        {"latitude": 11.85 + i * 0.001, "longitude": -15.59 - i * 0.001}
+        for i in range(5)
+    ]
+    response = client.post("/api/public/locations/bulk_insert", json=locations)
+    assert response.status_code == 200
+    expected_uids = sorted(loc["uid"] for loc in response.json())
+
+    # Walk through all pages using the cursor handed back by the server
+    seen_uids = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/public/locations/", params=params)
+        assert response.status_code == 200
+        seen_uids.extend(loc["uid"] for loc in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+    assert seen_uids == expected_uids
+
+
+def test_export_dataset(client: TestClient):
+    locations_res = create_bulk_locations_succeed(client=client)
+    locations = [{"uid": str(loc["uid"])} for loc in locations_res]
+    dataset_res = create_dataset_succeed(
+        client, dataset_name="Export Dataset", locations=locations
+    )
+    location_uids = sorted(loc["uid"] for loc in locations)
+
+    response = client.get(f"/api/public/datasets/{dataset_res['uid']}/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "uid,latitude,longitude,demand,depot"
+    assert [line.split(",")[0] for line in lines[1:]] == location_uids
+
+    response = client.get(
+        f"/api/public/datasets/{dataset_res['uid']}/export",
+        params={"format": "ndjson"},
+    )
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["uid"] for row in rows] == location_uids
+
+    response = client.get(f"/api/public/datasets/{uuid.uuid4()}/export")
+    assert response.status_code == 404
+
+
+def test_read_dataset_bounded_queries(client: TestClient, session: Session):
+    locations = [
+        {"latitude": 11.85 + i * 0.001, "longitude": -15.59 - i * 0.001}
+        for i in range(25)
+    ]
+    response = client.post("/api/public/locations/bulk_insert", json=locations)
+    assert response.status_code == 200
+    locations = [{"uid": loc["uid"]} for loc in response.json()]
+    dataset_res = create_dataset_succeed(
+        client, dataset_name="Eager Dataset", locations=locations
+    )
+    session.expunge_all()
+
+    statements = []
+
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", count_statements)
+    try:
+        get_dataset_succeed(
+            client=client, dataset_uid=dataset_res["uid"], locations=locations
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statements)
+    # One query for the dataset and one for all of its locations
+    assert len(statements) == 2
+
+
 def read_points_from_json(file_path):
     """
     Read geospatial locations from a JSON file.
@@ -270,3 +647,337 @@ def test_route_assignment(client: TestClient):
     assignment = response.json()
     print(assignment)
     assert False
+
+
+def create_workplan_with_locations(
+    client: TestClient,
+    num_locations: int = 25,
+    workers: int = 2,
+    seed: int = 2023,
+    demand: Optional[list[int]] = None,
+    num_depots: int = 1,
+) -> str:
+    # A dataset of households around the depots (the first locations) and a
+    # workplan for it
+    rng = np.random.default_rng(seed)
+    offsets = rng.uniform(-0.01, 0.01, size=(num_locations, 2))
+    depot = np.zeros(num_locations, dtype=bool)
+    depot[:num_depots] = True
+    req = {
+        "name": "Assignment Dataset",
+        "locations": {
+            "latitude": (11.852848336808085 + offsets[:, 0]).tolist(),
+            "longitude": (-15.598465762669719 + offsets[:, 1]).tolist(),
+            "depot": depot.tolist(),
+            "demand": demand,
+        },
+    }
+    response = client.post("/api/public/datasets/with_locations", json=req)
+    assert response.status_code == 200
+    start_time = datetime.utcnow()
+    req = {
+        "dataset_uid": response.json()["uid"],
+        "start_time": str(start_time),
+        "end_time": str(start_time + timedelta(hours=6)),
+        "workers": workers,
+    }
+    response = client.post("/api/public/workplans/", json=req)
+    assert response.status_code == 200
+    return response.json()["uid"]
+
+
+def test_metrics(client: TestClient):
+    workplan_uid = create_workplan_with_locations(client)
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE bandim_http_request_duration_seconds histogram" in body
+    # Requests are labelled by their route template, not the raw path
+    assert (
+        'bandim_http_request_duration_seconds_count{method="POST",'
+        + 'route="/api/public/workplans/assign",status="200"}'
+    ) in body
+    assert 'bandim_db_query_duration_seconds_count{operation="SELECT"}' in body
+    for phase in [
+        "data_load",
+        "distance_matrix",
+        "clustering",
+        "local_search",
+        "persistence",
+        "serialization",
+    ]:
+        assert f'bandim_phase_duration_seconds_count{{phase="{phase}"}}' in body
+
+
+def test_metrics_failed_queries(tmp_path):
+    # Queries are timed for every engine, failing ones leave no state behind
+    # on the (pooled) connection
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(Exception):
+                connection.exec_driver_sql("SELECT * FROM missing_table")
+        assert connection.exec_driver_sql("SELECT 1").scalar() == 1
+        info = dict(connection.connection.info)
+    engine.dispose()
+    assert "query_start_time" not in info
+
+
+def test_route_assignment_algorithmrun(client: TestClient):
+    workplan_uid = create_workplan_with_locations(client)
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+
+    response = client.get(f"/api/public/workplans/{workplan_uid}")
+    assert response.status_code == 200
+    algorithmrun_uids = {route["algorithmrun_uid"] for route in response.json()["routes"]}
+    # All routes of an assignment are created by the same run
+    assert len(algorithmrun_uids) == 1
+
+    response = client.get(f"/api/public/algorithmruns/{algorithmrun_uids.pop()}")
+    assert response.status_code == 200
+    res = response.json()
+    assert res["solver"] == "TwoOptSolver"
+    assert int(res["seed"]) >= 0
+    assert res["runtime"] > 0.0
+    assert res["evaluations"] > 0
+    trace = res["trace"]
+    assert set(trace) == {"iteration", "best_fitness", "evaluations", "elapsed"}
+    assert trace["iteration"][0] == 0
+    assert trace["iteration"][-1] == res["iterations"]
+    assert trace["best_fitness"][-1] == pytest.approx(res["best_fitness"])
+    # The best fitness never gets worse
+    assert np.all(np.diff(trace["best_fitness"]) >= 0.0)
+
+    response = client.get(f"/api/public/algorithmruns/{uuid.uuid4()}")
+    assert response.status_code == 404
+
+
+def test_route_assignment_schedule(client: TestClient):
+    demand = [0] + [3] * 24
+    workplan_uid = create_workplan_with_locations(client, demand=demand)
+    response = client.get(f"/api/public/workplans/{workplan_uid}")
+    start_time = datetime.fromisoformat(response.json()["start_time"])
+    end_time = datetime.fromisoformat(response.json()["end_time"])
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+    assignments = response.json()["assignments"]
+    assert sum(len(route) for route in assignments) == 24
+    for route in assignments:
+        timestamps = [datetime.fromisoformat(visit["timestamp"]) for visit in route]
+        # Walking to the first household takes time, and the shift is kept
+        assert start_time < timestamps[0]
+        assert timestamps[-1] < end_time
+        # Consecutive visits are at least the service time (10 s per unit of
+        # demand) plus some walking apart
+        gaps = np.diff([timestamp.timestamp() for timestamp in timestamps])
+        assert np.all(gaps > 30.0)
+
+
+def test_route_assignment_multiple_depots(client: TestClient):
+    workplan_uid = create_workplan_with_locations(client, workers=3, num_depots=3)
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+    assignments = response.json()["assignments"]
+    # Depots are where routes start and end, not households to visit
+    visited = [visit["location"] for route in assignments for visit in route]
+    assert len(visited) == 22
+    assert not any(location["depot"] for location in visited)
+
+
+def test_dataset_matrix(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(public, "MATRIX_STORAGE_DIR", str(tmp_path))
+    workplan_uid = create_workplan_with_locations(client)
+    response = client.get(f"/api/public/workplans/{workplan_uid}")
+    dataset_uid = response.json()["dataset_uid"]
+    url = f"/api/public/datasets/{dataset_uid}/matrix"
+
+    # Walking between any two households takes 10 minutes
+    matrix = np.full((25, 25), 600.0)
+    np.fill_diagonal(matrix, 0.0)
+    path = tmp_path / "matrix.npy"
+    np.save(path, matrix[:24, :24])
+    with open(path, "rb") as file:
+        response = client.put(url, files={"file": ("matrix.npy", file)})
+    assert response.status_code == 422
+    response = client.put(url, files={"file": ("matrix.csv", b"1,2")})
+    assert response.status_code == 422
+    # Unknown (NaN) or negative distances are rejected
+    for value in [np.nan, -600.0]:
+        invalid = matrix.copy()
+        invalid[3, 7] = value
+        np.save(path, invalid)
+        with open(path, "rb") as file:
+            response = client.put(url, files={"file": ("matrix.npy", file)})
+        assert response.status_code == 422
+        assert "non-finite or negative" in response.json()["detail"]
+    # Asymmetric matrices (e.g. uphill and downhill) are averaged over both
+    # directions, which the solvers assume
+    asymmetric = matrix.copy()
+    asymmetric[np.triu_indices(25, k=1)] *= 2.0
+    np.save(path, asymmetric)
+    with open(path, "rb") as file:
+        response = client.put(
+            url, files={"file": ("matrix.npy", file)}, params={"metric": "duration"}
+        )
+    assert response.status_code == 200
+    stored = np.load(tmp_path / f"{dataset_uid}.npy")
+    np.testing.assert_allclose(stored, (asymmetric + asymmetric.T) / 2)
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+    np.save(path, matrix)
+    with open(path, "rb") as file:
+        response = client.put(
+            url, files={"file": ("matrix.npy", file)}, params={"metric": "duration"}
+        )
+    assert response.status_code == 200
+    assert response.json()["matrix_metric"] == "duration"
+
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+    for route in response.json()["assignments"]:
+        timestamps = [datetime.fromisoformat(visit["timestamp"]) for visit in route]
+        gaps = np.diff([timestamp.timestamp() for timestamp in timestamps])
+        assert np.all(gaps >= 600.0)
+
+    # Sparse matrices replace the attached matrix
+    import scipy.sparse
+
+    scipy.sparse.save_npz(tmp_path / "matrix.npz", scipy.sparse.csr_matrix(matrix))
+    with open(tmp_path / "matrix.npz", "rb") as file:
+        response = client.put(url, files={"file": ("matrix.npz", file)})
+    assert response.status_code == 200
+    assert response.json()["matrix_metric"] == "distance"
+    # The previous matrix is replaced
+    stored = [p.name for p in tmp_path.iterdir() if p.name.startswith(dataset_uid)]
+    assert stored == [f"{dataset_uid}.npz"]
+    response = client.delete(f"/api/public/datasets/{dataset_uid}")
+    assert response.status_code == 200
+    assert not (tmp_path / f"{dataset_uid}.npz").exists()
+
+
+def decode_polyline(polyline: str) -> list[tuple[float, float]]:
+    values, value, shift = [], 0, 0
+    for character in polyline:
+        chunk = ord(character) - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    points = np.cumsum(np.reshape(values, (-1, 2)), axis=0) / 1e5
+    return [tuple(point) for point in points.tolist()]
+
+
+def test_encode_polyline():
+    # The example of the format specification
+    latitudes, longitudes = [38.5, 40.7, 43.252], [-120.2, -120.95, -126.453]
+    polyline = encode_polyline(latitudes, longitudes)
+    assert polyline == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline(polyline) == list(zip(latitudes, longitudes))
+
+
+def test_route_summaries(client: TestClient):
+    workplan_uid = create_workplan_with_locations(client, demand=[0] + [3] * 24)
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+    assignments = response.json()["assignments"]
+
+    response = client.get(f"/api/public/workplans/{workplan_uid}/summaries")
+    assert response.status_code == 200
+    summaries = response.json()
+    assert len(summaries) == len(assignments)
+    start_time = datetime.fromisoformat(
+        client.get(f"/api/public/workplans/{workplan_uid}").json()["start_time"]
+    )
+    depot = next(
+        location
+        for location in client.get("/api/public/locations/").json()
+        if location["depot"]
+    )
+    locations = {}
+    for route in assignments:
+        for visit in route:
+            locations[visit["location"]["uid"]] = visit["location"]
+    for summary in summaries:
+        route = next(
+            route
+            for route in assignments
+            if summary["stops"][0] == route[0]["location"]["uid"]
+        )
+        # The stops are in the order of the visits
+        assert summary["stops"] == [visit["location"]["uid"] for visit in route]
+        last_visit = datetime.fromisoformat(route[-1]["timestamp"])
+        assert summary["duration"] > (last_visit - start_time).total_seconds()
+        # The polyline starts and ends at the depot and passes every stop
+        points = decode_polyline(summary["polyline"])
+        expected = [depot] + [locations[uid] for uid in summary["stops"]] + [depot]
+        assert len(points) == len(expected)
+        for point, location in zip(points, expected):
+            assert point == pytest.approx(
+                (location["latitude"], location["longitude"]), abs=1e-5
+            )
+        # At least the straight lines between the points of the route
+        latitudes, longitudes = np.transpose(points)
+        straight = haversine(
+            latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:]
+        )
+        assert summary["distance"] >= 0.99 * np.sum(straight)
+
+        response = client.get(f"/api/public/routes/{summary['route_uid']}/summary")
+        assert response.status_code == 200
+        assert response.json() == summary
+
+    response = client.get(f"/api/public/routes/{uuid.uuid4()}/summary")
+    assert response.status_code == 404
+    response = client.get(f"/api/public/workplans/{uuid.uuid4()}/summaries")
+    assert response.status_code == 404
+
+
+def test_route_assignment_profile(client: TestClient):
+    # Assignments are only profiled on request
+    workplan_uid = create_workplan_with_locations(client)
+    response = client.post("/api/public/workplans/assign", json={"uid": workplan_uid})
+    assert response.status_code == 200
+    response = client.get(f"/api/public/workplans/{workplan_uid}")
+    algorithmrun_uid = response.json()["routes"][0]["algorithmrun_uid"]
+    response = client.get(f"/api/public/algorithmruns/{algorithmrun_uid}")
+    assert response.json()["profiled"] is False
+    response = client.get(
+        f"/api/admin/algorithmruns/{algorithmrun_uid}/profile",
+        headers={"X-API-Key": "XYZ"},
+    )
+    assert response.status_code == 404
+
+    workplan_uid = create_workplan_with_locations(client)
+    response = client.post(
+        "/api/public/workplans/assign",
+        json={"uid": workplan_uid},
+        headers={"X-Profile": "true"},
+    )
+    assert response.status_code == 200
+    response = client.get(f"/api/public/workplans/{workplan_uid}")
+    algorithmrun_uid = response.json()["routes"][0]["algorithmrun_uid"]
+    response = client.get(f"/api/public/algorithmruns/{algorithmrun_uid}")
+    assert response.json()["profiled"] is True
+
+    url = f"/api/admin/algorithmruns/{algorithmrun_uid}/profile"
+    # The admin endpoint requires the API key
+    response = client.get(url)
+    assert response.status_code == 401
+    response = client.get(url, headers={"X-API-Key": "XYZ"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    stats = marshal.loads(response.content)
+    assert any(name == "two_opt" for _, _, name in stats)
+
+    response = client.get(
+        url, params={"format": "text", "limit": 10}, headers={"X-API-Key": "XYZ"}
+    )
+    assert response.status_code == 200
+    assert "function calls" in response.text
+    assert "assign_workplan" in response.text
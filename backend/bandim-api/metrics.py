@@ -0,0 +1,168 @@
+import contextlib
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from vrp_solver import vrp_solver
+
+# Latency buckets (in seconds) shared by all histograms
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """A labelled histogram rendered in the Prometheus text exposition format."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # Label values -> [bucket counts..., sum, count]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, values in series:
+            labels = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)
+            )
+            prefix = labels + "," if labels else ""
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-1]}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_DURATION = Histogram(
+    "bandim_http_request_duration_seconds",
+    "Time spent handling HTTP requests.",
+    ("method", "route", "status"),
+)
+DB_QUERY_DURATION = Histogram(
+    "bandim_db_query_duration_seconds",
+    "Time spent executing database statements.",
+    ("operation",),
+)
+PHASE_DURATION = Histogram(
+    "bandim_phase_duration_seconds",
+    "Time spent in the phases of a route assignment.",
+    ("phase",),
+)
+REGISTRY = [REQUEST_DURATION, DB_QUERY_DURATION, PHASE_DURATION]
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class RequestTimings:
+    # Timings collected while a single request is handled (for structured logs)
+
+    def __init__(self):
+        self.phases: dict[str, float] = defaultdict(float)
+        self.db_queries: int = 0
+        self.db_time: float = 0.0
+
+
+request_timings: contextvars.ContextVar[Optional[RequestTimings]] = (
+    contextvars.ContextVar("request_timings", default=None)
+)
+
+
+def observe_phase(phase: str, seconds: float) -> None:
+    PHASE_DURATION.observe(seconds, phase=phase)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.phases[phase] += seconds
+
+
+@contextlib.contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(phase, time.perf_counter() - start)
+
+
+# Solver phases (distance matrix, clustering, local search) are reported here
+vrp_solver.phase_listeners.append(observe_phase)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time is kept on the execution context of the statement, which
+    # is discarded with it: 'after_cursor_execute' does not fire for statements
+    # that raise, so state kept on the (pooled) connection would pile up
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start_time
+    operation = statement.lstrip().split(" ", 1)[0].upper()
+    DB_QUERY_DURATION.observe(elapsed, operation=operation)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_time += elapsed
+
+
+def instrument_queries(target=Engine) -> None:
+    """Time every statement executed by the given engine (or all engines)."""
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
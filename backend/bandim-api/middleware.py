@@ -1,5 +1,9 @@
 from typing import Optional, Type
+import json
 import logging
+import time
+
+from metrics import REQUEST_DURATION, RequestTimings, request_timings
 
 
 def setup_logging(logger, level=None):
@@ -55,7 +59,7 @@ class ContentSizeLimitMiddleware:
             if message["type"] != "http.request" or self.max_content_size is None:
                 return message
             body_len = len(message.get("body", b""))
-            print("Body size: ", body_len)
+            self.logger.debug(f"Body size: {body_len}")
             received += body_len
             if received > self.max_content_size:
                 raise self.exception_cls(
@@ -72,3 +76,70 @@ class ContentSizeLimitMiddleware:
 
         wrapper = self.receive_wrapper(receive)
         await self.app(scope, wrapper, send)
+
+
+class TimingMiddleware:
+    """ Request timing middleware for ASGI applications
+
+    Records the duration of every HTTP request per method, route and status
+    code, and optionally logs a structured (JSON) line per request with the
+    time spent in database queries and route assignment phases.
+
+    Args:
+      app (ASGI application): ASGI application
+      log_requests (optional): whether to log a structured line per request
+    """
+
+    def __init__(self, app, log_requests: bool = False):
+        self.app = app
+        self.log_requests = log_requests
+        self.logger = get_logger(__name__)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_timings.reset(token)
+            # Use the route template (not the raw path) to bound the number of
+            # distinct label values
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            REQUEST_DURATION.observe(
+                elapsed,
+                method=scope["method"],
+                route=route_path,
+                status=str(status_code),
+            )
+            if self.log_requests:
+                self.logger.info(
+                    json.dumps(
+                        {
+                            "method": scope["method"],
+                            "route": route_path,
+                            "status": status_code,
+                            "duration": round(elapsed, 6),
+                            "db_queries": timings.db_queries,
+                            "db_time": round(timings.db_time, 6),
+                            "phases": {
+                                phase: round(seconds, 6)
+                                for phase, seconds in timings.phases.items()
+                            },
+                        }
+                    )
+                )
@@ -0,0 +1,105 @@
+import logging
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+
+from database import engine
+from models import LOCATION_RTREE_REBUILD, sqlite_has_rtree
+
+# Indexes created by earlier versions of the schema that no query uses. They
+# only slow down inserts, so they are dropped from existing databases
+OBSOLETE_INDEXES = {
+    "location": [
+        "ix_location_uid",
+        "ix_location_latitude",
+        "ix_location_longitude",
+        "ix_location_demand",
+        "ix_location_depot",
+    ],
+    "dataset": ["ix_dataset_uid"],
+    "timestamp": ["ix_timestamp_uid"],
+    "route": ["ix_route_uid"],
+    "workplan": ["ix_workplan_uid"],
+    "algorithmrun": ["ix_algorithmrun_uid"],
+    "individual": ["ix_individual_uid"],
+}
+
+
+def needs_rtree_rebuild(connection: Connection) -> bool:
+    # The spatial index is missing, keyed by the rowid (earlier versions of
+    # the schema) or misses locations inserted before it existed
+    trigger = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master "
+        + "WHERE type = 'trigger' AND name = 'location_rtree_insert'"
+    ).scalar()
+    if trigger is None or "spatial_id" not in trigger:
+        return True
+    return (
+        connection.exec_driver_sql(
+            "SELECT 1 FROM location WHERE spatial_id IS NULL LIMIT 1"
+        ).scalar()
+        is not None
+    )
+
+
+def migrate(engine: Engine) -> None:
+    """Bring the schema of an existing database up to date.
+
+    Missing tables are created, columns that were added to existing tables
+    are added (as nullable columns), obsolete indexes are dropped and indexes
+    that are declared on the models but missing from the database are created.
+    The migration is idempotent, so it is safe to run on every deployment.
+
+    Args:
+        engine (Engine): The database engine.
+    """
+    # Create any tables that do not exist yet (along with their indexes)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing_columns = {
+                column["name"] for column in inspect(connection).get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    logging.info(f"Adding column {table.name}.{column.name}")
+                    column_type = column.type.compile(dialect=connection.dialect)
+                    connection.exec_driver_sql(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    )
+        existing_indexes = {
+            table_name: {
+                index["name"]
+                for index in inspect(connection).get_indexes(table_name)
+            }
+            for table_name in inspect(connection).get_table_names()
+        }
+        for table_name, index_names in OBSOLETE_INDEXES.items():
+            for index_name in index_names:
+                if index_name in existing_indexes.get(table_name, set()):
+                    logging.info(f"Dropping index {index_name}")
+                    connection.exec_driver_sql(f"DROP INDEX {index_name}")
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing_indexes.get(table.name, set()):
+                    logging.info(f"Creating index {index.name}")
+                    index.create(connection)
+        if sqlite_has_rtree(None, None, connection) and needs_rtree_rebuild(
+            connection
+        ):
+            logging.info("Rebuilding the spatial index of the location table")
+            for statement in LOCATION_RTREE_REBUILD:
+                connection.exec_driver_sql(statement)
+        if connection.dialect.name == "sqlite":
+            # Refresh the statistics the query planner uses to pick indexes
+            connection.exec_driver_sql("ANALYZE")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    migrate(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,23 @@ from typing import Optional
 from sqlmodel import Field, Relationship, SQLModel
 import uuid
 import datetime as dt
-from sqlalchemy import Column, DateTime, func
+from sqlalchemy import JSON, Column, DateTime, DDL, Index, LargeBinary, event, func
 from enum import Enum
 from pydantic import BaseModel
 
 
+# Indexing notes:
+# - Primary keys are indexed implicitly, so 'uid' columns are not indexed again.
+# - Link tables are looked up by their first primary key column through the
+#   primary key index. Lookups from the location side need a separate index.
+
+
 class DataSetLocationLink(SQLModel, table=True):
     dataset_uid: uuid.UUID = Field(
         default=None, foreign_key="dataset.uid", primary_key=True
     )
     location_uid: uuid.UUID = Field(
-        default=None, foreign_key="location.uid", primary_key=True
+        default=None, foreign_key="location.uid", primary_key=True, index=True
     )
 
 
@@ -22,7 +28,7 @@ class RouteLocationLink(SQLModel, table=True):
         default=None, foreign_key="route.uid", primary_key=True
     )
     location_uid: uuid.UUID = Field(
-        default=None, foreign_key="location.uid", primary_key=True
+        default=None, foreign_key="location.uid", primary_key=True, index=True
     )
 
 
@@ -39,29 +45,49 @@ class BaseAlgorithmRun(SQLModel):
     uid: uuid.UUID = Field(
         default_factory=uuid.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
     )
+    solver: Optional[str] = Field(default=None)
+    # Entropy of the solver's master seed sequence (may exceed 64 bits)
+    seed: Optional[str] = Field(default=None)
+    created_at: Optional[dt.datetime] = Field(default_factory=dt.datetime.utcnow)
+    # Wall time of the solver in seconds
+    runtime: Optional[float] = Field(default=None)
+    iterations: Optional[int] = Field(default=None)
+    evaluations: Optional[int] = Field(default=None)
+    best_fitness: Optional[float] = Field(default=None)
 
 
 class AlgorithmRun(BaseAlgorithmRun, table=True):
-    pass
+    # The convergence trace as the raw bytes of a numpy array with the layout
+    # 'vrp_solver.vrp_solver.TRACE_DTYPE'
+    trace: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+    # cProfile statistics (marshalled as by 'pstats.dump_stats'), if profiled
+    profile: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+
+
+class AlgorithmRunRead(BaseAlgorithmRun):
+    # The convergence trace in columnar form (one list per field)
+    trace: Optional[dict[str, list]] = None
+    profiled: bool = False
 
 
 class BaseLocation(SQLModel):
-    latitude: float = Field(index=True)
-    longitude: float = Field(index=True)
-    demand: int = Field(default=0, index=True)
-    depot: bool = Field(default=False, index=True)
+    latitude: float
+    longitude: float
+    demand: int = Field(default=0)
+    depot: bool = Field(default=False)
 
 
 class Location(BaseLocation, table=True):
     uid: uuid.UUID = Field(
         default_factory=uuid.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
     )
+    # Stable key of the location in the spatial index (SQLite only), never
+    # part of API responses
+    spatial_id: Optional[int] = Field(default=None, exclude=True)
     datasets: list["DataSet"] = Relationship(
         back_populates="locations", link_model=DataSetLocationLink
     )
@@ -71,6 +97,61 @@ class Location(BaseLocation, table=True):
     # timestamps: list["Timestamp"] = Relationship(back_populates="location")
 
 
+# Spatial (R*Tree) index over the location coordinates. The virtual table is
+# keyed by 'location.spatial_id' (assigned by the insert trigger) rather than
+# the implicit rowid, which VACUUM and dump/restore may renumber. Triggers keep
+# it in sync, so every insert path (ORM, bulk and raw SQL) updates it. SQLite
+# only
+LOCATION_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS location_rtree USING rtree("
+    + "id, min_latitude, max_latitude, min_longitude, max_longitude)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_location_spatial_id "
+    + "ON location (spatial_id)",
+    "CREATE TRIGGER IF NOT EXISTS location_rtree_insert AFTER INSERT ON location "
+    + "BEGIN INSERT INTO location_rtree VALUES "
+    + "(NULL, new.latitude, new.latitude, new.longitude, new.longitude); "
+    + "UPDATE location SET spatial_id = last_insert_rowid() WHERE uid = new.uid; END",
+    "CREATE TRIGGER IF NOT EXISTS location_rtree_update "
+    + "AFTER UPDATE OF latitude, longitude ON location "
+    + "BEGIN UPDATE location_rtree SET "
+    + "min_latitude = new.latitude, max_latitude = new.latitude, "
+    + "min_longitude = new.longitude, max_longitude = new.longitude "
+    + "WHERE id = new.spatial_id; END",
+    "CREATE TRIGGER IF NOT EXISTS location_rtree_delete AFTER DELETE ON location "
+    + "BEGIN DELETE FROM location_rtree WHERE id = old.spatial_id; END",
+]
+
+# Rebuild the spatial index from scratch: used by the migration when locations
+# were inserted before the index existed, or when the index of an earlier
+# schema version (keyed by rowid) is found
+LOCATION_RTREE_REBUILD = [
+    "DROP TRIGGER IF EXISTS location_rtree_insert",
+    "DROP TRIGGER IF EXISTS location_rtree_update",
+    "DROP TRIGGER IF EXISTS location_rtree_delete",
+    "DROP TABLE IF EXISTS location_rtree",
+    "DROP INDEX IF EXISTS ix_location_spatial_id",
+    "UPDATE location SET spatial_id = rowid",
+    *LOCATION_RTREE_DDL,
+    "INSERT INTO location_rtree "
+    + "SELECT spatial_id, latitude, latitude, longitude, longitude FROM location",
+]
+
+
+def sqlite_has_rtree(ddl, target, bind, **kw) -> bool:
+    if bind.dialect.name != "sqlite":
+        return False
+    options = bind.exec_driver_sql("PRAGMA compile_options").scalars().all()
+    return "ENABLE_RTREE" in options
+
+
+for statement in LOCATION_RTREE_DDL:
+    event.listen(
+        Location.__table__,
+        "after_create",
+        DDL(statement).execute_if(callable_=sqlite_has_rtree),
+    )
+
+
 class LocationCreate(BaseLocation):
     pass
 
@@ -79,6 +160,24 @@ class LocationReadCompact(BaseLocation):
     uid: uuid.UUID
 
 
+class LocationColumns(SQLModel):
+    # Columnar (parallel arrays) representation of many locations
+    latitude: list[float]
+    longitude: list[float]
+    demand: Optional[list[int]] = None
+    depot: Optional[list[bool]] = None
+
+
+class LocationBulkInsertResult(SQLModel):
+    count: int
+    uids: Optional[list[uuid.UUID]] = None
+
+
+class LocationReadNearby(LocationReadCompact):
+    # Great-circle distance (in meters) to the queried point
+    distance: float
+
+
 class LocationReadDetails(BaseLocation):
     uid: uuid.UUID
     # TODO: Specify DataSetRead model
@@ -101,6 +200,12 @@ class Identifier(SQLModel):
     uid: uuid.UUID
 
 
+class MatrixMetric(str, Enum):
+    # Distances in meters or walking times in seconds
+    distance = "distance"
+    duration = "duration"
+
+
 class BaseDataSet(SQLModel):
     name: str = Field(index=True)
 
@@ -109,7 +214,6 @@ class DataSet(BaseDataSet, table=True):
     uid: uuid.UUID = Field(
         default_factory=uuid.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
     )
     created_at: dt.datetime = Field(default=dt.datetime.utcnow(), nullable=False)
@@ -117,12 +221,20 @@ class DataSet(BaseDataSet, table=True):
     locations: list["Location"] = Relationship(
         back_populates="datasets", link_model=DataSetLocationLink
     )
+    # Path of an attached matrix of precomputed distances or travel times
+    # between the locations (in the order of their uids) and what it holds
+    matrix_file: Optional[str] = Field(default=None)
+    matrix_metric: Optional[str] = Field(default=None)
 
 
 class DataSetCreate(BaseDataSet):
     locations: Optional[list["Identifier"]]
 
 
+class DataSetCreateWithLocations(BaseDataSet):
+    locations: "LocationColumns"
+
+
 class DataSetUpdate(BaseDataSet):
     locations: Optional[list["Location"]]
 
@@ -131,6 +243,7 @@ class DataSetReadCompact(BaseDataSet):
     uid: uuid.UUID
     created_at: dt.datetime
     updated_at: dt.datetime
+    matrix_metric: Optional[MatrixMetric] = None
 
 
 class DataSetReadDetails(DataSetReadCompact):
@@ -138,6 +251,17 @@ class DataSetReadDetails(DataSetReadCompact):
     locations: list["Location"]
 
 
+class DataSetBulkCreateResult(DataSetReadCompact):
+    count: int
+    location_uids: Optional[list[uuid.UUID]] = None
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    arrow = "arrow"
+
+
 # class OrderBy(str, Enum):
 #     id = "id"
 #     name = "name"
@@ -155,10 +279,20 @@ class BaseTimestamp(SQLModel):
 
 
 class Timestamp(BaseTimestamp, table=True):
+    # Timestamps are read per route in chronological order together with the
+    # location, which this index answers without touching the table
+    __table_args__ = (
+        Index(
+            "ix_timestamp_route_uid_datetime",
+            "route_uid",
+            "datetime",
+            "location_uid",
+        ),
+    )
+
     uid: uuid.UUID = Field(
         default_factory=uuid.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
     )
     datetime: dt.datetime = Field(default=None, nullable=True)
@@ -180,13 +314,14 @@ class Route(BaseRoute, table=True):
     uid: uuid.UUID = Field(
         default_factory=uuid.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
     )
     locations: list["Location"] = Relationship(
         back_populates="routes", link_model=RouteLocationLink
     )
-    workplan_uid: uuid.UUID = Field(default=None, foreign_key="workplan.uid")
+    workplan_uid: uuid.UUID = Field(
+        default=None, foreign_key="workplan.uid", index=True
+    )
     algorithmrun_uid: uuid.UUID = Field(default=None, foreign_key="algorithmrun.uid")
 
 
@@ -209,6 +344,33 @@ class RouteRead(BaseRoute):
     algorithmrun_uid: uuid.UUID
 
 
+class BaseRouteSummary(SQLModel):
+    # Walking distance of the route in meters, including the depot legs
+    distance: float
+    # Seconds from the start of the shift until the return to the depot
+    duration: float
+    # Encoded polyline (precision 5) of the depot, the stops and the depot
+    polyline: str
+
+
+class RouteSummary(BaseRouteSummary, table=True):
+    # Computed once when routes are assigned, so clients need not rebuild a
+    # route from its locations and timestamps
+    route_uid: uuid.UUID = Field(
+        default=None, foreign_key="route.uid", primary_key=True
+    )
+    workplan_uid: uuid.UUID = Field(
+        default=None, foreign_key="workplan.uid", index=True
+    )
+    # The uids of the visited locations in order (without the depot)
+    stops: list[str] = Field(default=None, sa_column=Column(JSON))
+
+
+class RouteSummaryRead(BaseRouteSummary):
+    route_uid: uuid.UUID
+    stops: list[uuid.UUID]
+
+
 class BaseWorkPlan(SQLModel):
     start_time: dt.datetime = Field(nullable=False)
     end_time: dt.datetime = Field(nullable=False)
@@ -220,7 +382,6 @@ class WorkPlan(BaseWorkPlan, table=True):
     uid: uuid.UUID = Field(
         default_factory=uuid.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
     )
     updated_at: dt.datetime = Field(default_factory=dt.datetime.utcnow, nullable=False)
@@ -248,7 +409,6 @@ class Individual(SQLModel, table=True):
     uid: uuid.UUID = Field(
         default_factory=uuid.uuid4,
         primary_key=True,
-        index=True,
         nullable=False,
     )
     name: str = Field(index=True)
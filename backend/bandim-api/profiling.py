@@ -0,0 +1,82 @@
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+from typing import AsyncIterator, Optional
+
+from fastapi import Header
+
+from settings import PROFILE_ASSIGNMENTS
+
+
+class _LoadedProfile:
+    # Minimal stand-in for a 'cProfile.Profile' that 'pstats.Stats' accepts
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+async def assignment_profiler(
+    x_profile: Optional[bool] = Header(default=None),
+) -> AsyncIterator[Optional[cProfile.Profile]]:
+    """Profile a request with cProfile if the 'X-Profile' header is set or
+    profiling is enabled for all assignments in the settings.
+
+    Declared as an async dependency, so the profiler is enabled on the thread
+    that runs the (async) endpoint. Nothing is set up when profiling is off.
+
+    Returns:
+        (cProfile.Profile or None): The running profiler, if profiling.
+    """
+    if not (PROFILE_ASSIGNMENTS or x_profile):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (or debugger) is already active on this thread
+        logging.warning("Profiling is not available", exc_info=True)
+        yield None
+        return
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+
+
+def profile_to_bytes(profiler: cProfile.Profile) -> bytes:
+    """Stop the profiler and serialize its statistics.
+
+    The result has the same format as a file written by 'pstats.dump_stats'
+    and can be loaded by 'pstats', snakeviz and similar tools.
+
+    Args:
+        profiler (cProfile.Profile): The profiler.
+
+    Returns:
+        (bytes): The serialized statistics.
+    """
+    profiler.disable()
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def profile_to_text(data: bytes, sort: str = "cumulative", limit: int = 50) -> str:
+    """Render serialized profile statistics as a 'pstats' report.
+
+    Args:
+        data (bytes): Statistics serialized with 'profile_to_bytes'.
+        sort (str, optional): The 'pstats' sort key. Defaults to "cumulative".
+        limit (int, optional): The number of functions listed. Defaults to 50.
+
+    Returns:
+        (str): The report.
+    """
+    stream = io.StringIO()
+    stats = pstats.Stats(_LoadedProfile(data), stream=stream)
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
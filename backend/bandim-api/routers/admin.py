@@ -0,0 +1,47 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
+from sqlmodel import Session
+
+import uuid
+from common import check_api_key
+from models import AlgorithmRun
+from profiling import profile_to_text
+from routers.public import get_session
+from settings import API_KEY
+
+
+def verify_api_key(x_api_key: Optional[str] = Header(default=None)) -> None:
+    check_api_key(x_api_key, API_KEY)
+
+
+router = APIRouter(dependencies=[Depends(verify_api_key)])
+
+
+@router.get("/algorithmruns/{algorithmrun_uid}/profile", tags=["admin"])
+async def read_algorithmrun_profile(
+    *,
+    session: Session = Depends(get_session),
+    algorithmrun_uid: uuid.UUID,
+    format: str = Query(default="pstats", pattern="^(pstats|text)$"),
+    sort: str = Query(default="cumulative"),
+    limit: int = Query(default=50, ge=1),
+):
+    db_algorithmrun = session.get(AlgorithmRun, algorithmrun_uid)
+    if not db_algorithmrun:
+        raise HTTPException(status_code=404, detail="AlgorithmRun not found")
+    if db_algorithmrun.profile is None:
+        raise HTTPException(status_code=404, detail="AlgorithmRun was not profiled")
+    if format == "text":
+        try:
+            report = profile_to_text(db_algorithmrun.profile, sort=sort, limit=limit)
+        except KeyError:
+            raise HTTPException(status_code=422, detail=f"Unknown sort key: {sort}")
+        return PlainTextResponse(report)
+    return Response(
+        content=db_algorithmrun.profile,
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="{algorithmrun_uid}.prof"'
+        },
+    )
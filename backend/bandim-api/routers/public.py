@@ -1,21 +1,70 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from typing import Optional, Sequence
+from fastapi import APIRouter, Depends, Query, HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from sqlalchemy import insert
+from sqlalchemy import func, insert
+from sqlalchemy.orm import selectinload
 
 import datetime as dt
 import numpy as np
 from vrp_solver.vrp_solver import (
-    VRP,
+    TRACE_DTYPE,
+    ConvergenceTrace,
+    MultiStartSolver,
     TwoOptSolver,
     KMeansRadomizedPopulationInitializer,
     FitnessFunctionMinimizeDistance,
-    individual_to_routes,
+    TimeWindowVRP,
+)
+from vrp_solver.distances import (
+    load_distances,
+    symmetrize_matrix_file,
+    validate_matrix_file,
 )
 from pydantic import TypeAdapter
 from database import engine
+from settings import (
+    BULK_INSERT_BATCH_SIZE,
+    EXPORT_CHUNK_SIZE,
+    MATRIX_STORAGE_DIR,
+    SERVICE_TIME_PER_DEMAND,
+    SOLVER_N_JOBS,
+    SOLVER_NUM_STARTS,
+    SOLVER_PERSIST_TRACE,
+    SOLVER_PROGRESS_INTERVAL,
+    SOLVER_SEED,
+    SOLVER_TRACE_MAX_ENTRIES,
+    WALKING_SPEED,
+)
+from bulk import (
+    EXPORT_COLUMNS,
+    LocationColumnsError,
+    encode_arrow,
+    encode_csv,
+    encode_ndjson,
+    insert_dataset_links,
+    insert_locations,
+    iter_dataset_locations,
+    read_location_table,
+    select_dataset_locations,
+    validate_location_columns,
+)
+from metrics import timed_phase
+from profiling import assignment_profiler, profile_to_bytes
+from spatial import (
+    encode_polyline,
+    locations_within_radius,
+    project_to_meters,
+    select_locations_in_bounding_box,
+)
 from models import (
+    AlgorithmRun,
+    AlgorithmRunRead,
     DataSet,
     DataSetCreate,
+    DataSetCreateWithLocations,
+    DataSetLocationLink,
+    DataSetBulkCreateResult,
     DataSetReadCompact,
     DataSetReadDetails,
     DataSetUpdate,
@@ -23,6 +72,9 @@ from models import (
     LocationCreate,
     LocationReadCompact,
     LocationReadDetails,
+    LocationReadNearby,
+    LocationColumns,
+    LocationBulkInsertResult,
     WorkPlan,
     WorkPlanReadCompact,
     WorkPlanReadDetails,
@@ -32,13 +84,21 @@ from models import (
     RouteRead,
     RouteRead,
     RouteCreate,
+    RouteSummary,
+    RouteSummaryRead,
     Timestamp,
     TimestampCreate,
     LocationTimestampReadDetails,
     LocationTimestampCollection,
+    ExportFormat,
+    MatrixMetric,
 )
+import cProfile
+import os
+import shutil
+import time
 import uuid
-import pandas as pd
+import zipfile
 
 router = APIRouter()
 
@@ -48,6 +108,13 @@ def get_session():
         yield session
 
 
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    # A full page means that there might be more items. Hand the client the
+    # key of the last item, which can be passed as 'after' to get the next page
+    if len(items) == limit and limit > 0:
+        response.headers["X-Next-Cursor"] = str(items[-1].uid)
+
+
 @router.post("/locations/", response_model=LocationReadCompact, tags=["locations"])
 async def create_location(
     *, session: Session = Depends(get_session), location: LocationCreate
@@ -77,24 +144,139 @@ async def create_locations(
     return results.all()
 
 
+@router.post(
+    "/locations/bulk_insert/columnar",
+    response_model=LocationBulkInsertResult,
+    tags=["locations"],
+)
+async def create_locations_columnar(
+    *,
+    session: Session = Depends(get_session),
+    locations: LocationColumns,
+    return_uids: bool = True,
+):
+    try:
+        columns = validate_location_columns(
+            latitude=locations.latitude,
+            longitude=locations.longitude,
+            demand=locations.demand,
+            depot=locations.depot,
+        )
+    except LocationColumnsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    uids = insert_locations(session, columns, batch_size=BULK_INSERT_BATCH_SIZE)
+    return LocationBulkInsertResult(
+        count=len(uids), uids=uids if return_uids else None
+    )
+
+
+@router.post(
+    "/locations/bulk_insert/upload",
+    response_model=LocationBulkInsertResult,
+    tags=["locations"],
+)
+async def create_locations_upload(
+    *,
+    session: Session = Depends(get_session),
+    file: UploadFile,
+    return_uids: bool = True,
+):
+    try:
+        columns = read_location_table(await file.read(), file.filename or "")
+    except LocationColumnsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    uids = insert_locations(session, columns, batch_size=BULK_INSERT_BATCH_SIZE)
+    return LocationBulkInsertResult(
+        count=len(uids), uids=uids if return_uids else None
+    )
+
+
 @router.get("/locations/", response_model=list[LocationReadCompact], tags=["locations"])
 async def read_locations(
     *,
     session: Session = Depends(get_session),
+    response: Response,
+    after: Optional[uuid.UUID] = None,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
 ):
-    db_locations = session.exec(select(Location).offset(offset).limit(limit)).all()
+    statement = select(Location).order_by(Location.uid)
+    if after is not None:
+        # Keyset pagination: Seek directly past the last seen primary key
+        # instead of scanning and discarding 'offset' rows
+        statement = statement.where(Location.uid > after)
+    db_locations = session.exec(statement.offset(offset).limit(limit)).all()
+    set_next_cursor(response, db_locations, limit)
     return db_locations
 
 
+@router.get(
+    "/locations/within", response_model=list[LocationReadCompact], tags=["locations"]
+)
+async def read_locations_within(
+    *,
+    session: Session = Depends(get_session),
+    min_latitude: float = Query(ge=-90, le=90),
+    min_longitude: float = Query(ge=-180, le=180),
+    max_latitude: float = Query(ge=-90, le=90),
+    max_longitude: float = Query(ge=-180, le=180),
+    dataset_uid: Optional[uuid.UUID] = None,
+    limit: int = Query(default=1000, le=10_000),
+):
+    if min_latitude > max_latitude or min_longitude > max_longitude:
+        raise HTTPException(status_code=422, detail="Invalid bounding box")
+    statement = select_locations_in_bounding_box(
+        session,
+        min_latitude,
+        min_longitude,
+        max_latitude,
+        max_longitude,
+        dataset_uid=dataset_uid,
+    )
+    db_locations = session.exec(statement.limit(limit)).all()
+    return db_locations
+
+
+@router.get(
+    "/locations/nearby", response_model=list[LocationReadNearby], tags=["locations"]
+)
+async def read_locations_nearby(
+    *,
+    session: Session = Depends(get_session),
+    latitude: float = Query(ge=-90, le=90),
+    longitude: float = Query(ge=-180, le=180),
+    radius: float = Query(default=500.0, gt=0, le=50_000),
+    dataset_uid: Optional[uuid.UUID] = None,
+    limit: int = Query(default=1000, le=10_000),
+):
+    results = locations_within_radius(
+        session,
+        latitude,
+        longitude,
+        radius,
+        dataset_uid=dataset_uid,
+        limit=limit,
+    )
+    return [
+        LocationReadNearby(**db_location.model_dump(), distance=distance)
+        for db_location, distance in results
+    ]
+
+
 @router.get(
     "/locations/{location_uid}", response_model=LocationReadDetails, tags=["locations"]
 )
 async def read_location(
     *, session: Session = Depends(get_session), location_uid: uuid.UUID
 ):
-    db_location = session.get(Location, location_uid)
+    # Load the related datasets and routes up front (one query each) rather
+    # than lazily while the response is serialized
+    statement = (
+        select(Location)
+        .where(Location.uid == location_uid)
+        .options(selectinload(Location.datasets), selectinload(Location.routes))
+    )
+    db_location = session.exec(statement).first()
     if not db_location:
         raise HTTPException(status_code=404, detail="Locatino not found")
     return db_location
@@ -105,8 +287,11 @@ def delete_dataset(*, session: Session = Depends(get_session), dataset_uid: uuid
     db_dataset = session.get(DataSet, dataset_uid)
     if not db_dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
+    matrix_file = db_dataset.matrix_file
     session.delete(db_dataset)
     session.commit()
+    if matrix_file is not None and os.path.exists(matrix_file):
+        os.remove(matrix_file)
     return {"ok": True}
 
 
@@ -125,14 +310,64 @@ async def create_dataset(
     return db_dataset
 
 
+@router.post(
+    "/datasets/with_locations",
+    response_model=DataSetBulkCreateResult,
+    tags=["datasets"],
+)
+async def create_dataset_with_locations(
+    *,
+    session: Session = Depends(get_session),
+    dataset: DataSetCreateWithLocations,
+    return_uids: bool = True,
+):
+    try:
+        columns = validate_location_columns(
+            latitude=dataset.locations.latitude,
+            longitude=dataset.locations.longitude,
+            demand=dataset.locations.demand,
+            depot=dataset.locations.depot,
+        )
+    except LocationColumnsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Create the dataset, its locations and the links between them in a single
+    # transaction, so a failure part way leaves no partial dataset behind
+    try:
+        db_dataset = DataSet(name=dataset.name)
+        session.add(db_dataset)
+        session.flush()
+        uids = insert_locations(
+            session, columns, batch_size=BULK_INSERT_BATCH_SIZE, commit=False
+        )
+        insert_dataset_links(
+            session, db_dataset.uid, uids, batch_size=BULK_INSERT_BATCH_SIZE
+        )
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    session.refresh(db_dataset)
+    return DataSetBulkCreateResult(
+        **db_dataset.model_dump(),
+        count=len(uids),
+        location_uids=uids if return_uids else None,
+    )
+
+
 @router.get("/datasets/", response_model=list[DataSetReadCompact], tags=["datasets"])
 async def read_datasets(
     *,
     session: Session = Depends(get_session),
+    response: Response,
+    after: Optional[uuid.UUID] = None,
     offset: int = 0,
     limit: int = Query(default=100, le=100),
 ):
-    db_datasets = session.exec(select(DataSet).offset(offset).limit(limit)).all()
+    statement = select(DataSet).order_by(DataSet.uid)
+    if after is not None:
+        statement = statement.where(DataSet.uid > after)
+    db_datasets = session.exec(statement.offset(offset).limit(limit)).all()
+    set_next_cursor(response, db_datasets, limit)
     return db_datasets
 
 
@@ -142,12 +377,126 @@ async def read_datasets(
 async def read_dataset(
     *, session: Session = Depends(get_session), dataset_uid: uuid.UUID
 ):
+    statement = (
+        select(DataSet)
+        .where(DataSet.uid == dataset_uid)
+        .options(selectinload(DataSet.locations))
+    )
+    db_dataset = session.exec(statement).first()
+    if not db_dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return db_dataset
+
+
+@router.put(
+    "/datasets/{dataset_uid}/matrix",
+    response_model=DataSetReadCompact,
+    tags=["datasets"],
+)
+def upload_dataset_matrix(
+    *,
+    session: Session = Depends(get_session),
+    dataset_uid: uuid.UUID,
+    file: UploadFile,
+    metric: MatrixMetric = MatrixMetric.distance,
+):
+    # Attach a matrix of distances (meters) or walking times (seconds) between
+    # the locations of a dataset, in the order of their uids: a dense N x N
+    # '.npy' file (memory mapped when routes are assigned) or a CSR '.npz' file
+    # as written by 'scipy.sparse.save_npz'. A plain (not async) endpoint:
+    # copying and validating large matrices blocks, so FastAPI runs it in its
+    # threadpool rather than on the event loop
     db_dataset = session.get(DataSet, dataset_uid)
     if not db_dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in (".npy", ".npz"):
+        raise HTTPException(
+            status_code=422, detail="The matrix has to be a '.npy' or '.npz' file"
+        )
+    num_locations = session.exec(
+        select(func.count())
+        .select_from(DataSetLocationLink)
+        .where(DataSetLocationLink.dataset_uid == dataset_uid)
+    ).one()
+    os.makedirs(MATRIX_STORAGE_DIR, exist_ok=True)
+    path = os.path.join(MATRIX_STORAGE_DIR, f"{dataset_uid}{extension}")
+    # Write to a temporary file first, so a failed upload keeps the attached
+    # matrix intact
+    upload_path = f"{path}.upload{extension}"
+    with open(upload_path, "wb") as out:
+        shutil.copyfileobj(file.file, out)
+    try:
+        load_distances(upload_path, np.zeros((num_locations, 2)))
+        validate_matrix_file(upload_path)
+        # The solvers need d(a, b) == d(b, a): asymmetric matrices (e.g.
+        # travel times of a routing engine) are averaged over both directions
+        symmetrize_matrix_file(upload_path)
+    except (ValueError, OSError, zipfile.BadZipFile) as e:
+        os.remove(upload_path)
+        raise HTTPException(
+            status_code=422,
+            detail=f"The matrix is invalid for the {num_locations} locations: {e}",
+        )
+    os.replace(upload_path, path)
+    if db_dataset.matrix_file not in (None, path) and os.path.exists(
+        db_dataset.matrix_file
+    ):
+        os.remove(db_dataset.matrix_file)
+    db_dataset.matrix_file = path
+    db_dataset.matrix_metric = metric.value
+    db_dataset.updated_at = dt.datetime.utcnow()
+    session.add(db_dataset)
+    session.commit()
+    session.refresh(db_dataset)
     return db_dataset
 
 
+@router.get("/datasets/{dataset_uid}/export", tags=["datasets"])
+async def export_dataset(
+    *,
+    session: Session = Depends(get_session),
+    dataset_uid: uuid.UUID,
+    format: ExportFormat = ExportFormat.csv,
+):
+    db_dataset = session.get(DataSet, dataset_uid)
+    if not db_dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    if format == ExportFormat.arrow:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=501,
+                detail="Arrow export is unavailable. Package 'pyarrow' is not installed",
+            )
+    encoder, media_type = {
+        ExportFormat.csv: (encode_csv, "text/csv"),
+        ExportFormat.ndjson: (encode_ndjson, "application/x-ndjson"),
+        ExportFormat.arrow: (encode_arrow, "application/vnd.apache.arrow.stream"),
+    }[format]
+    # The request session is closed before the response is streamed, so the
+    # rows are read through a dedicated session on the same engine
+    bind = session.get_bind()
+
+    def chunks():
+        export_session = Session(bind)
+        try:
+            yield from iter_dataset_locations(
+                export_session, dataset_uid, EXPORT_CHUNK_SIZE
+            )
+        finally:
+            export_session.close()
+
+    return StreamingResponse(
+        encoder(chunks()),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{dataset_uid}.{format.value}"'
+        },
+    )
+
+
 # @router.patch(
 #     "/datasets/{dataset_uid}", response_model=DataSetReadDetails, tags=["datasets"]
 # )
@@ -202,9 +551,26 @@ async def read_workplan(
     return WorkPlanReadCompact(**workplan_dict)
 
 
+@router.get(
+    "/workplans/{workplan_uid}/summaries",
+    response_model=list[RouteSummaryRead],
+    tags=["workplans"],
+)
+async def read_workplan_summaries(
+    *, session: Session = Depends(get_session), workplan_uid: uuid.UUID
+):
+    if not session.get(WorkPlan, workplan_uid):
+        raise HTTPException(status_code=404, detail="WorkPlan not found")
+    statement = select(RouteSummary).where(RouteSummary.workplan_uid == workplan_uid)
+    return session.exec(statement).all()
+
+
 @router.post("/workplans/assign", response_model=LocationTimestampCollection, tags=["workplans"])
 async def assign_workplan(
-    *, session: Session = Depends(get_session), workplan: Identifier
+    *,
+    session: Session = Depends(get_session),
+    workplan: Identifier,
+    profiler: Optional[cProfile.Profile] = Depends(assignment_profiler),
 ):
     db_workplan = session.get(WorkPlan, workplan.uid)
     db_dataset = session.get(DataSet, db_workplan.dataset_uid)
@@ -214,36 +580,62 @@ async def assign_workplan(
             detail="A WorkPlan could not be created due to unknown dataset",
         )
 
-    data = [
-        {
-            "latitude": loc.latitude,
-            "longitude": loc.longitude,
-            "depot": loc.depot,
-            "demand": loc.demand,
-            "uid": loc.uid,
-            # "loc": loc.model_dump()
-        }
-        for loc in db_dataset.locations
-    ]
-    df = (
-        pd.DataFrame(data=data)
-        .astype(
-            {
-                "latitude": "float64",
-                "longitude": "float64",
-                "depot": "bool",
-                "demand": "int64",
-                "uid": "object",
-            }
+    # pandas is only loaded once a worker assigns routes
+    import pandas as pd
+
+    # Only fetch the columns the solver needs instead of hydrating (and lazily
+    # loading) a Location object per row
+    with timed_phase("data_load"):
+        data = session.exec(select_dataset_locations(db_dataset.uid)).all()
+        df = (
+            pd.DataFrame.from_records(data, columns=EXPORT_COLUMNS)
+            .astype(
+                {
+                    "latitude": "float64",
+                    "longitude": "float64",
+                    "depot": "bool",
+                    "demand": "int64",
+                    "uid": "object",
+                }
+            )
         )
-        .sort_values(by="depot", ascending=False)
-    )
-    locations = df[["latitude", "longitude"]].to_numpy().tolist()
-
-    vrp_instance = VRP(
+        # The rows stay in the order of the location uids, which is the order
+        # of an attached matrix. Every location flagged as a depot can be the
+        # start and end of a route (the first location, if none is flagged)
+        depots = np.flatnonzero(df["depot"].to_numpy()).tolist() or [0]
+        # Distances in meters around the (first) depot
+        coordinates = project_to_meters(
+            df["latitude"].to_numpy(),
+            df["longitude"].to_numpy(),
+            origin=(df["latitude"].iloc[depots[0]], df["longitude"].iloc[depots[0]]),
+        )
+        speed = WALKING_SPEED
+        # Meters per unit of the distances the routes are planned on
+        meters_per_unit = 1.0
+        if db_dataset.matrix_metric == MatrixMetric.duration:
+            # Routes are planned on walking times: coordinates are scaled to
+            # seconds, for distances that are not stored in a sparse matrix
+            coordinates = coordinates / WALKING_SPEED
+            speed = 1.0
+            meters_per_unit = WALKING_SPEED
+        locations = coordinates.tolist()
+
+    distances = None
+    if db_dataset.matrix_file is not None:
+        # Memory mapped (dense) or read as is (sparse), without a copy
+        with timed_phase("distance_matrix"):
+            distances = load_distances(db_dataset.matrix_file, coordinates)
+
+    # Every route has to fit into the shift of the workplan
+    vrp_instance = TimeWindowVRP(
         locations=locations,
         num_salesmen=db_workplan.workers,
+        depots=depots,
+        service_times=SERVICE_TIME_PER_DEMAND * df["demand"].to_numpy(),
+        horizon=(db_workplan.end_time - db_workplan.start_time).total_seconds(),
+        speed=speed,
         precompute_distances=True,
+        distances=distances,
     )
 
     # Determine the appropriate population size
@@ -253,89 +645,115 @@ async def assign_workplan(
     population_size = np.minimum(
         np.maximum(population_minimum, int(n / np.log2(n))), population_maximum
     )
-    solver = TwoOptSolver(
+    trace = ConvergenceTrace(max_reports=SOLVER_TRACE_MAX_ENTRIES)
+    solver_kwargs = dict(
         vrp_instance=vrp_instance,
         population_size=population_size,
         population_initializer_class=KMeansRadomizedPopulationInitializer,
         fitness_function_class=FitnessFunctionMinimizeDistance,
+        callbacks=[trace] if SOLVER_PERSIST_TRACE else None,
+        progress_interval=SOLVER_PROGRESS_INTERVAL,
+        seed=SOLVER_SEED,
     )
+    if SOLVER_NUM_STARTS > 1:
+        solver = MultiStartSolver(
+            solver_class=TwoOptSolver,
+            num_starts=SOLVER_NUM_STARTS,
+            n_jobs=SOLVER_N_JOBS,
+            **solver_kwargs,
+        )
+    else:
+        solver = TwoOptSolver(**solver_kwargs)
 
+    start = time.perf_counter()
     result = solver.run()
     best_solution = result.get_topk(k=1)[0]
-    # print("Fitness: ", best_solution.fitness)
-    routes = individual_to_routes(best_solution, vrp_instance)
-
-    data = []
-    for i in range(len(routes)):
-        for j in range(len(routes[i])):
-            d = {
-                "latitude": routes[i][j][0],
-                "longitude": routes[i][j][1],
-                "route": i,
-                "visit_number": j,
-            }
-            data.append(d)
-    ndf = pd.DataFrame(data=data).astype(
-        {
-            "latitude": "float64",
-            "longitude": "float64",
-            "route": "int64",
-            "visit_number": "int64",
-        }
+    db_algorithmrun = AlgorithmRun(
+        solver=type(solver).__name__,
+        seed=str(solver.seed_sequence.entropy),
+        runtime=time.perf_counter() - start,
+        iterations=solver.iteration,
+        evaluations=solver.evaluations,
+        best_fitness=solver.best_fitness,
+        trace=trace.to_array().tobytes() if SOLVER_PERSIST_TRACE else None,
     )
-    merged_dfs = pd.merge(df, ndf, on=["latitude", "longitude"])
-    merged_dfs = merged_dfs.sort_values(by="visit_number", ascending=True)
-
-    visit_duration = dt.timedelta(seconds=10)
-
+    session.add(db_algorithmrun)
     # Add generated routes to the database
     route_list = []
-    for _, _df in merged_dfs.groupby("route"):
-
-        primary_keys_list = _df["uid"].to_numpy().tolist()
-        statement = select(Location).where(Location.uid.in_(primary_keys_list))
-        locations = session.exec(statement).all()
-        route = RouteCreate(
-            locations=locations,
-            workplan_uid=workplan.uid,
-            algorithmrun_uid=uuid.uuid4(),
-        )
-        db_route = Route.model_validate(route)
-        # Add the data to the database
-        session.add(db_route)
-        session.commit()
-        session.refresh(db_route)
-
-        current_time = db_workplan.start_time
-        # TODO: Set the routing cost in terms of time
-        default_time = dt.timedelta(seconds=120)
-        for _, row in _df.iterrows():
-            current_time += default_time + visit_duration * row["demand"]
-            timestamp = TimestampCreate(
-                datetime=current_time,
-                route_uid=db_route.uid,
-                location_uid=row["uid"],
+    for salesman, stops in enumerate(best_solution.chromosome):
+        if len(stops) == 0:
+            continue
+        # The stops are row positions of the data frame the instance was
+        # built from
+        _df = df.iloc[stops]
+        depot, depot_legs = vrp_instance.depot_cost(stops, salesman)
+        # Start of every visit, in seconds from the start of the shift,
+        # followed by the return to the depot
+        visit_starts = vrp_instance.schedule(stops, depot=depot)
+
+        with timed_phase("persistence"):
+            primary_keys_list = _df["uid"].to_numpy().tolist()
+            statement = select(Location).where(Location.uid.in_(primary_keys_list))
+            locations = session.exec(statement).all()
+            route = RouteCreate(
+                locations=locations,
+                workplan_uid=workplan.uid,
+                algorithmrun_uid=db_algorithmrun.uid,
             )
-            db_timestamp = Timestamp.model_validate(timestamp)
+            db_route = Route.model_validate(route)
             # Add the data to the database
-            session.add(db_timestamp)
+            session.add(db_route)
+            session.commit()
+            session.refresh(db_route)
+
+            for location_uid, visit_start in zip(primary_keys_list, visit_starts):
+                timestamp = TimestampCreate(
+                    datetime=db_workplan.start_time
+                    + dt.timedelta(seconds=float(visit_start)),
+                    route_uid=db_route.uid,
+                    location_uid=location_uid,
+                )
+                db_timestamp = Timestamp.model_validate(timestamp)
+                # Add the data to the database
+                session.add(db_timestamp)
+                session.commit()
+                session.refresh(db_timestamp)
+
+            path = [depot] + list(stops) + [depot]
+            distance = depot_legs + vrp_instance.distances.path_cost(stops)
+            db_summary = RouteSummary(
+                route_uid=db_route.uid,
+                workplan_uid=workplan.uid,
+                stops=[str(location_uid) for location_uid in primary_keys_list],
+                distance=meters_per_unit * distance,
+                duration=float(visit_starts[-1]),
+                polyline=encode_polyline(
+                    df["latitude"].to_numpy()[path], df["longitude"].to_numpy()[path]
+                ),
+            )
+            session.add(db_summary)
             session.commit()
-            session.refresh(db_timestamp)
 
-        query = (
-            select(Location, Timestamp.datetime)
-            .join(Timestamp, Timestamp.location_uid == Location.uid)
-            .where(Timestamp.route_uid == db_route.uid)
-            .order_by(Timestamp.datetime)
-        )
-        results = session.exec(query).all()
-        locations_with_timestamps = [
-            LocationTimestampReadDetails(
-                **{"location": result[0], "timestamp": result[1]}
+        with timed_phase("serialization"):
+            query = (
+                select(Location, Timestamp.datetime)
+                .join(Timestamp, Timestamp.location_uid == Location.uid)
+                .where(Timestamp.route_uid == db_route.uid)
+                .order_by(Timestamp.datetime)
             )
-            for result in results
-        ]
-        route_list.append(locations_with_timestamps)
+            results = session.exec(query).all()
+            locations_with_timestamps = [
+                LocationTimestampReadDetails(
+                    **{"location": result[0], "timestamp": result[1]}
+                )
+                for result in results
+            ]
+            route_list.append(locations_with_timestamps)
+
+    if profiler is not None:
+        db_algorithmrun.profile = profile_to_bytes(profiler)
+        session.add(db_algorithmrun)
+        session.commit()
     return LocationTimestampCollection(assignments=route_list)
 
 
@@ -360,7 +778,45 @@ async def assign_workplan(
 
 @router.get("/routes/{route_uid}", response_model=RouteRead, tags=["routes"])
 async def read_route(*, session: Session = Depends(get_session), route_uid: uuid.UUID):
-    db_route = session.get(Route, route_uid)
+    statement = (
+        select(Route)
+        .where(Route.uid == route_uid)
+        .options(selectinload(Route.locations))
+    )
+    db_route = session.exec(statement).first()
     if not db_route:
         raise HTTPException(status_code=404, detail="Route not found")
     return db_route
+
+
+@router.get(
+    "/routes/{route_uid}/summary", response_model=RouteSummaryRead, tags=["routes"]
+)
+async def read_route_summary(
+    *, session: Session = Depends(get_session), route_uid: uuid.UUID
+):
+    db_summary = session.get(RouteSummary, route_uid)
+    if not db_summary:
+        raise HTTPException(status_code=404, detail="Route summary not found")
+    return db_summary
+
+
+@router.get(
+    "/algorithmruns/{algorithmrun_uid}",
+    response_model=AlgorithmRunRead,
+    tags=["algorithmruns"],
+)
+async def read_algorithmrun(
+    *, session: Session = Depends(get_session), algorithmrun_uid: uuid.UUID
+):
+    db_algorithmrun = session.get(AlgorithmRun, algorithmrun_uid)
+    if not db_algorithmrun:
+        raise HTTPException(status_code=404, detail="AlgorithmRun not found")
+    algorithmrun = AlgorithmRunRead.model_validate(
+        db_algorithmrun.model_dump(exclude={"trace", "profile"})
+    )
+    algorithmrun.profiled = db_algorithmrun.profile is not None
+    if db_algorithmrun.trace is not None:
+        trace = np.frombuffer(db_algorithmrun.trace, dtype=TRACE_DTYPE)
+        algorithmrun.trace = {name: trace[name].tolist() for name in TRACE_DTYPE.names}
+    return algorithmrun
@@ -1,3 +1,7 @@
+import os
+
+from common import str_to_bool_or_none
+
 # from common.common import get_secret
 
 
@@ -9,10 +13,38 @@ REDIS_HOST = "localhost" #get_secret("REDIS_HOST")
 REDIS_PORT = 6379 #get_secret("REDIS_PORT")
 REDIS_DB= 1 #get_secret("REDIS_DB")
 
-POSTGRES_USER = "postgres" #get_secret("POSTGRES_USER")
-POSTGRES_PASSWORD = "password" #get_secret("POSTGRES_PASSWORD")
-POSTGRES_PORT = "5432" #get_secret("POSTGRES_PORT")
-POSTGRES_DB = "bandim" #get_secret("POSTGRES_DB")
+POSTGRES_USER = os.environ.get("POSTGRES_USER", "postgres") #get_secret("POSTGRES_USER")
+POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD", "password") #get_secret("POSTGRES_PASSWORD")
+POSTGRES_HOST = os.environ.get("POSTGRES_HOST", "localhost") #get_secret("POSTGRES_HOST")
+POSTGRES_PORT = os.environ.get("POSTGRES_PORT", "5432") #get_secret("POSTGRES_PORT")
+POSTGRES_DB = os.environ.get("POSTGRES_DB", "bandim") #get_secret("POSTGRES_DB")
+
+# The database to use: "sqlite" or "postgres". An explicit DATABASE_URL takes
+# precedence over both
+DATABASE_BACKEND = os.environ.get("DATABASE_BACKEND", "sqlite")
+DATABASE_URL = os.environ.get("DATABASE_URL", None)
+# Connections kept open (plus extra connections allowed under load) per worker
+# process. Each uvicorn worker creates its own engine and thus its own pool
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", 10))
+
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "bandim.db")
+# Write-ahead logging lets readers proceed concurrently with a writer
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+# NORMAL is durable against application crashes in WAL mode and avoids an
+# fsync on every commit
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+# Page cache size per connection. Negative values are in KiB (here 64 MiB)
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -64_000))
+# Bytes of the database file to memory map for reads (here 256 MiB)
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 268_435_456))
+# Milliseconds to wait for a lock held by another connection before failing
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5_000))
+
+# Number of rows fetched from the database cursor at a time when exporting data
+EXPORT_CHUNK_SIZE = 5_000
+# Number of rows written per insert statement (and transaction) on bulk uploads
+BULK_INSERT_BATCH_SIZE = 10_000
 
 # VERSION = get_secret("VERSION")
 # API_KEY = get_secret("API_KEY")
@@ -24,3 +56,39 @@ POSTGRES_DB = "bandim" #get_secret("POSTGRES_DB")
 # POSTGRES_PASSWORD = get_secret("POSTGRES_PASSWORD")
 # POSTGRES_PORT = get_secret("POSTGRES_PORT")
 # POSTGRES_DB = get_secret("POSTGRES_DB")
+
+# Log a structured (JSON) line with timings for every request
+METRICS_LOG_REQUESTS = bool(
+    str_to_bool_or_none(os.environ.get("METRICS_LOG_REQUESTS", "false"))
+)
+
+# Number of solver iterations between two entries of the convergence trace
+SOLVER_PROGRESS_INTERVAL = int(os.environ.get("SOLVER_PROGRESS_INTERVAL", 100))
+# Maximum number of entries of a stored convergence trace (24 bytes each).
+# Longer traces are thinned out evenly
+SOLVER_TRACE_MAX_ENTRIES = int(os.environ.get("SOLVER_TRACE_MAX_ENTRIES", 1_000))
+# Store the convergence trace of every route assignment with its AlgorithmRun
+SOLVER_PERSIST_TRACE = bool(
+    str_to_bool_or_none(os.environ.get("SOLVER_PERSIST_TRACE", "true"))
+)
+# Profile every route assignment with cProfile (single requests can also be
+# profiled by sending the 'X-Profile: true' header)
+PROFILE_ASSIGNMENTS = bool(
+    str_to_bool_or_none(os.environ.get("PROFILE_ASSIGNMENTS", "false"))
+)
+# Master seed of route assignments. Unset, every assignment draws fresh entropy
+# (which is stored with its AlgorithmRun, so the run can be reproduced)
+SOLVER_SEED = (
+    int(os.environ["SOLVER_SEED"]) if os.environ.get("SOLVER_SEED") else None
+)
+# Independent solver starts per assignment and the processes they run in
+SOLVER_NUM_STARTS = int(os.environ.get("SOLVER_NUM_STARTS", 1))
+SOLVER_N_JOBS = int(os.environ.get("SOLVER_N_JOBS", 1))
+# Walking speed of the workers (m/s), used to turn distances into travel times
+WALKING_SPEED = float(os.environ.get("WALKING_SPEED", 1.2))
+# Time spent at a location per unit of its demand (seconds)
+SERVICE_TIME_PER_DEMAND = float(os.environ.get("SERVICE_TIME_PER_DEMAND", 10))
+# Directory the matrices of precomputed distances attached to datasets are
+# stored in. Resolved once, so the stored paths do not depend on the working
+# directory of later processes
+MATRIX_STORAGE_DIR = os.path.abspath(os.environ.get("MATRIX_STORAGE_DIR", "matrices"))
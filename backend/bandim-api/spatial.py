@@ -0,0 +1,202 @@
+import math
+import uuid
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Column, Float, Integer, MetaData, Table, inspect
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from models import DataSetLocationLink, Location
+
+# Mean earth radius in meters
+EARTH_RADIUS = 6_371_008.8
+
+# The R*Tree virtual table is created through DDL (see models.py) and is
+# declared on a separate metadata object so it is never created as a regular
+# table
+location_rtree = Table(
+    "location_rtree",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_latitude", Float),
+    Column("max_latitude", Float),
+    Column("min_longitude", Float),
+    Column("max_longitude", Float),
+)
+
+
+# Engines known to have the spatial index. Only positive results are cached:
+# the index may still be created (by a migration) after a negative check
+_engines_with_spatial_index: set[Engine] = set()
+
+
+def has_spatial_index(engine: Engine) -> bool:
+    if engine in _engines_with_spatial_index:
+        return True
+    if inspect(engine).has_table(location_rtree.name):
+        _engines_with_spatial_index.add(engine)
+        return True
+    return False
+
+
+def haversine(
+    latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray
+) -> np.ndarray:
+    # Great-circle distances (in meters) from one point to many points
+    phi1, phi2 = np.radians(latitude), np.radians(latitudes)
+    dphi = phi2 - phi1
+    dlambda = np.radians(longitudes - longitude)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def project_to_meters(
+    latitudes: np.ndarray, longitudes: np.ndarray, origin: tuple[float, float]
+) -> np.ndarray:
+    # Local equirectangular projection: (north, east) offsets in meters from
+    # the origin (latitude, longitude). Accurate to well under 1% over the
+    # tens of kilometers a workplan spans
+    latitude, longitude = origin
+    north = np.radians(np.asarray(latitudes) - latitude) * EARTH_RADIUS
+    east = (
+        np.radians(np.asarray(longitudes) - longitude)
+        * EARTH_RADIUS
+        * np.cos(np.radians(latitude))
+    )
+    return np.column_stack([north, east])
+
+
+def encode_polyline(
+    latitudes: np.ndarray, longitudes: np.ndarray, precision: int = 5
+) -> str:
+    # Encoded polyline (as used by Google Maps, OSRM and Leaflet plugins) of
+    # the given points: the rounded differences between consecutive points,
+    # zig-zag encoded in chunks of 5 bits per character
+    factor = 10**precision
+    points = np.column_stack(
+        [
+            np.round(np.asarray(latitudes, dtype=np.float64) * factor),
+            np.round(np.asarray(longitudes, dtype=np.float64) * factor),
+        ]
+    ).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1).ravel().tolist()
+    characters = []
+    for value in values:
+        while value >= 0x20:
+            characters.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        characters.append(chr(value + 63))
+    return "".join(characters)
+
+
+def radius_to_bounding_box(
+    latitude: float, longitude: float, radius: float
+) -> tuple[float, float, float, float]:
+    # A box (min lat, min long, max lat, max long) that contains every point
+    # within 'radius' meters of the given point
+    dlat = math.degrees(radius / EARTH_RADIUS)
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat < 1e-9 or radius >= math.pi * EARTH_RADIUS * cos_lat:
+        dlon = 180.0
+    else:
+        dlon = math.degrees(radius / (EARTH_RADIUS * cos_lat))
+    return (
+        max(latitude - dlat, -90.0),
+        max(longitude - dlon, -180.0),
+        min(latitude + dlat, 90.0),
+        min(longitude + dlon, 180.0),
+    )
+
+
+def select_locations_in_bounding_box(
+    session: Session,
+    min_latitude: float,
+    min_longitude: float,
+    max_latitude: float,
+    max_longitude: float,
+    dataset_uid: Optional[uuid.UUID] = None,
+):
+    """Select the locations inside a bounding box.
+
+    On SQLite the candidates are looked up in the R*Tree index. Other databases
+    fall back to filtering on the coordinate columns.
+
+    Args:
+        session (Session): An active database session.
+        min_latitude (float): The southern edge of the box.
+        min_longitude (float): The western edge of the box.
+        max_latitude (float): The northern edge of the box.
+        max_longitude (float): The eastern edge of the box.
+        dataset_uid (uuid.UUID, optional): Only select locations in this
+            dataset. Defaults to None.
+
+    Returns:
+        (Select): The select statement.
+    """
+    statement = select(Location)
+    if has_spatial_index(session.get_bind()):
+        rtree = location_rtree.c
+        statement = statement.join(
+            location_rtree, rtree.id == Location.spatial_id
+        ).where(
+            rtree.min_latitude <= max_latitude,
+            rtree.max_latitude >= min_latitude,
+            rtree.min_longitude <= max_longitude,
+            rtree.max_longitude >= min_longitude,
+        )
+    # The R*Tree stores 32-bit floats (rounded outwards), so the exact
+    # coordinates are always checked as well
+    statement = statement.where(
+        Location.latitude.between(min_latitude, max_latitude),
+        Location.longitude.between(min_longitude, max_longitude),
+    )
+    if dataset_uid is not None:
+        statement = statement.join(
+            DataSetLocationLink, DataSetLocationLink.location_uid == Location.uid
+        ).where(DataSetLocationLink.dataset_uid == dataset_uid)
+    return statement
+
+
+def locations_within_radius(
+    session: Session,
+    latitude: float,
+    longitude: float,
+    radius: float,
+    dataset_uid: Optional[uuid.UUID] = None,
+    limit: Optional[int] = None,
+) -> list[tuple[Location, float]]:
+    """Find the locations within a radius of a point, nearest first.
+
+    Args:
+        session (Session): An active database session.
+        latitude (float): The latitude of the point.
+        longitude (float): The longitude of the point.
+        radius (float): The radius in meters.
+        dataset_uid (uuid.UUID, optional): Only consider locations in this
+            dataset. Defaults to None.
+        limit (int, optional): The maximum number of locations to return.
+            Defaults to None.
+
+    Returns:
+        (list[tuple[Location, float]]): Pairs of locations and their distance
+            (in meters) to the point.
+    """
+    statement = select_locations_in_bounding_box(
+        session,
+        *radius_to_bounding_box(latitude, longitude, radius),
+        dataset_uid=dataset_uid,
+    )
+    candidates = session.exec(statement).all()
+    if len(candidates) == 0:
+        return []
+    distances = haversine(
+        latitude,
+        longitude,
+        np.fromiter((loc.latitude for loc in candidates), dtype=np.float64),
+        np.fromiter((loc.longitude for loc in candidates), dtype=np.float64),
+    )
+    indices = np.flatnonzero(distances <= radius)
+    indices = indices[np.argsort(distances[indices], kind="stable")][:limit]
+    return [(candidates[i], float(distances[i])) for i in indices]
@@ -0,0 +1,197 @@
+# Compiled versions of the kernels in 'vrp_solver.kernels'. Importing this
+# module requires numba. The loops visit the moves in the same order as the
+# NumPy kernels (and compare with '<'), so both select the same move
+import numba
+import numpy
+
+from vrp_solver.kernels import Kernels
+
+
+@numba.njit(cache=True)
+def _at(route, depot, position):
+    # Location at 'position' of the tour depot -> route -> depot
+    if position == 0 or position == len(route) + 1:
+        return depot
+    return route[position - 1]
+
+
+@numba.njit(cache=True)
+def route_cost(matrix, route, depot):
+    n = len(route)
+    if n == 0:
+        return matrix[depot, depot] * 2.0
+    cost = matrix[depot, route[0]]
+    for i in range(n - 1):
+        cost += matrix[route[i], route[i + 1]]
+    return cost + matrix[route[n - 1], depot]
+
+
+@numba.njit(cache=True)
+def two_opt_scan(matrix, route, depot):
+    n = len(route)
+    best_delta, best_i, best_k = numpy.inf, -1, -1
+    if n < 2:
+        return 0.0, -1, -1
+    for i in range(n):
+        a = _at(route, depot, i)
+        b = _at(route, depot, i + 1)
+        ab = matrix[a, b]
+        for k in range(i + 1, n):
+            c = _at(route, depot, k + 1)
+            d = _at(route, depot, k + 2)
+            delta = matrix[a, c] + matrix[b, d] - ab - matrix[c, d]
+            if delta < best_delta:
+                best_delta, best_i, best_k = delta, i, k
+    return best_delta, best_i, best_k
+
+
+@numba.njit(cache=True)
+def or_opt_scan(matrix, route, depot, max_segment=3):
+    n = len(route)
+    best_delta = numpy.inf
+    best_i, best_length, best_e, best_reverse = -1, 0, -1, False
+    for length in range(1, min(max_segment, n - 1) + 1):
+        length_delta = numpy.inf
+        length_i, length_e, length_reverse = -1, -1, False
+        for i in range(n - length + 1):
+            first = _at(route, depot, i + 1)
+            last = _at(route, depot, i + length)
+            p = _at(route, depot, i)
+            q = _at(route, depot, i + length + 1)
+            removal = matrix[p, first] + matrix[last, q] - matrix[p, q]
+            for e in range(n + 1):
+                if e >= i and e <= i + length:
+                    continue
+                u = _at(route, depot, e)
+                v = _at(route, depot, e + 1)
+                uv = matrix[u, v]
+                delta = matrix[u, first] + matrix[last, v] - uv - removal
+                if delta < length_delta:
+                    length_delta, length_i, length_e, length_reverse = delta, i, e, False
+                if length > 1:
+                    delta = matrix[u, last] + matrix[first, v] - uv - removal
+                    if delta < length_delta:
+                        length_delta, length_i, length_e, length_reverse = (
+                            delta,
+                            i,
+                            e,
+                            True,
+                        )
+        if length_delta < best_delta:
+            best_delta = length_delta
+            best_i, best_length, best_e, best_reverse = (
+                length_i,
+                length,
+                length_e,
+                length_reverse,
+            )
+    if best_i < 0:
+        return 0.0, -1, 0, -1, False
+    return best_delta, best_i, best_length, best_e, best_reverse
+
+
+@numba.njit(cache=True)
+def relocate_scan(matrix, route_a, route_b, depot):
+    n_a, n_b = len(route_a), len(route_b)
+    if n_a == 0:
+        return 0.0, -1, -1
+    best_delta, best_i, best_e = numpy.inf, -1, -1
+    for i in range(n_a):
+        p = _at(route_a, depot, i)
+        x = route_a[i]
+        q = _at(route_a, depot, i + 2)
+        removal = matrix[p, x] + matrix[x, q] - matrix[p, q]
+        for e in range(n_b + 1):
+            u = _at(route_b, depot, e)
+            v = _at(route_b, depot, e + 1)
+            delta = matrix[u, x] + matrix[x, v] - matrix[u, v] - removal
+            if delta < best_delta:
+                best_delta, best_i, best_e = delta, i, e
+    return best_delta, best_i, best_e
+
+
+@numba.njit(cache=True)
+def _concatenate(d1, tw1, e1, l1, d2, tw2, e2, l2, travel_time):
+    delta = d1 - tw1 + travel_time
+    wait = max(e2 - delta - l1, 0.0)
+    warp = max(e1 + delta - l2, 0.0)
+    return (
+        d1 + d2 + travel_time + wait,
+        tw1 + tw2 + warp,
+        max(e2 - delta, e1) - wait,
+        min(l2 - delta, l1) + warp,
+    )
+
+
+@numba.njit(cache=True)
+def two_opt_scan_tw(matrix, route, depot, times, service, earliest, latest, penalty):
+    n = len(route)
+    if n < 2:
+        return 0.0, -1, -1
+    m = n + 2
+    # Segment data of every prefix and suffix of the tour
+    prefix = numpy.empty((m, 4))
+    suffix = numpy.empty((m, 4))
+    prefix[0, 0], prefix[0, 1] = service[depot], 0.0
+    prefix[0, 2], prefix[0, 3] = earliest[depot], latest[depot]
+    suffix[m - 1, :] = prefix[0, :]
+    for j in range(1, m):
+        x, p = _at(route, depot, j), _at(route, depot, j - 1)
+        d, tw, e, l = _concatenate(
+            prefix[j - 1, 0], prefix[j - 1, 1], prefix[j - 1, 2], prefix[j - 1, 3],
+            service[x], 0.0, earliest[x], latest[x], times[p, x],
+        )
+        prefix[j, 0], prefix[j, 1], prefix[j, 2], prefix[j, 3] = d, tw, e, l
+    for j in range(m - 2, -1, -1):
+        x, q = _at(route, depot, j), _at(route, depot, j + 1)
+        d, tw, e, l = _concatenate(
+            service[x], 0.0, earliest[x], latest[x],
+            suffix[j + 1, 0], suffix[j + 1, 1], suffix[j + 1, 2], suffix[j + 1, 3],
+            times[x, q],
+        )
+        suffix[j, 0], suffix[j, 1], suffix[j, 2], suffix[j, 3] = d, tw, e, l
+    base_warp = prefix[m - 1, 1]
+    best_delta, best_i, best_k = numpy.inf, -1, -1
+    for i in range(n):
+        a = _at(route, depot, i)
+        b = _at(route, depot, i + 1)
+        ab = matrix[a, b]
+        # Segment data of the reversed part path[k + 1], ..., path[i + 1]
+        rd, rtw, re, rl = service[b], 0.0, earliest[b], latest[b]
+        for k in range(i + 1, n):
+            c = _at(route, depot, k + 1)
+            d = _at(route, depot, k + 2)
+            rd, rtw, re, rl = _concatenate(
+                service[c], 0.0, earliest[c], latest[c],
+                rd, rtw, re, rl, times[c, _at(route, depot, k)],
+            )
+            td, ttw, te, tl = _concatenate(
+                prefix[i, 0], prefix[i, 1], prefix[i, 2], prefix[i, 3],
+                rd, rtw, re, rl, times[a, c],
+            )
+            td, ttw, te, tl = _concatenate(
+                td, ttw, te, tl,
+                suffix[k + 2, 0], suffix[k + 2, 1], suffix[k + 2, 2], suffix[k + 2, 3],
+                times[b, d],
+            )
+            delta = (
+                matrix[a, c] + matrix[b, d] - ab - matrix[c, d]
+                + penalty * (ttw - base_warp)
+            )
+            if delta < best_delta:
+                best_delta, best_i, best_k = delta, i, k
+    return best_delta, best_i, best_k
+
+
+def _route_cost(matrix, route, depot):
+    return float(route_cost(matrix, route, depot))
+
+
+NUMBA_KERNELS = Kernels(
+    name="numba",
+    route_cost=_route_cost,
+    two_opt_scan=two_opt_scan,
+    or_opt_scan=or_opt_scan,
+    relocate_scan=relocate_scan,
+    two_opt_scan_tw=two_opt_scan_tw,
+)
@@ -0,0 +1,495 @@
+import math
+from typing import Callable
+
+import numpy
+
+from vrp_solver.kernels import EPSILON
+from vrp_solver.vrp_solver import (
+    VRP,
+    BaseFitnessFunction,
+    BasePopulationInitializer,
+    BaseSolver,
+    Individual,
+    Population,
+    SolverProgress,
+    TimeWindowVRP,
+    route_cost,
+    timed_phase,
+)
+
+# Score of an operator pair (see Ropke & Pisinger, 2006) when the solution it
+# created is a new global best, better than the current solution or a worse
+# solution that was accepted
+SCORE_GLOBAL_BEST = 33.0
+SCORE_IMPROVED = 9.0
+SCORE_ACCEPTED = 13.0
+
+
+class ALNSSolver(BaseSolver):
+    """Adaptive large neighbourhood search.
+
+    Starting from the best individual of the initial population, every
+    iteration removes a number of customers with a destroy operator and
+    reinserts them with a repair operator:
+
+    - Destroy: random removal, worst removal (the customers whose removal
+      saves the most distance) and Shaw removal (customers close to each other,
+      found through the nearest neighbours of the distance storage).
+    - Repair: greedy insertion and regret-2/regret-3 insertion. The cheapest
+      insertion of every removed customer into every route is cached. After
+      an insertion only the entries of the changed route are updated, in O(1)
+      per customer unless its cached insertion used the replaced edge.
+
+    Operators are chosen by roulette wheel selection with weights that adapt
+    to how well they performed in the previous segment of iterations, and new
+    solutions are accepted with a simulated annealing criterion.
+
+    Routes hold at most 'max_route_size' customers, so the work stays spread
+    over all salesmen (without a limit, the total distance is smallest when
+    one salesman visits every customer). Defaults to 25% above an even split.
+
+    With several depots, the depot of every route is fixed while customers
+    are inserted into it. An empty route of a salesman without an assigned
+    depot starts at the depot nearest to the first customer inserted into it.
+    Afterwards every changed route moves to the depot nearest to its ends (see
+    'VRP.depot_cost'), so depots are optimized jointly with the routes.
+
+    On a 'TimeWindowVRP' insertion costs include the penalty of the time warp
+    they cause, which is computed in O(1) per insertion from the forward and
+    backward time window data of the route. Inserting a customer changes the
+    times of all later stops, so the cached insertions into the changed route
+    are then recomputed instead of updated.
+    """
+
+    def __init__(
+        self,
+        vrp_instance: VRP,
+        population_size: int,
+        population_initializer_class: BasePopulationInitializer,
+        fitness_function_class: BaseFitnessFunction,
+        num_iterations: int = 1_000,
+        min_removal: float = 0.05,
+        max_removal: float = 0.2,
+        max_removed: int = 50,
+        max_route_size: None | int = None,
+        randomization: float = 5.0,
+        num_neighbors: int = 16,
+        segment_length: int = 100,
+        reaction_factor: float = 0.1,
+        start_temperature: float = 0.05,
+        end_temperature: float = 0.001,
+        callbacks: None | list[Callable[[SolverProgress], None]] = None,
+        progress_interval: int = 1,
+        seed: None | int | numpy.random.SeedSequence = None,
+    ):
+        self.num_iterations: int = num_iterations
+        # Fractions of the customers removed per iteration (at most 'max_removed')
+        self.min_removal: float = min_removal
+        self.max_removal: float = max_removal
+        self.max_removed: int = max_removed
+        num_customers = len(vrp_instance.customers)
+        self.max_route_size: int = (
+            max_route_size
+            if max_route_size is not None
+            else math.ceil(1.25 * num_customers / vrp_instance.num_salesmen)
+        )
+        # Bias of worst and Shaw removal towards the worst/most related customer
+        self.randomization: float = randomization
+        self.num_neighbors: int = num_neighbors
+        self.time_windows: bool = isinstance(vrp_instance, TimeWindowVRP)
+        self.segment_length: int = segment_length
+        self.reaction_factor: float = reaction_factor
+        # Temperatures are relative to the cost of the initial solution: a
+        # solution that is 'start_temperature' worse is initially accepted with
+        # a probability of 50%, at the end one 'end_temperature' worse
+        self.start_temperature: float = start_temperature
+        self.end_temperature: float = end_temperature
+        super().__init__(
+            vrp_instance,
+            population_size,
+            population_initializer_class,
+            fitness_function_class,
+            callbacks=callbacks,
+            progress_interval=progress_interval,
+            seed=seed,
+        )
+        self.destroy_operators: list[Callable] = [
+            self._random_removal,
+            self._worst_removal,
+            self._shaw_removal,
+        ]
+        self.repair_operators: list[Callable] = [
+            self._greedy_insertion,
+            lambda routes, costs, customers: self._regret_insertion(
+                routes, costs, customers, k=2
+            ),
+            lambda routes, costs, customers: self._regret_insertion(
+                routes, costs, customers, k=3
+            ),
+        ]
+
+    def _validate(self):
+        super()._validate()
+        if self.num_iterations < 0:
+            raise ValueError(f"{self.num_iterations}")
+        if not 0.0 < self.min_removal <= self.max_removal <= 1.0:
+            raise ValueError(f"{self.min_removal}, {self.max_removal}")
+        num_customers = len(self.vrp_instance.customers)
+        if self.max_route_size * self.vrp_instance.num_salesmen < num_customers:
+            raise ValueError(f"{self.max_route_size}")
+        if not 0.0 < self.end_temperature <= self.start_temperature:
+            raise ValueError(f"{self.start_temperature}, {self.end_temperature}")
+
+    def _initialization(self) -> Individual:
+        population = self.population_initializer_instance.generate()
+        population.sort(reverse=True)
+        return population[0]
+
+    def _num_removed(self) -> int:
+        num_customers = len(self.vrp_instance.customers)
+        low = max(1, int(self.min_removal * num_customers))
+        high = max(low, min(int(self.max_removal * num_customers), self.max_removed))
+        return int(self.rng.integers(low, high + 1))
+
+    def _biased_index(self, n: int) -> int:
+        # Random index in [0, n) biased towards 0
+        return int(self.rng.random() ** self.randomization * n)
+
+    def _remove(
+        self, routes: list[list[int]], costs: list[float], customers: list[int]
+    ):
+        remove = set(customers)
+        for r, route in enumerate(routes):
+            if remove.isdisjoint(route):
+                continue
+            routes[r] = [customer for customer in route if customer not in remove]
+            costs[r] = route_cost(self.vrp_instance, routes[r], r)
+
+    def _removal_gains(self, route: list[int], depot: int) -> numpy.ndarray:
+        # The distance saved by removing each customer from the route
+        path = numpy.asarray([depot] + route + [depot], dtype=numpy.intp)
+        p, x, q = path[:-2], path[1:-1], path[2:]
+        pairs = self.vrp_instance.distances.pairs
+        return pairs(p, x) + pairs(x, q) - pairs(p, q)
+
+    def _random_removal(
+        self, routes: list[list[int]], costs: list[float], num_removed: int
+    ) -> list[int]:
+        customers = [customer for route in routes for customer in route]
+        removed = self.rng.choice(customers, size=num_removed, replace=False).tolist()
+        self._remove(routes, costs, removed)
+        return removed
+
+    def _worst_removal(
+        self, routes: list[list[int]], costs: list[float], num_removed: int
+    ) -> list[int]:
+        removed = []
+        # Removing a customer only changes the gains of its own route, so only
+        # that route's gains are recomputed after every removal
+        depot = self.vrp_instance.route_depot
+        gains = [
+            self._removal_gains(route, depot(route, r)) for r, route in enumerate(routes)
+        ]
+        for _ in range(num_removed):
+            all_gains = numpy.concatenate(gains)
+            rank = self._biased_index(len(all_gains))
+            index = int(numpy.argpartition(-all_gains, rank)[rank])
+            for r, route in enumerate(routes):
+                if index < len(route):
+                    break
+                index -= len(route)
+            customer = routes[r][index]
+            self._remove(routes, costs, [customer])
+            gains[r] = self._removal_gains(routes[r], depot(routes[r], r))
+            removed.append(customer)
+        return removed
+
+    def _shaw_removal(
+        self, routes: list[list[int]], costs: list[float], num_removed: int
+    ) -> list[int]:
+        # Remove customers that are related (close) to already removed ones
+        customers = [customer for route in routes for customer in route]
+        removed = [customers[self.rng.integers(len(customers))]]
+        is_removed = {removed[0]}
+        depots = set(self.vrp_instance.depots)
+        while len(removed) < num_removed:
+            reference = removed[self.rng.integers(len(removed))]
+            candidates = [
+                int(neighbor)
+                for neighbor in self.vrp_instance.distances.neighbors(
+                    reference, self.num_neighbors
+                )
+                if neighbor not in depots and neighbor not in is_removed
+            ]
+            if candidates:
+                customer = candidates[self._biased_index(len(candidates))]
+            else:
+                remaining = [c for c in customers if c not in is_removed]
+                customer = remaining[self.rng.integers(len(remaining))]
+            removed.append(customer)
+            is_removed.add(customer)
+        self._remove(routes, costs, removed)
+        return removed
+
+    def _insertion_column(
+        self, route: list[int], customers: numpy.ndarray, depot: None | int
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        # The cheapest insertion cost of every customer into a route and the
+        # location after which it is inserted (the depot for the start of the
+        # route), vectorized over all customers and positions. An empty route
+        # without a depot starts at the best depot for each customer
+        if len(route) >= self.max_route_size:
+            return (
+                numpy.full(len(customers), numpy.inf),
+                numpy.zeros(len(customers), dtype=numpy.intp),
+            )
+        if depot is None:
+            columns = [
+                self._insertion_column(route, customers, depot)
+                for depot in self.vrp_instance.depots
+            ]
+            best = numpy.argmin([costs for costs, _ in columns], axis=0)
+            return (
+                numpy.choose(best, [costs for costs, _ in columns]),
+                numpy.choose(best, [predecessors for _, predecessors in columns]),
+            )
+        path = numpy.asarray([depot] + route + [depot], dtype=numpy.intp)
+        u, v = path[:-1], path[1:]
+        rows = numpy.repeat(customers, len(u))
+        pairs = self.vrp_instance.distances.pairs
+        costs = (
+            pairs(numpy.tile(u, len(customers)), rows)
+            + pairs(rows, numpy.tile(v, len(customers)))
+            - numpy.tile(pairs(u, v), len(customers))
+        ).reshape(len(customers), len(u))
+        if self.time_windows:
+            costs += self.vrp_instance.time_warp_penalty * (
+                self.vrp_instance.insertion_time_warp(route, customers, depot)
+            )
+        self.move_evaluations += costs.size
+        positions = numpy.argmin(costs, axis=1)
+        return costs[numpy.arange(len(customers)), positions], u[positions]
+
+    def _route_depots(self, routes: list[list[int]]) -> list[None | int]:
+        # The depot of every route while customers are inserted, None for
+        # empty routes that may start at any depot
+        return [
+            None
+            if len(route) == 0 and self.vrp_instance.worker_depots[r] is None
+            else self.vrp_instance.route_depot(route, r)
+            for r, route in enumerate(routes)
+        ]
+
+    def _insertion_cache(
+        self,
+        routes: list[list[int]],
+        depots: list[None | int],
+        customers: numpy.ndarray,
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        costs = numpy.empty((len(customers), len(routes)))
+        predecessors = numpy.empty((len(customers), len(routes)), dtype=numpy.intp)
+        for r, route in enumerate(routes):
+            costs[:, r], predecessors[:, r] = self._insertion_column(
+                route, customers, depots[r]
+            )
+        return costs, predecessors
+
+    def _update_insertion_column(
+        self,
+        route: list[int],
+        depot: int,
+        customers: numpy.ndarray,
+        costs: numpy.ndarray,
+        predecessors: numpy.ndarray,
+        u: int,
+        x: int,
+        v: int,
+    ):
+        # Update the cached insertions into a route after 'x' was inserted
+        # between 'u' and 'v'. Only the edge (u, v) was replaced (by (u, x)
+        # and (x, v)), so the best insertion stays valid unless it used that
+        # edge: O(1) per customer instead of a scan of the whole route
+        if len(route) >= self.max_route_size:
+            costs[:] = numpy.inf
+            return
+        if self.time_windows or len(route) == 1:
+            # The first customer of a route may also have fixed its depot
+            costs[:], predecessors[:] = self._insertion_column(route, customers, depot)
+            return
+        distances = self.vrp_instance.distances
+        broken = predecessors == u
+        to_u, to_x, to_v = (
+            distances.pairs(numpy.full_like(customers, location), customers)
+            for location in (u, x, v)
+        )
+        before = to_u + to_x - distances.distance(u, x)
+        after = to_x + to_v - distances.distance(x, v)
+        self.move_evaluations += 2 * len(customers)
+        for candidate, predecessor in [(before, u), (after, x)]:
+            better = ~broken & (candidate < costs)
+            costs[better] = candidate[better]
+            predecessors[better] = predecessor
+        if numpy.any(broken):
+            costs[broken], predecessors[broken] = self._insertion_column(
+                route, customers[broken], depot
+            )
+
+    def _insert(
+        self,
+        routes: list[list[int]],
+        costs: list[float],
+        customers: list[int],
+        choose: Callable[[numpy.ndarray], tuple[int, int]],
+    ):
+        # Insert all customers one at a time, in the order and into the routes
+        # picked by 'choose' from the cache of insertion costs. Only the column
+        # of the route that changed is updated after an insertion
+        pending = numpy.asarray(customers, dtype=numpy.intp)
+        depots = self._route_depots(routes)
+        cache_costs, cache_predecessors = self._insertion_cache(routes, depots, pending)
+        changed = set()
+        while len(pending) > 0:
+            i, r = choose(cache_costs)
+            u, x = int(cache_predecessors[i, r]), int(pending[i])
+            if depots[r] is None:
+                # The first customer of an empty route picks its depot
+                depots[r] = u
+            position = 0 if u == depots[r] else routes[r].index(u) + 1
+            v = routes[r][position] if position < len(routes[r]) else depots[r]
+            routes[r].insert(position, x)
+            costs[r] += cache_costs[i, r]
+            changed.add(r)
+            pending = numpy.delete(pending, i)
+            cache_costs = numpy.delete(cache_costs, i, axis=0)
+            cache_predecessors = numpy.delete(cache_predecessors, i, axis=0)
+            if len(pending) > 0:
+                # The columns are views, so the cache is updated in place
+                self._update_insertion_column(
+                    routes[r],
+                    depots[r],
+                    pending,
+                    cache_costs[:, r],
+                    cache_predecessors[:, r],
+                    u,
+                    x,
+                    v,
+                )
+        # The changed routes move to the depots closest to their new ends
+        if len(self.vrp_instance.depots) > 1:
+            for r in changed:
+                costs[r] = route_cost(self.vrp_instance, routes[r], r)
+
+    def _greedy_insertion(
+        self, routes: list[list[int]], costs: list[float], customers: list[int]
+    ):
+        def cheapest(cache_costs: numpy.ndarray) -> tuple[int, int]:
+            return divmod(int(numpy.argmin(cache_costs)), cache_costs.shape[1])
+
+        self._insert(routes, costs, customers, cheapest)
+
+    def _regret_insertion(
+        self, routes: list[list[int]], costs: list[float], customers: list[int], k: int
+    ):
+        def largest_regret(cache_costs: numpy.ndarray) -> tuple[int, int]:
+            # Insert the customer that loses most by not getting its best
+            # route first. Full routes count as a (very) expensive option
+            finite = numpy.where(numpy.isfinite(cache_costs), cache_costs, 1e12)
+            h = min(k, finite.shape[1])
+            best = numpy.partition(finite, h - 1, axis=1)[:, :h]
+            best.sort(axis=1)
+            regret = numpy.sum(best[:, 1:] - best[:, :1], axis=1)
+            # Largest regret first, ties broken by the cheapest insertion
+            i = int(numpy.lexsort((best[:, 0], -regret))[0])
+            return i, int(numpy.argmin(cache_costs[i]))
+
+        self._insert(routes, costs, customers, largest_regret)
+
+    def _select(self, weights: numpy.ndarray) -> int:
+        return int(self.rng.choice(len(weights), p=weights / weights.sum()))
+
+    def run(self) -> Population:
+        self._start_progress()
+        initial = self._initialization()
+        current_routes = [list(route) for route in initial.chromosome]
+        current_costs = [
+            route_cost(self.vrp_instance, route, salesman) if cost is None else cost
+            for salesman, (route, cost) in enumerate(
+                zip(current_routes, initial.route_costs)
+            )
+        ]
+        current_cost = sum(current_costs)
+        best_routes, best_cost = [route.copy() for route in current_routes], current_cost
+        best_costs = current_costs.copy()
+        self._report_progress(1.0 / best_cost if best_cost > 0 else 0.0)
+
+        destroy_weights = numpy.ones(len(self.destroy_operators))
+        repair_weights = numpy.ones(len(self.repair_operators))
+        destroy_scores, destroy_uses = numpy.zeros_like(destroy_weights), numpy.zeros_like(destroy_weights)
+        repair_scores, repair_uses = numpy.zeros_like(repair_weights), numpy.zeros_like(repair_weights)
+        # Accept a solution that is 'start_temperature' worse with probability
+        # 0.5 at first and cool down geometrically to 'end_temperature'
+        temperature = -self.start_temperature * current_cost / math.log(0.5)
+        cooling = (self.end_temperature / self.start_temperature) ** (
+            1.0 / max(1, self.num_iterations)
+        )
+        num_customers = len(self.vrp_instance.customers)
+
+        with timed_phase("local_search"):
+            for iteration in range(1, self.num_iterations + 1):
+                if num_customers == 0:
+                    break
+                d = self._select(destroy_weights)
+                r = self._select(repair_weights)
+                routes = [route.copy() for route in current_routes]
+                costs = current_costs.copy()
+                removed = self.destroy_operators[d](routes, costs, self._num_removed())
+                self.repair_operators[r](routes, costs, removed)
+                cost = sum(costs)
+
+                score = 0.0
+                if cost < best_cost - EPSILON:
+                    score = SCORE_GLOBAL_BEST
+                elif cost < current_cost - EPSILON:
+                    score = SCORE_IMPROVED
+                elif self.rng.random() < math.exp(
+                    -(cost - current_cost) / max(temperature, 1e-300)
+                ):
+                    score = SCORE_ACCEPTED
+                if score > 0.0:
+                    current_routes, current_costs, current_cost = routes, costs, cost
+                if cost < best_cost - EPSILON:
+                    best_routes, best_cost = [route.copy() for route in routes], cost
+                    best_costs = costs.copy()
+                destroy_scores[d] += score
+                repair_scores[r] += score
+                destroy_uses[d] += 1
+                repair_uses[r] += 1
+                temperature *= cooling
+
+                if iteration % self.segment_length == 0:
+                    # Move the weights towards the average score of the segment
+                    for weights, scores, uses in [
+                        (destroy_weights, destroy_scores, destroy_uses),
+                        (repair_weights, repair_scores, repair_uses),
+                    ]:
+                        used = uses > 0
+                        weights[used] = (1 - self.reaction_factor) * weights[
+                            used
+                        ] + self.reaction_factor * scores[used] / uses[used]
+                        # Keep every operator selectable
+                        numpy.maximum(weights, 1e-3, out=weights)
+                        scores[:] = 0.0
+                        uses[:] = 0.0
+                self.iteration += 1
+                self._report_progress(1.0 / best_cost if best_cost > 0 else 0.0)
+
+        self.destroy_weights, self.repair_weights = destroy_weights, repair_weights
+        individual = self.fitness_function_instance.evaluate(
+            Individual(
+                chromosome=best_routes,
+                generation=self.iteration,
+                route_costs=best_costs,
+            )
+        )
+        self._report_progress(individual.fitness, force=True)
+        return Population(individuals=[individual])
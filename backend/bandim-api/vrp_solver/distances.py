@@ -0,0 +1,369 @@
+import abc
+import os
+
+import numpy
+
+
+class BaseDistances(abc.ABC):
+    """Access to the distances between the locations of a VRP instance.
+
+    Solvers only access distances through this interface, so that the storage
+    (a dense matrix, a sparse neighbour structure or nothing at all) can be
+    chosen per instance.
+    """
+
+    def __init__(self, coordinates: numpy.ndarray):
+        self.coordinates: numpy.ndarray = coordinates
+        self.num_locations: int = len(coordinates)
+
+    def _euclidean(self, rows: numpy.ndarray, cols: numpy.ndarray) -> numpy.ndarray:
+        difference = self.coordinates[rows] - self.coordinates[cols]
+        return numpy.sqrt(numpy.sum(difference**2, axis=-1))
+
+    @abc.abstractmethod
+    def distance(self, loc_a: int, loc_b: int) -> float:
+        pass
+
+    @abc.abstractmethod
+    def pairs(self, rows: numpy.ndarray, cols: numpy.ndarray) -> numpy.ndarray:
+        # Vectorized distance lookup for many (row, col) pairs
+        pass
+
+    def path_cost(self, path: list[int]) -> float:
+        # Total distance of visiting the given locations in order
+        path = numpy.asarray(path, dtype=numpy.intp)
+        return float(numpy.sum(self.pairs(path[:-1], path[1:])))
+
+    def submatrix(self, indices: list[int]) -> numpy.ndarray:
+        # Dense matrix of the distances between a (small) subset of locations
+        indices = numpy.asarray(indices, dtype=numpy.intp)
+        rows, cols = numpy.meshgrid(indices, indices, indexing="ij")
+        return self.pairs(rows.ravel(), cols.ravel()).reshape(len(indices), -1)
+
+    def row(self, loc_a: int) -> numpy.ndarray:
+        # Distances from one location to all locations
+        cols = numpy.arange(self.num_locations)
+        return self.pairs(numpy.full_like(cols, loc_a), cols)
+
+    def neighbors(self, loc_a: int, k: int) -> numpy.ndarray:
+        # The (up to) k nearest other locations, nearest first
+        distances = self.row(loc_a)
+        distances[loc_a] = numpy.inf
+        k = min(k, self.num_locations - 1)
+        nearest = numpy.argpartition(distances, k - 1)[:k] if k > 0 else []
+        return numpy.asarray(nearest)[numpy.argsort(distances[nearest], kind="stable")]
+
+    @property
+    def nbytes(self) -> int:
+        return 0
+
+
+class DenseDistances(BaseDistances):
+    # A full N x N matrix. Constant time lookups at O(N^2) memory. A given
+    # (e.g. memory-mapped) matrix is used as is, without copying it
+
+    def __init__(
+        self, coordinates: numpy.ndarray, matrix: None | numpy.ndarray = None
+    ):
+        super().__init__(coordinates)
+        if matrix is None:
+            matrix = numpy.sqrt(
+                numpy.sum(
+                    (coordinates[:, None, :] - coordinates[None, :, :]) ** 2,
+                    axis=2,
+                )
+            )
+        self.matrix: numpy.ndarray = matrix
+
+    def distance(self, loc_a: int, loc_b: int) -> float:
+        return float(self.matrix[loc_a, loc_b])
+
+    def pairs(self, rows: numpy.ndarray, cols: numpy.ndarray) -> numpy.ndarray:
+        return self.matrix[rows, cols]
+
+    def submatrix(self, indices: list[int]) -> numpy.ndarray:
+        indices = numpy.asarray(indices, dtype=numpy.intp)
+        return self.matrix[numpy.ix_(indices, indices)]
+
+    def row(self, loc_a: int) -> numpy.ndarray:
+        return self.matrix[loc_a].copy()
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+
+class SparseKNNDistances(BaseDistances):
+    """Distances to the k nearest neighbours of every location in CSR layout.
+
+    Row i holds the neighbours of location i (nearest first) in
+    indices[indptr[i]:indptr[i + 1]] and their distances in the same slice of
+    data. Pairs that are not stored are computed from the coordinates on the
+    fly. Memory use is O(N * k).
+    """
+
+    def __init__(self, coordinates: numpy.ndarray, num_neighbors: int = 16):
+        super().__init__(coordinates)
+        from scipy.spatial import cKDTree
+
+        k = min(num_neighbors, self.num_locations - 1)
+        # Query one extra neighbour, as every location is its own nearest
+        distances, indices = cKDTree(coordinates).query(coordinates, k=k + 1)
+        distances, indices = distances[:, 1:], indices[:, 1:]
+        self.indptr: numpy.ndarray = numpy.arange(
+            0, self.num_locations * k + 1, k, dtype=numpy.int64
+        )
+        self.indices: numpy.ndarray = indices.astype(numpy.int32).ravel()
+        self.data: numpy.ndarray = distances.astype(numpy.float64).ravel()
+        self.num_neighbors: int = k
+
+    def distance(self, loc_a: int, loc_b: int) -> float:
+        start, stop = self.indptr[loc_a], self.indptr[loc_a + 1]
+        match = numpy.flatnonzero(self.indices[start:stop] == loc_b)
+        if len(match) > 0:
+            return float(self.data[start + match[0]])
+        return float(self._euclidean(loc_a, loc_b))
+
+    def pairs(self, rows: numpy.ndarray, cols: numpy.ndarray) -> numpy.ndarray:
+        rows = numpy.asarray(rows, dtype=numpy.intp)
+        cols = numpy.asarray(cols, dtype=numpy.intp)
+        result = self._euclidean(rows, cols)
+        if self.num_neighbors > 0 and len(rows) > 0:
+            # Every row stores the same number of neighbours, so the rows can be
+            # compared against the requested columns in one vectorized step
+            k = self.num_neighbors
+            stored = self.indices.reshape(-1, k)[rows]
+            match = stored == cols[:, None]
+            found = numpy.flatnonzero(match.any(axis=1))
+            positions = rows[found] * k + numpy.argmax(match[found], axis=1)
+            result[found] = self.data[positions]
+        return result
+
+    def neighbors(self, loc_a: int, k: int) -> numpy.ndarray:
+        if k <= self.num_neighbors:
+            start = self.indptr[loc_a]
+            return self.indices[start : start + k].astype(numpy.intp)
+        return super().neighbors(loc_a, k)
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+
+class CSRDistances(BaseDistances):
+    """Precomputed distances of some pairs of locations in CSR layout.
+
+    Row i holds the locations a distance from i is known for in
+    indices[indptr[i]:indptr[i + 1]] (in increasing order) and the distances in
+    the same slice of data, as in 'scipy.sparse.csr_matrix'. Rows may be of
+    different lengths. Pairs that are not stored are computed from the
+    coordinates on the fly. Lookups take O(log nnz) time.
+    """
+
+    def __init__(
+        self,
+        coordinates: numpy.ndarray,
+        data: numpy.ndarray,
+        indices: numpy.ndarray,
+        indptr: numpy.ndarray,
+    ):
+        super().__init__(coordinates)
+        if len(indptr) != self.num_locations + 1:
+            raise ValueError(f"{len(indptr)}")
+        rows = numpy.repeat(
+            numpy.arange(self.num_locations, dtype=numpy.int64), numpy.diff(indptr)
+        )
+        # Keys of the stored pairs, increasing if the rows are sorted
+        keys = rows * self.num_locations + indices
+        if numpy.any(numpy.diff(keys) < 0):
+            order = numpy.argsort(keys, kind="stable")
+            keys, indices, data = keys[order], indices[order], data[order]
+        self.keys: numpy.ndarray = keys
+        self.indptr: numpy.ndarray = indptr
+        self.indices: numpy.ndarray = indices
+        self.data: numpy.ndarray = data
+
+    def distance(self, loc_a: int, loc_b: int) -> float:
+        return float(self.pairs(numpy.array([loc_a]), numpy.array([loc_b]))[0])
+
+    def pairs(self, rows: numpy.ndarray, cols: numpy.ndarray) -> numpy.ndarray:
+        rows = numpy.asarray(rows, dtype=numpy.intp)
+        cols = numpy.asarray(cols, dtype=numpy.intp)
+        result = self._euclidean(rows, cols)
+        if len(self.keys) > 0 and len(rows) > 0:
+            keys = rows.astype(numpy.int64) * self.num_locations + cols
+            positions = numpy.minimum(
+                numpy.searchsorted(self.keys, keys), len(self.keys) - 1
+            )
+            found = self.keys[positions] == keys
+            result[found] = self.data[positions[found]]
+        return result
+
+    def neighbors(self, loc_a: int, k: int) -> numpy.ndarray:
+        # The nearest of the stored pairs of the location
+        start, stop = self.indptr[loc_a], self.indptr[loc_a + 1]
+        indices = numpy.asarray(self.indices[start:stop], dtype=numpy.intp)
+        distances = numpy.asarray(self.data[start:stop])
+        if len(indices) < k + 1:
+            return super().neighbors(loc_a, k)
+        order = numpy.argsort(distances, kind="stable")
+        nearest = indices[order]
+        return nearest[nearest != loc_a][:k]
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.keys.nbytes + self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+        )
+
+
+class OnTheFlyDistances(BaseDistances):
+    # Nothing is stored. Every distance is computed from the coordinates
+
+    def distance(self, loc_a: int, loc_b: int) -> float:
+        return float(self._euclidean(loc_a, loc_b))
+
+    def pairs(self, rows: numpy.ndarray, cols: numpy.ndarray) -> numpy.ndarray:
+        return self._euclidean(
+            numpy.asarray(rows, dtype=numpy.intp), numpy.asarray(cols, dtype=numpy.intp)
+        )
+
+
+DISTANCE_STORAGES = {
+    "dense": DenseDistances,
+    "sparse": SparseKNNDistances,
+    "none": OnTheFlyDistances,
+}
+
+
+def load_distances(path: str, coordinates: numpy.ndarray) -> BaseDistances:
+    """Load precomputed distances (or travel times) from a file.
+
+    The rows and columns of the matrix are in the order of the given
+    coordinates. The matrix has to be symmetric, as the solvers assume (see
+    'symmetrize_matrix_file').
+
+    Args:
+        path (str): A '.npy' file with a dense N x N matrix, which is memory
+            mapped (read only), so it is neither copied nor read until used.
+            Or a '.npz' file with a CSR matrix as written by
+            'scipy.sparse.save_npz' (for pairs that are not stored the
+            distance is computed from the coordinates).
+        coordinates (numpy.ndarray): The N coordinates of the locations.
+
+    Returns:
+        (BaseDistances): The distances.
+    """
+    num_locations = len(coordinates)
+    if path.endswith(".npy"):
+        matrix = numpy.load(path, mmap_mode="r")
+        if matrix.dtype.kind not in "fiu" or matrix.shape != (
+            num_locations,
+            num_locations,
+        ):
+            raise ValueError(f"{matrix.shape}")
+        return DenseDistances(coordinates, matrix=matrix)
+    if path.endswith(".npz"):
+        with numpy.load(path) as arrays:
+            if "indptr" not in arrays.files or arrays["format"].tobytes() != b"csr":
+                raise ValueError(f"{path}")
+            if tuple(arrays["shape"]) != (num_locations, num_locations):
+                raise ValueError(f"{tuple(arrays['shape'])}")
+            return CSRDistances(
+                coordinates,
+                data=arrays["data"].astype(numpy.float64, copy=False),
+                indices=arrays["indices"],
+                indptr=arrays["indptr"],
+            )
+    raise ValueError(f"{path}")
+
+
+def validate_matrix_file(path: str, block_size: int = 1024):
+    """Check that the matrix in a '.npy' or CSR '.npz' file only holds finite,
+    non-negative values.
+
+    NaN compares false against everything, so a single NaN (or negative) entry
+    would silently break the move evaluation of the local search kernels.
+    Dense matrices are checked in blocks of rows, so memory use is
+    O(block_size * N).
+
+    Args:
+        path (str): The file ('.npy' or '.npz', see 'load_distances').
+        block_size (int): Rows of a dense matrix checked at a time.
+
+    Raises:
+        ValueError: If the matrix holds non-finite or negative values.
+    """
+    if path.endswith(".npy"):
+        matrix = numpy.load(path, mmap_mode="r")
+        blocks = (
+            matrix[start : start + block_size]
+            for start in range(0, len(matrix), block_size)
+        )
+    else:
+        with numpy.load(path) as arrays:
+            blocks = [arrays["data"]]
+    num_invalid = sum(
+        int(numpy.count_nonzero(~(numpy.isfinite(block) & (block >= 0))))
+        for block in blocks
+    )
+    if num_invalid > 0:
+        raise ValueError(f"{num_invalid} non-finite or negative value(s)")
+
+
+def symmetrize_matrix_file(path: str, block_size: int = 1024) -> bool:
+    """Make the matrix in a '.npy' or CSR '.npz' file symmetric, in place.
+
+    The local search kernels, the depot legs and the insertion costs assume
+    d(a, b) == d(b, a). Asymmetric matrices (such as travel times of a
+    routing engine) are replaced by the mean of both directions. Of pairs that
+    are only stored in one direction of a sparse matrix, the stored value is
+    used for both. Dense matrices are processed in blocks of rows, so memory
+    use is O(block_size * N).
+
+    Args:
+        path (str): The file ('.npy' or '.npz', see 'load_distances').
+        block_size (int): Rows of a dense matrix processed at a time.
+
+    Returns:
+        (bool): Whether the matrix was not symmetric (and was rewritten).
+    """
+    if path.endswith(".npy"):
+        matrix = numpy.load(path, mmap_mode="r")
+        num_rows = len(matrix)
+        blocks = [
+            (start, min(start + block_size, num_rows))
+            for start in range(0, num_rows, block_size)
+        ]
+        if all(
+            numpy.array_equal(matrix[start:stop], matrix[:, start:stop].T)
+            for start, stop in blocks
+        ):
+            return False
+        symmetric_path = f"{path}.symmetric.npy"
+        symmetric = numpy.lib.format.open_memmap(
+            symmetric_path,
+            mode="w+",
+            dtype=numpy.result_type(matrix.dtype, numpy.float64),
+            shape=matrix.shape,
+        )
+        for start, stop in blocks:
+            symmetric[start:stop] = (matrix[start:stop] + matrix[:, start:stop].T) / 2
+        symmetric.flush()
+        del matrix, symmetric
+        os.replace(symmetric_path, path)
+        return True
+    import scipy.sparse
+
+    matrix = scipy.sparse.load_npz(path).tocsr()
+    transposed = matrix.T.tocsr()
+    if (matrix != transposed).nnz == 0:
+        return False
+    # Number of directions every pair is stored in (1 or 2)
+    counts = (matrix != 0).astype(numpy.float64) + (transposed != 0).astype(
+        numpy.float64
+    )
+    symmetric = (matrix + transposed).multiply(counts.power(-1.0)).tocsr()
+    symmetric.sort_indices()
+    scipy.sparse.save_npz(path, symmetric)
+    return True
@@ -0,0 +1,375 @@
+"""Route cost and local-search kernels.
+
+All kernels operate on a dense, symmetric float64 distance matrix and int32
+arrays of location indices (rows of the matrix). A route never contains the
+depot, which is passed separately: the route is a closed tour that starts and
+ends at it.
+
+Routes of instances with time windows are scored by their distance plus a
+penalty per second of time warp (arriving after a location's window closes).
+The time-related kernels take dense travel time matrices and per-location
+service times and windows indexed like the distance matrix. Time windows are
+handled with the segment data of Vidal et al. (2013): the duration, time warp,
+earliest and latest start of a sequence of visits can be concatenated in O(1),
+so with the data of every prefix and suffix of a route (the forward and
+backward slack) the time warp after a move is known in O(1).
+
+Two implementations with identical results are provided: a compiled one
+(numba, if installed) and a vectorized NumPy fallback. 'get_kernels' selects
+the compiled kernels when available. The selection can be forced with the
+'VRP_KERNELS' environment variable ("numba" or "numpy").
+"""
+import functools
+import os
+from typing import Callable, NamedTuple
+
+import numpy
+
+# Moves that improve the cost by less than this are ignored (rounding noise)
+EPSILON = 1e-9
+
+
+class Kernels(NamedTuple):
+    name: str
+    # route_cost(matrix, route, depot) -> cost
+    route_cost: Callable
+    # two_opt_scan(matrix, route, depot) -> (delta, i, k)
+    two_opt_scan: Callable
+    # or_opt_scan(matrix, route, depot, max_segment) -> (delta, i, length, e, reverse)
+    or_opt_scan: Callable
+    # relocate_scan(matrix, route_a, route_b, depot) -> (delta, i, e)
+    relocate_scan: Callable
+    # two_opt_scan_tw(matrix, route, depot, times, service, earliest, latest,
+    #     penalty) -> (delta, i, k)
+    two_opt_scan_tw: Callable
+
+
+def _path(route: numpy.ndarray, depot: int) -> numpy.ndarray:
+    path = numpy.empty(len(route) + 2, dtype=numpy.intp)
+    path[0] = path[-1] = depot
+    path[1:-1] = route
+    return path
+
+
+def route_cost(matrix: numpy.ndarray, route: numpy.ndarray, depot: int) -> float:
+    """The cost of the closed tour depot -> route -> depot."""
+    path = _path(route, depot)
+    return float(numpy.sum(matrix[path[:-1], path[1:]]))
+
+
+def two_opt_scan(
+    matrix: numpy.ndarray, route: numpy.ndarray, depot: int
+) -> tuple[float, int, int]:
+    """Find the best 2-opt move of a route.
+
+    Returns:
+        (tuple[float, int, int]): The change in cost of reversing route[i:k + 1]
+            and the indices i and k. (0.0, -1, -1) if the route has fewer than
+            two stops.
+    """
+    n = len(route)
+    if n < 2:
+        return 0.0, -1, -1
+    path = _path(route, depot)
+    # Reversing path[i:k + 1] (1 <= i < k <= n) replaces the edges (a, b) and
+    # (c, d) by (a, c) and (b, d)
+    a, b = path[:n], path[1 : n + 1]
+    c, d = path[1 : n + 1], path[2 : n + 2]
+    delta = (
+        matrix[numpy.ix_(a, c)]
+        + matrix[numpy.ix_(b, d)]
+        - matrix[a, b][:, None]
+        - matrix[c, d][None, :]
+    )
+    delta[numpy.tril_indices(n)] = numpy.inf
+    best = int(numpy.argmin(delta))
+    i, k = divmod(best, n)
+    return float(delta[i, k]), i, k
+
+
+def or_opt_scan(
+    matrix: numpy.ndarray, route: numpy.ndarray, depot: int, max_segment: int = 3
+) -> tuple[float, int, int, int, bool]:
+    """Find the best Or-opt move of a route: moving a segment of up to
+    'max_segment' consecutive stops (optionally reversed) elsewhere in it.
+
+    The segment route[i:i + length] is inserted between path[e] and
+    path[e + 1], where path is the tour including the depot at both ends (see
+    'apply_or_opt').
+
+    Returns:
+        (tuple[float, int, int, int, bool]): The change in cost and the move
+            (i, length, e, reverse). (0.0, -1, 0, -1, False) if no move exists.
+    """
+    n = len(route)
+    path = _path(route, depot)
+    best = (0.0, -1, 0, -1, False)
+    best_delta = numpy.inf
+    edges = numpy.arange(n + 1)
+    u, v = path[:-1], path[1:]
+    uv = matrix[u, v]
+    for length in range(1, min(max_segment, n - 1) + 1):
+        i = numpy.arange(n - length + 1)
+        first, last = path[i + 1], path[i + length]
+        p, q = path[i], path[i + length + 1]
+        removal = matrix[p, first] + matrix[last, q] - matrix[p, q]
+        forward = (
+            matrix[numpy.ix_(u, first)].T + matrix[numpy.ix_(last, v)] - uv[None, :]
+        )
+        reverse = (
+            matrix[numpy.ix_(u, last)].T + matrix[numpy.ix_(first, v)] - uv[None, :]
+        )
+        delta = numpy.stack([forward, reverse], axis=-1) - removal[:, None, None]
+        # Edges that touch the segment (or the segment's own position) are invalid
+        invalid = (edges[None, :] >= i[:, None]) & (
+            edges[None, :] <= i[:, None] + length
+        )
+        delta[invalid] = numpy.inf
+        if length == 1:
+            delta[:, :, 1] = numpy.inf
+        position = int(numpy.argmin(delta))
+        if delta.flat[position] < best_delta:
+            best_delta = delta.flat[position]
+            start, rest = divmod(position, (n + 1) * 2)
+            e, reverse_segment = divmod(rest, 2)
+            best = (float(best_delta), start, length, e, bool(reverse_segment))
+    return best
+
+
+def relocate_scan(
+    matrix: numpy.ndarray, route_a: numpy.ndarray, route_b: numpy.ndarray, depot: int
+) -> tuple[float, int, int]:
+    """Find the best move of a single stop from route_a into route_b.
+
+    The stop route_a[i] is inserted between path_b[e] and path_b[e + 1], where
+    path_b is route_b including the depot at both ends (see 'apply_relocate').
+
+    Returns:
+        (tuple[float, int, int]): The change in the total cost of both routes
+            and the move (i, e). (0.0, -1, -1) if route_a is empty.
+    """
+    if len(route_a) == 0:
+        return 0.0, -1, -1
+    path_a, path_b = _path(route_a, depot), _path(route_b, depot)
+    p, x, q = path_a[:-2], path_a[1:-1], path_a[2:]
+    removal = matrix[p, x] + matrix[x, q] - matrix[p, q]
+    u, v = path_b[:-1], path_b[1:]
+    insertion = matrix[numpy.ix_(u, x)].T + matrix[numpy.ix_(x, v)] - matrix[u, v]
+    delta = insertion - removal[:, None]
+    best = int(numpy.argmin(delta))
+    i, e = divmod(best, len(u))
+    return float(delta[i, e]), i, e
+
+
+def concatenate_segments(first: tuple, second: tuple, travel_time) -> tuple:
+    """Concatenate the time window data of two sequences of visits.
+
+    A segment is a (duration, time_warp, earliest, latest) tuple: the time from
+    the start of the first service to the end of the last one (including
+    waiting), the total time warp and the earliest and latest time the first
+    service can start without adding time warp. A single visit is
+    (service time, 0, window start, window end). The fields may be arrays.
+
+    Args:
+        first (tuple): The segment visited first.
+        second (tuple): The segment visited second.
+        travel_time (float | numpy.ndarray): From the last visit of the first
+            segment to the first visit of the second.
+
+    Returns:
+        (tuple): The segment data of the concatenation.
+    """
+    d1, tw1, e1, l1 = first
+    d2, tw2, e2, l2 = second
+    delta = d1 - tw1 + travel_time
+    wait = numpy.maximum(e2 - delta - l1, 0.0)
+    warp = numpy.maximum(e1 + delta - l2, 0.0)
+    return (
+        d1 + d2 + travel_time + wait,
+        tw1 + tw2 + warp,
+        numpy.maximum(e2 - delta, e1) - wait,
+        numpy.minimum(l2 - delta, l1) + warp,
+    )
+
+
+def route_segments(
+    path: numpy.ndarray,
+    legs: numpy.ndarray,
+    service: numpy.ndarray,
+    earliest: numpy.ndarray,
+    latest: numpy.ndarray,
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """The segment data of every prefix and suffix of a path.
+
+    Only the travel times of consecutive visits are needed: 'legs[j]' is the
+    travel time from path[j] to path[j + 1], so the data takes O(len(path))
+    time and memory.
+
+    Returns:
+        (tuple[numpy.ndarray, numpy.ndarray]): Arrays of shape (len(path), 4):
+            row j of the first holds the segment path[:j + 1], row j of the
+            second the segment path[j:].
+    """
+    m = len(path)
+    prefix = numpy.empty((m, 4))
+    suffix = numpy.empty((m, 4))
+    # Plain floats: concatenating scalars through NumPy is much slower
+    legs, service = legs.tolist(), service.tolist()
+    earliest, latest = earliest.tolist(), latest.tolist()
+    path = [int(location) for location in path]
+    segment = None
+    for j, location in enumerate(path):
+        node = (service[location], 0.0, earliest[location], latest[location])
+        segment = (
+            node
+            if segment is None
+            else _concatenate_floats(segment, node, legs[j - 1])
+        )
+        prefix[j] = segment
+    segment = None
+    for j in range(m - 1, -1, -1):
+        location = path[j]
+        node = (service[location], 0.0, earliest[location], latest[location])
+        segment = (
+            node
+            if segment is None
+            else _concatenate_floats(node, segment, legs[j])
+        )
+        suffix[j] = segment
+    return prefix, suffix
+
+
+def _concatenate_floats(first: tuple, second: tuple, travel_time: float) -> tuple:
+    # 'concatenate_segments' for plain floats
+    d1, tw1, e1, l1 = first
+    d2, tw2, e2, l2 = second
+    delta = d1 - tw1 + travel_time
+    wait = max(e2 - delta - l1, 0.0)
+    warp = max(e1 + delta - l2, 0.0)
+    return (
+        d1 + d2 + travel_time + wait,
+        tw1 + tw2 + warp,
+        max(e2 - delta, e1) - wait,
+        min(l2 - delta, l1) + warp,
+    )
+
+
+def two_opt_scan_tw(
+    matrix: numpy.ndarray,
+    route: numpy.ndarray,
+    depot: int,
+    times: numpy.ndarray,
+    service: numpy.ndarray,
+    earliest: numpy.ndarray,
+    latest: numpy.ndarray,
+    penalty: float,
+) -> tuple[float, int, int]:
+    """Find the best 2-opt move of a route with time windows.
+
+    Moves are scored by the change in distance plus 'penalty' times the change
+    in time warp. The segment data of the reversed part is extended by one
+    visit per move, so every move is checked in O(1).
+
+    Returns:
+        (tuple[float, int, int]): As 'two_opt_scan'.
+    """
+    n = len(route)
+    if n < 2:
+        return 0.0, -1, -1
+    path = _path(route, depot)
+    prefix, suffix = route_segments(
+        path, times[path[:-1], path[1:]], service, earliest, latest
+    )
+    base_warp = prefix[-1, 1]
+    delta = numpy.full((n, n), numpy.inf)
+    # Reversing path[i + 1:k + 2] for all i at once, one span (k - i) at a time
+    i = numpy.arange(n)
+    first = path[i + 1]
+    reverse = (service[first], numpy.zeros(n), earliest[first], latest[first])
+    for span in range(1, n):
+        i = i[:-1]
+        c, b = path[i + span + 1], path[i + 1]
+        a, d = path[i], path[i + span + 2]
+        node = (service[c], numpy.zeros(len(i)), earliest[c], latest[c])
+        reverse = concatenate_segments(
+            node, tuple(field[:-1] for field in reverse), times[c, path[i + span]]
+        )
+        total = concatenate_segments(
+            concatenate_segments(tuple(prefix[i].T), reverse, times[a, c]),
+            tuple(suffix[i + span + 2].T),
+            times[b, d],
+        )
+        delta[i, i + span] = (
+            matrix[a, c]
+            + matrix[b, d]
+            - matrix[a, b]
+            - matrix[c, d]
+            + penalty * (total[1] - base_warp)
+        )
+    best = int(numpy.argmin(delta))
+    i, k = divmod(best, n)
+    return float(delta[i, k]), i, k
+
+
+def apply_two_opt(route: numpy.ndarray, i: int, k: int) -> numpy.ndarray:
+    route = route.copy()
+    route[i : k + 1] = route[i : k + 1][::-1]
+    return route
+
+
+def apply_or_opt(
+    route: numpy.ndarray, i: int, length: int, e: int, reverse: bool
+) -> numpy.ndarray:
+    segment = route[i : i + length]
+    if reverse:
+        segment = segment[::-1]
+    if e <= i:
+        parts = [route[:e], segment, route[e:i], route[i + length :]]
+    else:
+        parts = [route[:i], route[i + length : e], segment, route[e:]]
+    return numpy.concatenate(parts).astype(route.dtype)
+
+
+def apply_relocate(
+    route_a: numpy.ndarray, route_b: numpy.ndarray, i: int, e: int
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    return (
+        numpy.delete(route_a, i),
+        numpy.insert(route_b, e, route_a[i]).astype(route_b.dtype),
+    )
+
+
+NUMPY_KERNELS = Kernels(
+    name="numpy",
+    route_cost=route_cost,
+    two_opt_scan=two_opt_scan,
+    or_opt_scan=or_opt_scan,
+    relocate_scan=relocate_scan,
+    two_opt_scan_tw=two_opt_scan_tw,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_kernels(backend: None | str = None) -> Kernels:
+    """The kernels to use, compiled ones if numba is installed.
+
+    Args:
+        backend (str, optional): "numba" or "numpy". Defaults to the
+            'VRP_KERNELS' environment variable, or automatic selection.
+
+    Returns:
+        (Kernels): The kernels.
+    """
+    backend = backend or os.environ.get("VRP_KERNELS", "auto")
+    if backend not in ("auto", "numba", "numpy"):
+        raise ValueError(f"{backend}")
+    if backend in ("auto", "numba"):
+        try:
+            # Imported lazily, as compiling the kernels takes a while
+            from vrp_solver import _numba_kernels
+        except ImportError:
+            if backend == "numba":
+                raise
+        else:
+            return _numba_kernels.NUMBA_KERNELS
+    return NUMPY_KERNELS
@@ -1,25 +1,61 @@
 import json
 import random
 import math
-import pandas as pd
-from scipy.spatial.distance import euclidean
-from scipy.stats import mode
-from sklearn.cluster import KMeans
 from numpy.random import choice, rand
 import logging
 import abc
+import bisect
+import heapq
 import pprint
 import numpy
 import random
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
-from typing import List
+from typing import Callable, Iterator, List, NamedTuple
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import multiprocessing
 import time
+from vrp_solver.distances import DISTANCE_STORAGES, BaseDistances
+from vrp_solver.kernels import (
+    EPSILON,
+    apply_or_opt,
+    apply_two_opt,
+    concatenate_segments,
+    get_kernels,
+    route_segments,
+)
 
+# Heavy dependencies (scikit-learn, scipy, matplotlib and pandas) are imported
+# where they are used, so that importing this module (e.g. by every API worker)
+# stays cheap. They are loaded by the first solve in a process
 
-rng = numpy.random.default_rng(2023)
-numpy.random.seed(2023)
-random.seed(2023)
+
+# Randomness: every solver owns a 'numpy.random.Generator' created from its
+# own seed sequence (see 'BaseSolver'). There is no global random state, so
+# solvers can safely run side by side in threads or processes
+
+
+def _random_state(rng: numpy.random.Generator) -> int:
+    # A seed for libraries that take an integer 'random_state' (scikit-learn)
+    return int(rng.integers(2**31 - 1))
+
+
+# Callables that are notified with (phase, seconds) whenever a timed phase of a
+# solver (e.g. "distance_matrix", "clustering" or "local_search") completes
+phase_listeners: list[Callable[[str, float], None]] = []
+
+
+@contextlib.contextmanager
+def timed_phase(phase: str) -> Iterator[None]:
+    if not phase_listeners:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for listener in phase_listeners:
+            listener(phase, elapsed)
 
 
 class VRP:
@@ -29,22 +65,54 @@ class VRP:
         locations: list[list[float]],
         num_salesmen: int,
         precompute_distances: bool = True,
+        distance_storage: str = "dense",
+        num_neighbors: int = 16,
+        depots: None | list[int] = None,
+        worker_depots: None | list[None | int] = None,
+        distances: None | BaseDistances = None,
     ):
-        # Set the given locations (with depot at index 0)
+        # Set the given locations (the depots and the cities to visit)
         self.locations: list[list[float]] = locations
         # Set the total number of cities to visit
         self.num_locations: int = len(locations)
         # Set the given number of salesmen that should be coordinated and routed between the cities
         self.num_salesmen: int = num_salesmen
-        # Pre-compute the distances between the given cities
-        if precompute_distances is True:
-            self._distance_matrix = self._precompute_distances()
-        else:
-            self._distance_matrix = None
+        # The locations salesmen start from and return to (index 0 by default)
+        self.depots: list[int] = [0] if depots is None else [int(d) for d in depots]
+        # The depot every salesman has to start from and return to, or None if
+        # the solver may choose it (jointly with the route)
+        self.worker_depots: list[None | int] = (
+            [None] * num_salesmen if worker_depots is None else list(worker_depots)
+        )
+        # How distances are stored: "dense" (N x N matrix), "sparse" (k nearest
+        # neighbours per location) or "none" (always computed on the fly)
+        self.distance_storage: str = distance_storage if precompute_distances else "none"
+        self.num_neighbors: int = num_neighbors
+        # Precomputed distances (e.g. loaded with 'distances.load_distances'),
+        # used instead of distances computed from the locations
+        self._precomputed_distances: None | BaseDistances = distances
         # Validate the given input
         self._validate()
+        self.coordinates: numpy.ndarray = numpy.asarray(locations, dtype=numpy.float64)
+        # The locations to visit: all but the depots
+        self.customers: numpy.ndarray = numpy.setdiff1d(
+            numpy.arange(self.num_locations), self.depots
+        )
+        # Pre-compute the distances between the given cities
+        with timed_phase("distance_matrix"):
+            self.distances: BaseDistances = self._precompute_distances()
+            # Distances from every depot to every location (one row per depot),
+            # so the cost of the depot legs of a route is an O(1) lookup
+            self.depot_distances: numpy.ndarray = numpy.stack(
+                [self.distances.row(depot) for depot in self.depots]
+            )
+        self._depot_rows: dict[int, int] = {
+            depot: row for row, depot in enumerate(self.depots)
+        }
 
     def _validate(self):
+        if self.distance_storage not in DISTANCE_STORAGES:
+            raise ValueError(f"{self.distance_storage}")
         # Make sure that at least one depot and a city is given in the list
         if len(self.locations) < 2:
             raise ValueError()
@@ -56,42 +124,288 @@ class VRP:
         # Make sure that at least one salesman can be routed between the locations
         if self.num_salesmen < 1:
             raise ValueError()
+        if len(self.depots) == 0 or len(set(self.depots)) != len(self.depots):
+            raise ValueError(f"{self.depots}")
+        if not all(0 <= depot < len(self.locations) for depot in self.depots):
+            raise ValueError(f"{self.depots}")
+        if len(self.worker_depots) != self.num_salesmen or not all(
+            depot is None or depot in self.depots for depot in self.worker_depots
+        ):
+            raise ValueError(f"{self.worker_depots}")
+        if (
+            self._precomputed_distances is not None
+            and self._precomputed_distances.num_locations != len(self.locations)
+        ):
+            raise ValueError(f"{self._precomputed_distances.num_locations}")
+
+    def _precompute_distances(self) -> BaseDistances:
+        if self._precomputed_distances is not None:
+            return self._precomputed_distances
+        distance_class = DISTANCE_STORAGES[self.distance_storage]
+        if self.distance_storage == "sparse":
+            return distance_class(self.coordinates, num_neighbors=self.num_neighbors)
+        return distance_class(self.coordinates)
+
+    @property
+    def _distance_matrix(self) -> None | numpy.ndarray:
+        # The dense distance matrix, if distances are stored as such
+        return getattr(self.distances, "matrix", None)
 
-    def _precompute_distances(self) -> list[list[float]]:
-        return [
-            [
-                numpy.sqrt((c1[0] - c2[0]) ** 2 + (c1[1] - c2[1]) ** 2)
-                for c1 in self.locations
-            ]
-            for c2 in self.locations
-        ]
+    def distance(self, loc_a: int, loc_b: int) -> float:
+        return self.distances.distance(loc_a, loc_b)
+
+    def depot_cost(
+        self, route: list[int], salesman: None | int = None
+    ) -> tuple[int, float]:
+        """The depot of a route and the distance of its two depot legs.
+
+        Args:
+            route (list[int]): The stops of the route (without the depot).
+            salesman (int, optional): The salesman driving the route. Routes
+                of salesmen without an assigned depot (and routes without a
+                salesman) use the depot closest to their ends.
+
+        Returns:
+            (tuple[int, float]): The depot and the distance from it to the
+                first stop plus the distance from the last stop back to it.
+        """
+        depot = None if salesman is None else self.worker_depots[salesman]
+        if len(route) == 0:
+            return (self.depots[0] if depot is None else depot), 0.0
+        first, last = route[0], route[-1]
+        if depot is not None:
+            row = self.depot_distances[self._depot_rows[depot]]
+            return depot, float(row[first] + row[last])
+        legs = self.depot_distances[:, first] + self.depot_distances[:, last]
+        best = int(numpy.argmin(legs))
+        return self.depots[best], float(legs[best])
+
+    def route_depot(self, route: list[int], salesman: None | int = None) -> int:
+        return self.depot_cost(route, salesman)[0]
+
+    def route_penalty(self, route: list[int], depot: int) -> float:
+        # Cost added to the distance of a route for violated constraints
+        return 0.0
+
+
+class TimeWindowVRP(VRP):
+    """A VRP in which visits take time and may have to happen in a window.
+
+    Times are in seconds from the start of the shift. Every route leaves its
+    depot at the earliest at the start of the depot's window and has to be back by
+    the end of it (the shift ends at 'horizon'). Travel times are taken from
+    'travel_times' if given, otherwise they are the distances divided by
+    'speed' (so distances in meters and a speed in m/s give seconds).
+
+    Violations are measured as time warp: the time by which visits start after
+    their window has closed. Routes are scored by their distance plus
+    'time_warp_penalty' per second of time warp, so solvers can move through
+    infeasible solutions towards feasible ones.
+    """
+
+    def __init__(
+        self,
+        locations: list[list[float]],
+        num_salesmen: int,
+        service_times: None | numpy.ndarray = None,
+        time_windows: None | numpy.ndarray = None,
+        horizon: float = numpy.inf,
+        speed: float = 1.0,
+        travel_times: None | numpy.ndarray = None,
+        time_warp_penalty: float = 1_000.0,
+        **kwargs,
+    ):
+        num_locations = len(locations)
+        # Time spent at every location (e.g. proportional to its demand)
+        self.service_times: numpy.ndarray = (
+            numpy.zeros(num_locations)
+            if service_times is None
+            else numpy.asarray(service_times, dtype=numpy.float64)
+        )
+        windows = (
+            numpy.tile([0.0, horizon], (num_locations, 1))
+            if time_windows is None
+            else numpy.array(time_windows, dtype=numpy.float64)
+        )
+        # Earliest and latest start of service at every location
+        self.earliest: numpy.ndarray = windows[:, 0].copy()
+        self.latest: numpy.ndarray = windows[:, 1].copy()
+        self.horizon: float = horizon
+        for depot in kwargs.get("depots") or [0]:
+            self.latest[depot] = min(self.latest[depot], horizon)
+        self.speed: float = speed
+        self.travel_times: None | numpy.ndarray = (
+            None
+            if travel_times is None
+            else numpy.asarray(travel_times, dtype=numpy.float64)
+        )
+        self.time_warp_penalty: float = time_warp_penalty
+        super().__init__(locations, num_salesmen, **kwargs)
 
-    def _distance(p1: float, p2: float):
-        return numpy.sqrt(numpy.sum(numpy.power(p2 - p1, 2)))
+    def _validate(self):
+        super()._validate()
+        n = len(self.locations)
+        if self.service_times.shape != (n,) or numpy.any(self.service_times < 0):
+            raise ValueError(f"{self.service_times}")
+        if self.earliest.shape != (n,) or numpy.any(self.earliest > self.latest):
+            raise ValueError(f"{self.earliest}, {self.latest}")
+        if self.speed <= 0:
+            raise ValueError(f"{self.speed}")
+        if self.travel_times is not None and self.travel_times.shape != (n, n):
+            raise ValueError(f"{self.travel_times.shape}")
+        if self.time_warp_penalty < 0:
+            raise ValueError(f"{self.time_warp_penalty}")
+
+    def travel_time_pairs(self, rows: numpy.ndarray, cols: numpy.ndarray) -> numpy.ndarray:
+        # Vectorized travel time lookup for many (row, col) pairs
+        if self.travel_times is not None:
+            return self.travel_times[rows, cols]
+        return self.distances.pairs(rows, cols) / self.speed
+
+    def travel_time_submatrix(self, indices: list[int]) -> numpy.ndarray:
+        # Dense matrix of the travel times between a (small) subset of locations
+        indices = numpy.asarray(indices, dtype=numpy.intp)
+        if self.travel_times is not None:
+            return self.travel_times[numpy.ix_(indices, indices)]
+        return self.distances.submatrix(indices) / self.speed
+
+    def route_segments(
+        self, route: list[int], depot: None | int = None
+    ) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """The time window data of every prefix and suffix of a route.
+
+        Args:
+            route (list[int]): The stops of the route (without the depot).
+            depot (int, optional): The depot of the route. Defaults to the
+                depot closest to its ends.
+
+        Returns:
+            (tuple[numpy.ndarray, numpy.ndarray]): The segment data (see
+                'kernels.route_segments') of the tour depot -> route -> depot.
+                Row j of the first array holds the forward data up to tour
+                position j, row j of the second the backward data from it.
+        """
+        depot = self.route_depot(route) if depot is None else depot
+        path = numpy.asarray([depot] + list(route) + [depot], dtype=numpy.intp)
+        # Travel times of the legs of the tour: O(n), unlike a submatrix
+        legs = self.travel_time_pairs(path[:-1], path[1:])
+        return route_segments(
+            numpy.arange(len(path)),
+            legs,
+            self.service_times[path],
+            self.earliest[path],
+            self.latest[path],
+        )
 
-    def distance(self, loc_a: int, loc_b: int) -> float:
-        if self._distance_matrix is not None:
-            return self._distance_matrix[city_a][city_b]
-        else:
-            # return numpy.sqrt(
-            #     (self.locations[loc_a][0] - self.locations[loc_b][0]) ** 2 + \
-            #     (self.locations[loc_a][1] - self.locations[loc_b][1]) ** 2
-            # )
-            self._distance(
-                p1=numpy.array(self.locations[loc_a]),
-                p2=numpy.array(self.locations[loc_b]),
-            )
+    def time_warp(self, route: list[int], depot: None | int = None) -> float:
+        prefix, _ = self.route_segments(route, depot)
+        return float(prefix[-1, 1])
+
+    def route_penalty(self, route: list[int], depot: int) -> float:
+        if len(route) == 0:
+            return 0.0
+        return self.time_warp_penalty * self.time_warp(route, depot)
+
+    def insertion_time_warp(
+        self, route: list[int], customers: numpy.ndarray, depot: None | int = None
+    ) -> numpy.ndarray:
+        """The time warp added to a route by inserting a customer, for every
+        customer and every position, in O(1) per insertion.
+
+        Returns:
+            (numpy.ndarray): Shape (len(customers), len(route) + 1). Entry
+                [c, e] is the time warp added by inserting customers[c] after
+                tour position e (0 is the depot).
+        """
+        depot = self.route_depot(route) if depot is None else depot
+        prefix, suffix = self.route_segments(route, depot)
+        path = numpy.asarray([depot] + list(route) + [depot], dtype=numpy.intp)
+        customers = numpy.asarray(customers, dtype=numpy.intp)[:, None]
+        node = (
+            self.service_times[customers],
+            numpy.zeros(customers.shape),
+            self.earliest[customers],
+            self.latest[customers],
+        )
+        u, v = path[None, :-1], path[None, 1:]
+        total = concatenate_segments(
+            concatenate_segments(
+                tuple(prefix[:-1].T), node, self.travel_time_pairs(u, customers)
+            ),
+            tuple(suffix[1:].T),
+            self.travel_time_pairs(customers, v),
+        )
+        return total[1] - prefix[-1, 1]
+
+    def schedule(self, route: list[int], depot: None | int = None) -> numpy.ndarray:
+        """Start of service at every stop of a route (starting at the depot at
+        the start of its window and waiting for windows to open), followed by
+        the arrival back at the depot.
+        """
+        depot = self.route_depot(route) if depot is None else depot
+        path = [depot] + list(route) + [depot]
+        times = self.travel_time_pairs(
+            numpy.asarray(path[:-1], dtype=numpy.intp),
+            numpy.asarray(path[1:], dtype=numpy.intp),
+        )
+        starts = numpy.empty(len(path) - 1)
+        current = self.earliest[depot] + self.service_times[depot]
+        for j, location in enumerate(path[1:]):
+            arrival = current + times[j]
+            starts[j] = max(arrival, self.earliest[location]) if j < len(route) else arrival
+            current = starts[j] + self.service_times[location]
+        return starts
 
 
 class Individual:
+    """A solution: one route (list of stops) per salesman.
 
-    def __init__(self, chromosome: list[list[int]], generation: int):
+    The cost of every route is cached in 'route_costs', so only changed routes
+    are evaluated again. The routes of an individual are therefore treated as
+    immutable: replace a route with 'set_route' (or build a new individual)
+    instead of changing it in place. Code that does change a route in place
+    has to call 'mark_dirty' for it, otherwise the stale cached cost is used.
+    """
+
+    def __init__(
+        self,
+        chromosome: list[list[int]],
+        generation: int,
+        route_costs: None | list[None | float] = None,
+    ):
         # Solution representation:
         # - Assume that a multipart chromosome is used
         self.chromosome: list[list[int]] = chromosome
         # The corresponding fitness value of the solution
         self.fitness: None | float = None
         self.generation: int = generation
+        # Cached cost of every route, None for routes that are dirty (changed
+        # since their cost was computed)
+        self.route_costs: list[None | float] = (
+            [None] * len(chromosome) if route_costs is None else list(route_costs)
+        )
+
+    def set_route(self, index: int, route: list[int], cost: None | float = None):
+        # Replace a route along with its cost (None if it is unknown, in which
+        # case it is computed when the individual is evaluated next)
+        self.chromosome[index] = route
+        self.route_costs[index] = cost
+        self.fitness = None
+
+    def mark_dirty(self, *routes: int):
+        # Invalidate the cached costs of the given routes (all if none given)
+        for index in routes or range(len(self.route_costs)):
+            self.route_costs[index] = None
+        self.fitness = None
+
+    def inherit_costs(self, parent: "Individual"):
+        # Reuse the cached costs of the routes that equal the parent's route of
+        # the same salesman
+        for index, (route, parent_route) in enumerate(
+            zip(self.chromosome, parent.chromosome)
+        ):
+            if self.route_costs[index] is None and route == parent_route:
+                self.route_costs[index] = parent.route_costs[index]
 
     def pprint(self):
         # Explicitly write out the chomosome when the 'Individual' object is printed
@@ -114,7 +428,8 @@ class Individual:
 class BaseFitnessFunction(abc.ABC):
 
     def __init__(self):
-        pass
+        # The number of individuals evaluated so far
+        self.evaluations: int = 0
 
     @abc.abstractmethod
     def evaluate(self, individual: Individual):
@@ -128,16 +443,62 @@ class BasePopulationInitializer(abc.ABC):
         population_size: int,
         vrp_instance: VRP,
         fitness_function_instance: BaseFitnessFunction,
+        rng: None | numpy.random.Generator = None,
     ):
         self.population_size: int = population_size
         self.vrp_instance: VRP = vrp_instance
         self.fitness_function_instance: BaseFitnessFunction = fitness_function_instance
+        self.rng: numpy.random.Generator = (
+            rng if rng is not None else numpy.random.default_rng()
+        )
 
     @abc.abstractmethod
     def generate(self):
         pass
 
 
+class SolverProgress(NamedTuple):
+    # A progress report of a running solver
+    iteration: int
+    best_fitness: float
+    evaluations: int
+    elapsed: float
+
+
+# Layout of a convergence trace: one row per progress report
+TRACE_DTYPE = numpy.dtype(
+    [
+        ("iteration", numpy.int32),
+        ("best_fitness", numpy.float64),
+        ("evaluations", numpy.int64),
+        ("elapsed", numpy.float32),
+    ]
+)
+
+
+class ConvergenceTrace:
+    """Solver callback that records the progress reports.
+
+    The recorded trace is available as a structured numpy array (see
+    'TRACE_DTYPE'), which takes 24 bytes per report. With 'max_reports' set,
+    every other report is dropped whenever the trace grows beyond it, so long
+    runs keep an evenly thinned trace of bounded size. The first and the most
+    recent report are always kept.
+    """
+
+    def __init__(self, max_reports: None | int = None):
+        self.reports: list[SolverProgress] = []
+        self.max_reports: None | int = max_reports
+
+    def __call__(self, progress: SolverProgress):
+        self.reports.append(progress)
+        if self.max_reports is not None and len(self.reports) > self.max_reports:
+            self.reports = self.reports[:-1][::2] + self.reports[-1:]
+
+    def to_array(self) -> numpy.ndarray:
+        return numpy.array(self.reports, dtype=TRACE_DTYPE)
+
+
 class BaseSolver(abc.ABC):
 
     def __init__(
@@ -146,9 +507,20 @@ class BaseSolver(abc.ABC):
         population_size: int,
         population_initializer_class: BasePopulationInitializer,
         fitness_function_class: BaseFitnessFunction,
+        callbacks: None | list[Callable[[SolverProgress], None]] = None,
+        progress_interval: int = 1,
+        seed: None | int | numpy.random.SeedSequence = None,
     ):
         self.vrp_instance = vrp_instance
         self.population_size: int = population_size
+        # The solver's source of randomness. Runs are reproducible for a given
+        # seed and independent generators can be spawned from the sequence
+        self.seed_sequence: numpy.random.SeedSequence = (
+            seed
+            if isinstance(seed, numpy.random.SeedSequence)
+            else numpy.random.SeedSequence(seed)
+        )
+        self.rng: numpy.random.Generator = numpy.random.default_rng(self.seed_sequence)
         # Instantiate fitness function class
         self.fitness_function_instance = fitness_function_class(
             vrp_instance=vrp_instance,
@@ -158,14 +530,54 @@ class BaseSolver(abc.ABC):
             population_size=self.population_size,
             vrp_instance=vrp_instance,
             fitness_function_instance=self.fitness_function_instance,
+            rng=self.rng,
         )
         # self.population: None | Population = None
-        # self.solution_history: list = [] # TODO
+        # Callables that receive a 'SolverProgress' report every
+        # 'progress_interval' iterations and once when the solver finishes
+        self.callbacks: list[Callable[[SolverProgress], None]] = list(callbacks or [])
+        self.progress_interval: int = progress_interval
+        self.iteration: int = 0
+        self.best_fitness: float = 0.0
+        # Candidate moves evaluated by local search (without evaluating the
+        # fitness of a complete individual)
+        self.move_evaluations: int = 0
+        self._start_time: float = time.perf_counter()
         self._validate()
 
     def _validate(self):
         if self.population_size < 1:
             raise ValueError(f"{self.population_size}")
+        if self.progress_interval < 1:
+            raise ValueError(f"{self.progress_interval}")
+
+    @property
+    def evaluations(self) -> int:
+        return self.fitness_function_instance.evaluations + self.move_evaluations
+
+    def _start_progress(self):
+        self.iteration = 0
+        self.best_fitness = 0.0
+        self.move_evaluations = 0
+        self.fitness_function_instance.evaluations = 0
+        self._start_time = time.perf_counter()
+
+    def _report_progress(self, fitness: float, force: bool = False):
+        # Keep track of the best fitness seen and notify the callbacks at the
+        # configured interval (or unconditionally when 'force' is given)
+        if fitness is not None and fitness > self.best_fitness:
+            self.best_fitness = fitness
+        if not self.callbacks:
+            return
+        if force or self.iteration % self.progress_interval == 0:
+            progress = SolverProgress(
+                iteration=self.iteration,
+                best_fitness=self.best_fitness,
+                evaluations=self.evaluations,
+                elapsed=time.perf_counter() - self._start_time,
+            )
+            for callback in self.callbacks:
+                callback(progress)
 
     @abc.abstractmethod
     def _initialization(self):
@@ -203,8 +615,8 @@ class Population:
     def __add__(self, other_population):
         return Population(self.individuals + other_population.individuals)
 
-    def random_pick(self) -> Individual:
-        return random.choice(self.individuals)
+    def random_pick(self, rng: numpy.random.Generator) -> Individual:
+        return self.individuals[rng.integers(len(self.individuals))]
 
     def size(self) -> int:
         return len(self.individuals)
@@ -225,22 +637,36 @@ class Population:
         return self.individuals[:k]
 
 
-def route_cost(vrp_instance: VRP, route: list[int]):
-    total_distance = 0.0
+def route_cost(
+    vrp_instance: VRP,
+    route: list[int],
+    salesman: None | int = None,
+    depot: None | int = None,
+) -> float:
+    """The cost of a route: its distance plus the penalties of the instance.
+
+    Args:
+        vrp_instance (VRP): The instance.
+        route (list[int]): The stops of the route (without the depot).
+        salesman (int, optional): The salesman driving the route, which
+            determines its depot (see 'VRP.depot_cost').
+        depot (int, optional): Use this depot instead.
+
+    Returns:
+        (float): The cost.
+    """
     if len(route) == 0:
-        # distance = numpy.inf
-        distance = 0.0
+        return 0.0
+    if depot is None:
+        depot, legs = vrp_instance.depot_cost(route, salesman)
     else:
-        # Distance from depot to first stop + distance from last to to depot
-        distance = (
-            vrp_instance._distance_matrix[0][route[0]]
-            + vrp_instance._distance_matrix[route[-1]][0]
-        )
-        # All distances in between
-        for i in range(1, len(route)):
-            distance += vrp_instance._distance_matrix[route[i - 1]][route[i]]
-    total_distance += distance
-    return total_distance
+        row = vrp_instance.depot_distances[vrp_instance._depot_rows[depot]]
+        legs = float(row[route[0]] + row[route[-1]])
+    # Distance from the depot to the first stop, all distances in between
+    # and the distance from the last stop back to the depot
+    distance = legs + vrp_instance.distances.path_cost(list(route))
+    # Penalties of constraints (e.g. time windows) of the instance
+    return distance + vrp_instance.route_penalty(route, depot)
 
 
 class TwoOptSolver(BaseSolver):
@@ -251,63 +677,962 @@ class TwoOptSolver(BaseSolver):
         population_size: int,
         population_initializer_class: BasePopulationInitializer,
         fitness_function_class: BaseFitnessFunction,
+        callbacks: None | list[Callable[[SolverProgress], None]] = None,
+        progress_interval: int = 1,
+        or_opt: bool = False,
+        or_opt_segment: int = 3,
+        max_moves: None | int = None,
+        seed: None | int | numpy.random.SeedSequence = None,
     ):
+        # Also move segments of up to 'or_opt_segment' stops within a route
+        # once no 2-opt move improves it
+        self.or_opt: bool = or_opt
+        self.or_opt_segment: int = or_opt_segment
+        # The most moves applied to a route in one pass (defaults to 100 per
+        # stop). Only a safety net: every move lowers the cost, unless the
+        # distances are not symmetric, as the kernels assume
+        self.max_moves: None | int = max_moves
         super().__init__(
             vrp_instance,
             population_size,
             population_initializer_class,
             fitness_function_class,
+            callbacks=callbacks,
+            progress_interval=progress_interval,
+            seed=seed,
         )
 
     def _initialization(self):
         return self.population_initializer_instance.generate()
 
-    def two_opt(self, individual: Individual, improvement_threshold: float = 0.001):
-        # Reverse the order of all elements from element i to element k in array r.
-        # two_opt_swap = lambda r, i, k: numpy.concatenate((r[0:i], r[k:-len(r)+i-1:-1], r[k+1:len(r)]))
-        # two_opt_swap = lambda r, i, k: r[0:i] + r[k:-len(r)+i-1:-1] + r[k+1:len(r)]
-        def two_opt_swap(route, i, k):
-            # return numpy.concatenate((route[:i], route[i:k+1][::-1], route[k+1:]))
-            return route[:i] + route[i : k + 1][::-1] + route[k + 1 :]
-
-        _routes = []
-        for route in individual.chromosome:
-            if len(route) > 0:
-                _route = route.copy()
-                best_cost = route_cost(self.vrp_instance, _route)
-                improvement_factor = 1
-                while improvement_factor > improvement_threshold:
-                    cost_to_beat = best_cost
-                    for swap_first in range(0, len(_route) - 1):
-                        for swap_last in range(swap_first + 1, len(_route)):
-                            new_route = two_opt_swap(_route, swap_first, swap_last)
-                            new_cost = route_cost(self.vrp_instance, new_route)
-                            if new_cost < best_cost:
-                                _route = new_route
-                                best_cost = new_cost
-                    improvement_factor = 1 - best_cost / cost_to_beat
-            _routes.append(_route)
-        individual = Individual(
-            chromosome=_routes,
+    def two_opt(self, individual: Individual, improvement_threshold: float = 0.0):
+        # Repeatedly apply the best 2-opt move (and, if enabled, the best Or-opt
+        # move once 2-opt is exhausted) to every route until no move improves
+        # the route by more than 'improvement_threshold' times its cost. Every
+        # applied move counts as an iteration
+        # With several depots, a route is improved for its depot, after which
+        # the depot closest to its new ends is chosen. This repeats until the
+        # depot no longer changes (every step lowers the cost)
+        # Cost of every route of the individual, to report its total cost.
+        # Updated with every move and cached on the improved individual
+        costs = [
+            route_cost(self.vrp_instance, route, salesman) if cost is None else cost
+            for salesman, (route, cost) in enumerate(
+                zip(individual.chromosome, individual.route_costs)
+            )
+        ]
+        # The routes are shared with the given individual until they are
+        # replaced (routes are never changed in place)
+        improved = Individual(
+            chromosome=list(individual.chromosome),
             generation=0,
+            route_costs=costs,
         )
-        return individual
+        for index, route in enumerate(individual.chromosome):
+            _route = route.copy()
+            depot = self.vrp_instance.route_depot(_route, index)
+            while len(_route) > 1:
+                _route = self._two_opt_route(
+                    _route, depot, costs, index, improvement_threshold
+                )
+                next_depot = self.vrp_instance.route_depot(_route, index)
+                if next_depot == depot:
+                    break
+                depot = next_depot
+                costs[index] = route_cost(self.vrp_instance, _route, index)
+            improved.set_route(index, _route, costs[index])
+        return improved
+
+    def _two_opt_route(
+        self,
+        route: list[int],
+        depot: int,
+        costs: list[float],
+        index: int,
+        improvement_threshold: float,
+    ) -> list[int]:
+        kernels = get_kernels()
+        # Routes of instances with time windows are scanned with the time warp
+        # of every move, checked in O(1) each
+        time_windows = isinstance(self.vrp_instance, TimeWindowVRP)
+        # Dense distances between the depot (row 0) and the stops of the route,
+        # whichever way the instance stores its distances
+        path = [depot] + route
+        matrix = self.vrp_instance.distances.submatrix(path)
+        local_route = numpy.arange(1, len(route) + 1, dtype=numpy.int32)
+        n = len(route)
+        if time_windows:
+            # Time window data in the same local indices as 'matrix'. The scan
+            # reverses segments, so it needs the travel times of all pairs
+            times = self.vrp_instance.travel_time_submatrix(path)
+            windows = (
+                self.vrp_instance.service_times[path],
+                self.vrp_instance.earliest[path],
+                self.vrp_instance.latest[path],
+                self.vrp_instance.time_warp_penalty,
+            )
+        max_moves = 100 * n if self.max_moves is None else self.max_moves
+        for _ in range(max_moves):
+            threshold = max(improvement_threshold * costs[index], EPSILON)
+            if time_windows:
+                delta, i, k = kernels.two_opt_scan_tw(
+                    matrix, local_route, 0, times, *windows
+                )
+            else:
+                delta, i, k = kernels.two_opt_scan(matrix, local_route, 0)
+            self.move_evaluations += n * (n - 1) // 2
+            if delta < -threshold:
+                local_route = apply_two_opt(local_route, i, k)
+            elif self.or_opt:
+                delta, i, length, e, reverse = kernels.or_opt_scan(
+                    matrix, local_route, 0, self.or_opt_segment
+                )
+                self.move_evaluations += n * (n + 1) * self.or_opt_segment
+                if delta >= -threshold:
+                    break
+                candidate = apply_or_opt(local_route, i, length, e, reverse)
+                if time_windows:
+                    # Or-opt moves are chosen by distance only: keep them only
+                    # if they still improve with time warp
+                    delta = route_cost(
+                        self.vrp_instance,
+                        [route[j - 1] for j in candidate],
+                        depot=depot,
+                    ) - costs[index]
+                    if delta >= -threshold:
+                        break
+                local_route = candidate
+            else:
+                break
+            costs[index] += delta
+            self.iteration += 1
+            total_cost = sum(costs)
+            self._report_progress(1.0 / total_cost if total_cost > 0 else 0.0)
+        return [route[j - 1] for j in local_route]
 
     def run(self):
+        self._start_progress()
         population = self._initialization()
         population.sort(reverse=True)
+        self._report_progress(population[0].fitness)
         # return population
         individuals = []
-        for individual in population.individuals:
-            individual = self.two_opt(individual=individual)
-            individuals.append(individual)
-        individuals = [
-            self.fitness_function_instance.evaluate(individual)
-            for individual in individuals
+        with timed_phase("local_search"):
+            for individual in population.individuals:
+                individual = self.two_opt(individual=individual)
+                individuals.append(individual)
+            individuals = [
+                self.fitness_function_instance.evaluate(individual)
+                for individual in individuals
+            ]
+
+        population = Population(individuals=individuals)
+        population.sort(reverse=True)
+        self._report_progress(population[0].fitness, force=True)
+        return population
+
+
+def _solve_subproblem(
+    locations: list[list[float]],
+    population_size: int,
+    solver_class: BaseSolver,
+    population_initializer_class: BasePopulationInitializer,
+    fitness_function_class: BaseFitnessFunction,
+    seed: numpy.random.SeedSequence,
+) -> tuple[list[int], int]:
+    # Route a single salesman through a sub-problem and return the route and
+    # the number of evaluations. The location at index 0 is the (possibly
+    # virtual) depot of the sub-problem. Defined at module level, so it can be
+    # dispatched to worker processes
+    vrp_instance = VRP(
+        locations=locations,
+        num_salesmen=1,
+        precompute_distances=True,
+    )
+    solver = solver_class(
+        vrp_instance=vrp_instance,
+        population_size=population_size,
+        population_initializer_class=population_initializer_class,
+        fitness_function_class=fitness_function_class,
+        seed=seed,
+    )
+    best_solution = solver.run().get_topk(k=1)[0]
+    return best_solution.chromosome[0], solver.evaluations
+
+
+def _two_opt_path(path: list[int], vrp_instance: VRP) -> list[int]:
+    # Improve an open path with 2-opt moves while keeping its first and last
+    # location fixed. Only intended for short paths (boundary windows)
+    distances = vrp_instance.distances.submatrix(path)
+    order = list(range(len(path)))
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(order) - 2):
+            for k in range(i + 1, len(order) - 1):
+                a, b, c, d = order[i - 1], order[i], order[k], order[k + 1]
+                delta = (
+                    distances[a][c]
+                    + distances[b][d]
+                    - distances[a][b]
+                    - distances[c][d]
+                )
+                if delta < -1e-12:
+                    order[i : k + 1] = order[i : k + 1][::-1]
+                    improved = True
+    return [path[index] for index in order]
+
+
+class DecompositionSolver(BaseSolver):
+    """Cluster-first, route-second solver for very large instances.
+
+    The customers are partitioned into one geographic region per salesman with
+    KMeans. Regions larger than 'subproblem_size' are split further into chunks
+    that are visited in nearest-neighbour order. Every chunk is routed
+    independently (optionally in parallel processes) by 'subproblem_solver_class'
+    and the resulting tours are stitched together, after which the paths around
+    each junction are repaired with 2-opt.
+
+    Memory use is bounded by the size of the sub-problems, so the given
+    'vrp_instance' should not store a dense distance matrix. Instances with
+    several depots are not supported.
+    """
+
+    def __init__(
+        self,
+        vrp_instance: VRP,
+        population_size: int,
+        population_initializer_class: BasePopulationInitializer,
+        fitness_function_class: BaseFitnessFunction,
+        subproblem_size: int = 100,
+        subproblem_solver_class: BaseSolver = TwoOptSolver,
+        boundary_window: int = 8,
+        n_jobs: int = 1,
+        callbacks: None | list[Callable[[SolverProgress], None]] = None,
+        progress_interval: int = 1,
+        seed: None | int | numpy.random.SeedSequence = None,
+    ):
+        self.subproblem_size: int = subproblem_size
+        self.subproblem_solver_class: BaseSolver = subproblem_solver_class
+        self.boundary_window: int = boundary_window
+        self.n_jobs: int = n_jobs
+        # Kept to instantiate the sub-problem solvers
+        self.population_initializer_class = population_initializer_class
+        self.fitness_function_class = fitness_function_class
+        # Evaluations of the sub-problem solvers (possibly in other processes)
+        self.subproblem_evaluations: int = 0
+        super().__init__(
+            vrp_instance,
+            population_size,
+            population_initializer_class,
+            fitness_function_class,
+            callbacks=callbacks,
+            progress_interval=progress_interval,
+            seed=seed,
+        )
+
+    def _validate(self):
+        super()._validate()
+        if self.subproblem_size < 2:
+            raise ValueError(f"{self.subproblem_size}")
+        if self.n_jobs < 1:
+            raise ValueError(f"{self.n_jobs}")
+        if len(self.vrp_instance.depots) > 1:
+            raise ValueError(f"{self.vrp_instance.depots}")
+
+    @property
+    def evaluations(self) -> int:
+        return super().evaluations + self.subproblem_evaluations
+
+    def _initialization(self) -> list[list[numpy.ndarray]]:
+        # Partition the customers (global location indices) into one region per
+        # salesman and split each region into chunks of bounded size
+        coordinates = self.vrp_instance.coordinates
+        customers = self.vrp_instance.customers
+        num_regions = min(self.vrp_instance.num_salesmen, len(customers))
+        from sklearn.cluster import KMeans
+
+        with timed_phase("clustering"):
+            labels = KMeans(
+                n_clusters=num_regions, random_state=_random_state(self.rng)
+            ).fit_predict(
+                coordinates[customers]
+            )
+            regions = []
+            for region in range(self.vrp_instance.num_salesmen):
+                members = customers[labels == region]
+                regions.append(self._split_region(members))
+        return regions
+
+    def _split_region(self, members: numpy.ndarray) -> list[numpy.ndarray]:
+        if len(members) <= self.subproblem_size:
+            return [members] if len(members) > 0 else []
+        from sklearn.cluster import KMeans
+
+        coordinates = self.vrp_instance.coordinates
+        num_chunks = int(numpy.ceil(len(members) / self.subproblem_size))
+        kmeans_result = KMeans(
+            n_clusters=num_chunks, random_state=_random_state(self.rng)
+        ).fit(coordinates[members])
+        chunks = [members[kmeans_result.labels_ == i] for i in range(num_chunks)]
+        # Visit the chunks in nearest-neighbour order starting from the depot
+        centroids = kmeans_result.cluster_centers_
+        unvisited = list(range(num_chunks))
+        depot = self.vrp_instance.depots[0]
+        position = coordinates[depot]
+        ordered_chunks = []
+        while unvisited:
+            distances = numpy.sum((centroids[unvisited] - position) ** 2, axis=1)
+            nearest = unvisited.pop(int(numpy.argmin(distances)))
+            ordered_chunks.append(chunks[nearest])
+            position = centroids[nearest]
+        # Chunks that are larger than the limit (KMeans does not balance sizes)
+        # are split recursively
+        return [
+            split_chunk
+            for chunk in ordered_chunks
+            for split_chunk in (
+                self._split_region(chunk)
+                if len(chunk) > self.subproblem_size and len(chunk) < len(members)
+                else [chunk]
+            )
         ]
 
+    def _solve_chunks(self, chunks: list[numpy.ndarray]) -> list[list[int]]:
+        # Each chunk is routed as a closed tour around its own centroid, which
+        # acts as a virtual depot. The tours are opened up when stitched
+        coordinates = self.vrp_instance.coordinates
+        subproblems = [
+            [coordinates[chunk].mean(axis=0).tolist()] + coordinates[chunk].tolist()
+            for chunk in chunks
+        ]
+        args = (
+            self.population_size,
+            self.subproblem_solver_class,
+            self.population_initializer_class,
+            self.fitness_function_class,
+        )
+        # Every sub-problem gets its own seed, so the result does not depend on
+        # which process solves it
+        seeds = self.seed_sequence.spawn(len(subproblems))
+        if self.n_jobs == 1:
+            results = [
+                _solve_subproblem(sub, *args, seed)
+                for sub, seed in zip(subproblems, seeds)
+            ]
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+                futures = [
+                    executor.submit(_solve_subproblem, sub, *args, seed)
+                    for sub, seed in zip(subproblems, seeds)
+                ]
+                results = [future.result() for future in futures]
+        local_tours = [tour for tour, _ in results]
+        self.subproblem_evaluations += sum(evaluations for _, evaluations in results)
+        # Map local (1-based) sub-problem indices back to global indices
+        return [
+            [int(chunk[index - 1]) for index in tour]
+            for chunk, tour in zip(chunks, local_tours)
+        ]
+
+    def _orient_tour(
+        self, tour: list[int], entry: numpy.ndarray, exit: numpy.ndarray
+    ) -> list[int]:
+        # Open a closed tour at the location nearest to the entry point and
+        # traverse it in the direction that ends nearest to the exit point
+        coordinates = self.vrp_instance.coordinates
+        start = int(numpy.argmin(numpy.sum((coordinates[tour] - entry) ** 2, axis=1)))
+        forward = tour[start:] + tour[:start]
+        backward = [forward[0]] + forward[1:][::-1]
+        if numpy.sum((coordinates[backward[-1]] - exit) ** 2) < numpy.sum(
+            (coordinates[forward[-1]] - exit) ** 2
+        ):
+            return backward
+        return forward
+
+    def _stitch(self, tours: list[list[int]]) -> list[int]:
+        coordinates = self.vrp_instance.coordinates
+        depot = coordinates[self.vrp_instance.depots[0]]
+        route = []
+        junctions = []
+        for i, tour in enumerate(tours):
+            entry = coordinates[route[-1]] if route else depot
+            exit = (
+                coordinates[tours[i + 1]].mean(axis=0) if i + 1 < len(tours) else depot
+            )
+            if route:
+                junctions.append(len(route))
+            route.extend(self._orient_tour(tour, entry, exit))
+        # Repair the paths around the junctions between consecutive chunks. The
+        # path includes the depot at both ends, so window bounds never move it
+        path = [self.vrp_instance.depots[0]] + route + [self.vrp_instance.depots[0]]
+        for junction in junctions:
+            # Position 'junction' in the route is position 'junction + 1' in path
+            lo = max(0, junction + 1 - self.boundary_window)
+            hi = min(len(path) - 1, junction + self.boundary_window)
+            path[lo : hi + 1] = _two_opt_path(path[lo : hi + 1], self.vrp_instance)
+        return path[1:-1]
+
+    def run(self) -> Population:
+        # The decomposition is solved in a single iteration
+        self._start_progress()
+        self.subproblem_evaluations = 0
+        regions = self._initialization()
+        # Solve all chunks of all regions in one go, to keep every process busy
+        chunks = [chunk for region in regions for chunk in region]
+        with timed_phase("subproblems"):
+            tours = iter(self._solve_chunks(chunks))
+        with timed_phase("stitching"):
+            chromosome = [
+                self._stitch([next(tours) for _ in region]) for region in regions
+            ]
+        individual = self.fitness_function_instance.evaluate(
+            Individual(chromosome=chromosome, generation=0)
+        )
+        self.iteration += 1
+        self._report_progress(individual.fitness, force=True)
+        return Population(individuals=[individual])
+
+
+def _run_start(
+    vrp_instance: VRP,
+    population_size: int,
+    solver_class: BaseSolver,
+    population_initializer_class: BasePopulationInitializer,
+    fitness_function_class: BaseFitnessFunction,
+    solver_kwargs: dict,
+    seed: numpy.random.SeedSequence,
+) -> tuple[Individual, int]:
+    # Run a single start of a multi-start solve and return its best solution
+    # and the number of evaluations. Defined at module level, so it can be
+    # dispatched to worker processes
+    solver = solver_class(
+        vrp_instance=vrp_instance,
+        population_size=population_size,
+        population_initializer_class=population_initializer_class,
+        fitness_function_class=fitness_function_class,
+        seed=seed,
+        **solver_kwargs,
+    )
+    best_solution = solver.run().get_topk(k=1)[0]
+    return best_solution, solver.evaluations
+
+
+class MultiStartSolver(BaseSolver):
+    """Run 'num_starts' independent instances of 'solver_class' and keep the
+    best solution.
+
+    Every start gets its own seed spawned from the seed sequence of this
+    solver, so a run is reproducible from its (master) seed regardless of
+    'n_jobs', the number of worker processes the starts are spread over. Ties
+    are broken in favour of the earliest start.
+    """
+
+    def __init__(
+        self,
+        vrp_instance: VRP,
+        population_size: int,
+        population_initializer_class: BasePopulationInitializer,
+        fitness_function_class: BaseFitnessFunction,
+        solver_class: BaseSolver = TwoOptSolver,
+        solver_kwargs: None | dict = None,
+        num_starts: int = 4,
+        n_jobs: int = 1,
+        callbacks: None | list[Callable[[SolverProgress], None]] = None,
+        progress_interval: int = 1,
+        seed: None | int | numpy.random.SeedSequence = None,
+    ):
+        self.solver_class: BaseSolver = solver_class
+        self.solver_kwargs: dict = dict(solver_kwargs or {})
+        self.num_starts: int = num_starts
+        self.n_jobs: int = n_jobs
+        # Kept to instantiate the solver of every start
+        self.population_initializer_class = population_initializer_class
+        self.fitness_function_class = fitness_function_class
+        # Evaluations done by the individual starts
+        self.start_evaluations: int = 0
+        super().__init__(
+            vrp_instance,
+            population_size,
+            population_initializer_class,
+            fitness_function_class,
+            callbacks=callbacks,
+            progress_interval=progress_interval,
+            seed=seed,
+        )
+
+    def _validate(self):
+        super()._validate()
+        if self.num_starts < 1:
+            raise ValueError(f"{self.num_starts}")
+        if self.n_jobs < 1:
+            raise ValueError(f"{self.n_jobs}")
+
+    @property
+    def evaluations(self) -> int:
+        return super().evaluations + self.start_evaluations
+
+    def _initialization(self) -> list[numpy.random.SeedSequence]:
+        return self.seed_sequence.spawn(self.num_starts)
+
+    def run(self) -> Population:
+        # Every completed start counts as an iteration
+        self._start_progress()
+        self.start_evaluations = 0
+        seeds = self._initialization()
+        args = (
+            self.vrp_instance,
+            self.population_size,
+            self.solver_class,
+            self.population_initializer_class,
+            self.fitness_function_class,
+            self.solver_kwargs,
+        )
+        individuals = []
+        with contextlib.ExitStack() as stack:
+            if self.n_jobs == 1:
+                results = (_run_start(*args, seed) for seed in seeds)
+            else:
+                executor = stack.enter_context(
+                    ProcessPoolExecutor(max_workers=self.n_jobs)
+                )
+                futures = [executor.submit(_run_start, *args, seed) for seed in seeds]
+                results = (future.result() for future in futures)
+            for individual, evaluations in results:
+                individuals.append(individual)
+                self.start_evaluations += evaluations
+                self.iteration += 1
+                self._report_progress(individual.fitness)
         population = Population(individuals=individuals)
+        # Sorting is stable, so ties keep the order of the starts
         population.sort(reverse=True)
+        self._report_progress(population[0].fitness, force=True)
+        return population
+
+
+class GeneticSolver(BaseSolver):
+    """Generational genetic algorithm with elitism.
+
+    Parents are chosen by tournament selection. Offspring are created by order
+    crossover (OX) of the parents' routes concatenated into a single tour,
+    which is split back into routes of the first parent's lengths, followed by
+    a random mutation (swapping two stops, relocating a stop to another route
+    or reversing a segment of a route). Every generation counts as an
+    iteration.
+    """
+
+    def __init__(
+        self,
+        vrp_instance: VRP,
+        population_size: int,
+        population_initializer_class: BasePopulationInitializer,
+        fitness_function_class: BaseFitnessFunction,
+        num_generations: int = 100,
+        tournament_size: int = 3,
+        crossover_rate: float = 0.9,
+        mutation_rate: float = 0.3,
+        elite_size: int = 2,
+        callbacks: None | list[Callable[[SolverProgress], None]] = None,
+        progress_interval: int = 1,
+        seed: None | int | numpy.random.SeedSequence = None,
+    ):
+        self.num_generations: int = num_generations
+        self.tournament_size: int = tournament_size
+        self.crossover_rate: float = crossover_rate
+        self.mutation_rate: float = mutation_rate
+        self.elite_size: int = elite_size
+        super().__init__(
+            vrp_instance,
+            population_size,
+            population_initializer_class,
+            fitness_function_class,
+            callbacks=callbacks,
+            progress_interval=progress_interval,
+            seed=seed,
+        )
+
+    def _validate(self):
+        super()._validate()
+        if self.num_generations < 0:
+            raise ValueError(f"{self.num_generations}")
+        if self.tournament_size < 1:
+            raise ValueError(f"{self.tournament_size}")
+        if not 0 <= self.elite_size <= self.population_size:
+            raise ValueError(f"{self.elite_size}")
+
+    def _initialization(self) -> Population:
+        population = self.population_initializer_instance.generate()
+        population.sort(reverse=True)
+        return population
+
+    def _select(self, population: Population) -> Individual:
+        # Tournament selection: the fittest of a few random individuals
+        contestants = self.rng.integers(len(population), size=self.tournament_size)
+        return max((population[i] for i in contestants), key=lambda x: x.fitness)
+
+    def _crossover(self, parent_a: Individual, parent_b: Individual) -> list[list[int]]:
+        tour_a = [stop for route in parent_a.chromosome for stop in route]
+        tour_b = [stop for route in parent_b.chromosome for stop in route]
+        if len(tour_a) < 2:
+            return [route.copy() for route in parent_a.chromosome]
+        i, j = sorted(self.rng.choice(len(tour_a) + 1, size=2, replace=False))
+        segment = tour_a[i:j]
+        in_segment = set(segment)
+        rest = [stop for stop in tour_b if stop not in in_segment]
+        tour = rest[:i] + segment + rest[i:]
+        chromosome = []
+        start = 0
+        for route in parent_a.chromosome:
+            chromosome.append(tour[start : start + len(route)])
+            start += len(route)
+        return chromosome
+
+    def _mutate(self, chromosome: list[list[int]]) -> list[list[int]]:
+        positions = [
+            (r, i) for r, route in enumerate(chromosome) for i in range(len(route))
+        ]
+        if len(positions) < 2:
+            return chromosome
+        operator = self.rng.integers(3)
+        if operator == 0:
+            # Swap two stops (possibly of different routes)
+            a, b = self.rng.choice(len(positions), size=2, replace=False)
+            (ra, ia), (rb, ib) = positions[a], positions[b]
+            chromosome[ra][ia], chromosome[rb][ib] = chromosome[rb][ib], chromosome[ra][ia]
+        elif operator == 1:
+            # Relocate a stop to a random position of a random route
+            r, i = positions[self.rng.integers(len(positions))]
+            stop = chromosome[r].pop(i)
+            target = chromosome[self.rng.integers(len(chromosome))]
+            target.insert(self.rng.integers(len(target) + 1), stop)
+        else:
+            # Reverse a segment of a route
+            candidates = [r for r, route in enumerate(chromosome) if len(route) > 1]
+            if candidates:
+                route = chromosome[candidates[self.rng.integers(len(candidates))]]
+                i, k = sorted(self.rng.choice(len(route), size=2, replace=False))
+                route[i : k + 1] = route[i : k + 1][::-1]
+        return chromosome
+
+    def evolve(self, population: Population, generation: int) -> Population:
+        """Create the next generation of a (sorted) population.
+
+        Args:
+            population (Population): The current population, fittest first.
+            generation (int): The number of the new generation.
+
+        Returns:
+            (Population): The next population, fittest first.
+        """
+        individuals = population.individuals[: self.elite_size]
+        while len(individuals) < self.population_size:
+            parent_a = self._select(population)
+            if self.rng.random() < self.crossover_rate:
+                chromosome = self._crossover(parent_a, self._select(population))
+            else:
+                chromosome = [route.copy() for route in parent_a.chromosome]
+            if self.rng.random() < self.mutation_rate:
+                chromosome = self._mutate(chromosome)
+            offspring = Individual(chromosome=chromosome, generation=generation)
+            # Only the routes that differ from the first parent are evaluated
+            offspring.inherit_costs(parent_a)
+            individuals.append(self.fitness_function_instance.evaluate(offspring))
+        population = Population(individuals=individuals)
+        population.sort(reverse=True)
+        return population
+
+    def run(self) -> Population:
+        self._start_progress()
+        population = self._initialization()
+        self._report_progress(population[0].fitness)
+        for generation in range(1, self.num_generations + 1):
+            population = self.evolve(population, generation)
+            self.iteration += 1
+            self._report_progress(population[0].fitness)
+        self._report_progress(population[0].fitness, force=True)
+        return population
+
+
+def _copy_individual(individual: Individual) -> Individual:
+    copy = Individual(
+        chromosome=[route.copy() for route in individual.chromosome],
+        generation=individual.generation,
+        route_costs=individual.route_costs,
+    )
+    copy.fitness = individual.fitness
+    return copy
+
+
+class _Island:
+    # A sub-population of an 'IslandSolver', evolved by its own GeneticSolver
+
+    def __init__(
+        self,
+        vrp_instance: VRP,
+        population_size: int,
+        population_initializer_class: BasePopulationInitializer,
+        fitness_function_class: BaseFitnessFunction,
+        island_kwargs: dict,
+        seed: numpy.random.SeedSequence,
+    ):
+        self.solver = GeneticSolver(
+            vrp_instance=vrp_instance,
+            population_size=population_size,
+            population_initializer_class=population_initializer_class,
+            fitness_function_class=fitness_function_class,
+            seed=seed,
+            **island_kwargs,
+        )
+        self.population: Population = self.solver._initialization()
+        self.generation: int = 0
+        self._result: None | tuple = None
+
+    def start_step(self, generations: int, num_emigrants: int):
+        for _ in range(generations):
+            self.generation += 1
+            self.population = self.solver.evolve(self.population, self.generation)
+        emigrants = [
+            _copy_individual(individual)
+            for individual in self.population.get_topk(k=num_emigrants)
+        ]
+        self._result = (emigrants, self.solver.evaluations, self.population[0].fitness)
+
+    def step_result(self) -> tuple[list[Individual], int, float]:
+        return self._result
+
+    def immigrate(self, immigrants: list[Individual]):
+        # Immigrants replace the least fit individuals
+        if immigrants:
+            keep = self.population.individuals[: len(self.population) - len(immigrants)]
+            self.population = Population(individuals=keep + immigrants)
+            self.population.sort(reverse=True)
+
+    def finish(self) -> tuple[Population, int]:
+        return self.population, self.solver.evaluations
+
+
+def _island_worker(connection, *island_args):
+    # Serve the commands of an 'IslandSolver' for one island in a separate
+    # process. Every command is answered in order, so runs are reproducible
+    island = _Island(*island_args)
+    while True:
+        command, payload = connection.recv()
+        if command == "step":
+            island.start_step(*payload)
+            connection.send(island.step_result())
+        elif command == "immigrate":
+            island.immigrate(payload)
+        elif command == "finish":
+            connection.send(island.finish())
+            break
+    connection.close()
+
+
+class _IslandProcess:
+    # Same interface as '_Island', for an island evolved in its own process
+
+    def __init__(self, *island_args):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_island_worker, args=(child_connection, *island_args), daemon=True
+        )
+        self.process.start()
+        # Only the worker holds the other end, so a crashed worker gives EOFError
+        child_connection.close()
+
+    def _recv(self):
+        try:
+            return self.connection.recv()
+        except EOFError:
+            raise RuntimeError(
+                f"Island process exited unexpectedly ({self.process.exitcode})"
+            )
+
+    def start_step(self, generations: int, num_emigrants: int):
+        self.connection.send(("step", (generations, num_emigrants)))
+
+    def step_result(self) -> tuple[list[Individual], int, float]:
+        return self._recv()
+
+    def immigrate(self, immigrants: list[Individual]):
+        self.connection.send(("immigrate", immigrants))
+
+    def finish(self) -> tuple[Population, int]:
+        self.connection.send(("finish", None))
+        result = self._recv()
+        self.process.join()
+        return result
+
+    def terminate(self):
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+
+def migration_sources(
+    topology: str, num_islands: int, rng: numpy.random.Generator
+) -> list[list[int]]:
+    """The islands every island receives migrants from in a migration.
+
+    Args:
+        topology (str): "ring" (from the previous island), "fully_connected"
+            (from all other islands) or "random" (from one random other
+            island, drawn anew for every migration).
+        num_islands (int): The number of islands.
+        rng (numpy.random.Generator): Source of randomness for "random".
+
+    Returns:
+        (list[list[int]]): The source islands of every island.
+    """
+    if num_islands < 2:
+        return [[] for _ in range(num_islands)]
+    if topology == "ring":
+        return [[(i - 1) % num_islands] for i in range(num_islands)]
+    if topology == "fully_connected":
+        return [[j for j in range(num_islands) if j != i] for i in range(num_islands)]
+    if topology == "random":
+        sources = []
+        for i in range(num_islands):
+            j = int(rng.integers(num_islands - 1))
+            sources.append([j if j < i else j + 1])
+        return sources
+    raise ValueError(f"{topology}")
+
+
+class IslandSolver(BaseSolver):
+    """Island-model genetic algorithm.
+
+    'num_islands' sub-populations of 'population_size' individuals each evolve
+    independently with a 'GeneticSolver' (configured by 'island_kwargs'). Every
+    'migration_interval' generations, the fittest 'migration_rate' fraction of
+    every island migrates to the islands connected to it by 'topology' (see
+    'migration_sources'), replacing their least fit individuals.
+
+    With 'n_jobs' > 1, every island evolves in its own process and migrants
+    are exchanged through pipes. Islands synchronize at every migration, so a
+    run is reproducible from its seed regardless of 'n_jobs'. Every generation
+    counts as an iteration.
+    """
+
+    def __init__(
+        self,
+        vrp_instance: VRP,
+        population_size: int,
+        population_initializer_class: BasePopulationInitializer,
+        fitness_function_class: BaseFitnessFunction,
+        num_islands: int = 4,
+        num_generations: int = 100,
+        migration_interval: int = 10,
+        migration_rate: float = 0.1,
+        topology: str = "ring",
+        island_kwargs: None | dict = None,
+        n_jobs: int = 1,
+        callbacks: None | list[Callable[[SolverProgress], None]] = None,
+        progress_interval: int = 1,
+        seed: None | int | numpy.random.SeedSequence = None,
+    ):
+        self.num_islands: int = num_islands
+        self.num_generations: int = num_generations
+        self.migration_interval: int = migration_interval
+        self.migration_rate: float = migration_rate
+        self.topology: str = topology
+        self.island_kwargs: dict = dict(island_kwargs or {})
+        self.n_jobs: int = n_jobs
+        # Kept to instantiate the solver of every island
+        self.population_initializer_class = population_initializer_class
+        self.fitness_function_class = fitness_function_class
+        # Evaluations done by the islands
+        self.island_evaluations: int = 0
+        super().__init__(
+            vrp_instance,
+            population_size,
+            population_initializer_class,
+            fitness_function_class,
+            callbacks=callbacks,
+            progress_interval=progress_interval,
+            seed=seed,
+        )
+
+    def _validate(self):
+        super()._validate()
+        if self.num_islands < 1:
+            raise ValueError(f"{self.num_islands}")
+        if self.migration_interval < 1:
+            raise ValueError(f"{self.migration_interval}")
+        if not 0.0 <= self.migration_rate <= 1.0:
+            raise ValueError(f"{self.migration_rate}")
+        if self.n_jobs < 1:
+            raise ValueError(f"{self.n_jobs}")
+        # Fail early on an unknown topology
+        migration_sources(self.topology, self.num_islands, self.rng)
+
+    @property
+    def evaluations(self) -> int:
+        return super().evaluations + self.island_evaluations
+
+    def _initialization(self) -> list:
+        island_class = _IslandProcess if self.n_jobs > 1 else _Island
+        args = (
+            self.vrp_instance,
+            self.population_size,
+            self.population_initializer_class,
+            self.fitness_function_class,
+            self.island_kwargs,
+        )
+        return [
+            island_class(*args, seed)
+            for seed in self.seed_sequence.spawn(self.num_islands)
+        ]
+
+    def run(self) -> Population:
+        self._start_progress()
+        self.island_evaluations = 0
+        num_emigrants = max(1, round(self.migration_rate * self.population_size))
+        if self.migration_rate == 0.0:
+            num_emigrants = 0
+        # Generations evolved between consecutive migrations
+        epochs = [self.migration_interval] * (
+            self.num_generations // self.migration_interval
+        )
+        if self.num_generations % self.migration_interval:
+            epochs.append(self.num_generations % self.migration_interval)
+        islands = self._initialization()
+        try:
+            for epoch, generations in enumerate(epochs):
+                # Let all islands evolve concurrently, then collect the results
+                for island in islands:
+                    island.start_step(generations, num_emigrants)
+                results = [island.step_result() for island in islands]
+                emigrants = [result[0] for result in results]
+                self.island_evaluations = sum(result[1] for result in results)
+                self.iteration += generations
+                self._report_progress(max(result[2] for result in results))
+                if epoch + 1 < len(epochs):
+                    sources = migration_sources(
+                        self.topology, self.num_islands, self.rng
+                    )
+                    for island, island_sources in zip(islands, sources):
+                        island.immigrate(
+                            [
+                                _copy_individual(individual)
+                                for source in island_sources
+                                for individual in emigrants[source]
+                            ][: self.population_size]
+                        )
+            results = [island.finish() for island in islands]
+        finally:
+            for island in islands:
+                if isinstance(island, _IslandProcess):
+                    island.terminate()
+        self.island_evaluations = sum(result[1] for result in results)
+        population = Population(
+            individuals=[
+                individual for result in results for individual in result[0].individuals
+            ]
+        )
+        population.sort(reverse=True)
+        self._report_progress(population[0].fitness, force=True)
         return population
 
 
@@ -316,25 +1641,17 @@ class FitnessFunctionMinimizeDistance(BaseFitnessFunction):
     def __init__(self, vrp_instance: VRP):
         super().__init__()
         self.vrp_instance: VRP = vrp_instance
+        # Number of route costs computed (cached costs are not recomputed)
+        self.route_evaluations: int = 0
 
     def evaluate(self, individual: Individual) -> Individual:
-        total_distance = 0.0
-        for route in individual.chromosome:
-            if len(route) == 0:
-                # distance = numpy.inf
-                distance = 0.0
-            else:
-                # Distance from depot to first stop + distance from last to to depot
-                distance = (
-                    self.vrp_instance._distance_matrix[0][route[0]]
-                    + self.vrp_instance._distance_matrix[route[-1]][0]
-                )
-                # All distances in between
-                for i in range(1, len(route)):
-                    distance += self.vrp_instance._distance_matrix[route[i - 1]][
-                        route[i]
-                    ]
-            total_distance += distance
+        self.evaluations += 1
+        costs = individual.route_costs
+        for salesman, route in enumerate(individual.chromosome):
+            if costs[salesman] is None:
+                costs[salesman] = route_cost(self.vrp_instance, route, salesman)
+                self.route_evaluations += 1
+        total_distance = sum(costs)
         # return total_distance
         if total_distance == 0.0:
             individual.fitness = 0.0
@@ -350,11 +1667,13 @@ class RandomPopulationInitializer(BasePopulationInitializer):
         population_size: int,
         vrp_instance: VRP,
         fitness_function_instance: BaseFitnessFunction,
+        rng: None | numpy.random.Generator = None,
     ):
         super().__init__(
             population_size=population_size,
             vrp_instance=vrp_instance,
             fitness_function_instance=fitness_function_instance,
+            rng=rng,
         )
 
     def generate(self) -> Population:
@@ -366,16 +1685,21 @@ class RandomPopulationInitializer(BasePopulationInitializer):
         return Population(individuals=individuals)
 
     def _create_individual(self):
-        route = list(range(1, self.vrp_instance.num_locations))
-        random.shuffle(route)
+        route = self.vrp_instance.customers.tolist()
+        self.rng.shuffle(route)
         partition_points = sorted(
-            random.sample(route[:-1], self.vrp_instance.num_salesmen - 1)
+            self.rng.choice(
+                route[:-1], size=self.vrp_instance.num_salesmen - 1, replace=False
+            ).tolist()
         )
         individual = Individual(
-            chromosome=[
-                route[i:j]
-                for i, j in zip([0] + partition_points, partition_points + [None])
-            ],
+            chromosome=_assign_routes(
+                self.vrp_instance,
+                [
+                    route[i:j]
+                    for i, j in zip([0] + partition_points, partition_points + [None])
+                ],
+            ),
             generation=0,
         )
         return individual
@@ -388,18 +1712,23 @@ class KMeansRadomizedPopulationInitializer(BasePopulationInitializer):
         population_size: int,
         vrp_instance: VRP,
         fitness_function_instance: BaseFitnessFunction,
+        rng: None | numpy.random.Generator = None,
     ):
         super().__init__(
             population_size=population_size,
             vrp_instance=vrp_instance,
             fitness_function_instance=fitness_function_instance,
+            rng=rng,
         )
 
     def generate(self) -> Population:
-        kmeans_result = KMeans(
-            n_clusters=self.vrp_instance.num_salesmen,
-            random_state=2023,
-        ).fit(self.vrp_instance.locations[1:])
+        from sklearn.cluster import KMeans
+
+        with timed_phase("clustering"):
+            kmeans_result = KMeans(
+                n_clusters=self.vrp_instance.num_salesmen,
+                random_state=_random_state(self.rng),
+            ).fit(self.vrp_instance.coordinates[self.vrp_instance.customers])
         individuals = [
             self._create_individual(kmeans_result.labels_)
             for _ in range(self.population_size)
@@ -413,16 +1742,305 @@ class KMeansRadomizedPopulationInitializer(BasePopulationInitializer):
     def _create_individual(self, labels):
         routes = []
         for i in range(self.vrp_instance.num_salesmen):
-            route = [index + 1 for index, label in enumerate(labels) if label == i]
-            random.shuffle(route)
+            route = self.vrp_instance.customers[labels == i].tolist()
+            self.rng.shuffle(route)
             routes.append(route)
         individual = Individual(
-            chromosome=routes,
+            chromosome=_assign_routes(self.vrp_instance, routes),
             generation=0,
         )
         return individual
 
 
+def _balanced_route_size(vrp_instance: VRP, balance: float = 1.25) -> int:
+    # The most customers a route may hold, 'balance' times an even split
+    num_customers = len(vrp_instance.customers)
+    return max(1, math.ceil(balance * num_customers / vrp_instance.num_salesmen))
+
+
+def _assign_routes(vrp_instance: VRP, routes: list[list[int]]) -> list[list[int]]:
+    """Order routes by salesman, matching them to the depots of the salesmen.
+
+    Salesmen without an assigned depot can take any route. Otherwise the
+    routes are matched to the salesmen with the least total depot distance
+    (an assignment problem, solved in O(m^3) time for m salesmen).
+    """
+    if all(depot is None for depot in vrp_instance.worker_depots):
+        return routes
+    from scipy.optimize import linear_sum_assignment
+
+    costs = numpy.array(
+        [
+            [vrp_instance.depot_cost(route, salesman)[1] for salesman in range(len(routes))]
+            for route in routes
+        ]
+    )
+    route_indices, salesmen = linear_sum_assignment(costs)
+    chromosome = [[] for _ in routes]
+    for index, salesman in zip(route_indices, salesmen):
+        chromosome[salesman] = routes[index]
+    return chromosome
+
+
+class SavingsPopulationInitializer(BasePopulationInitializer):
+    """Clarke-Wright savings heuristic (parallel version).
+
+    Every customer starts on its own route. Pairs of customers (i, j) are
+    taken from a heap in order of decreasing saving d(0, i) + d(0, j) - d(i, j)
+    (with several depots, the distances to the nearest depot of each customer)
+    and the routes they end are merged, until 'num_salesmen' routes are left.
+    Routes hold at most 'balance' times an even share of the customers, so the
+    work is spread over all salesmen; leftover routes are joined smallest
+    first. With a dense distance matrix all O(N^2) pairs are candidates
+    (O(N^2 log N) time). For other distance storages and large instances only
+    the nearest neighbours of every customer are (O(N k log N) time), which
+    hardly changes the result: distant pairs have small savings.
+
+    The heuristic is deterministic, so all individuals of the population are
+    the same (see 'RandomizedSavingsPopulationInitializer').
+    """
+
+    balance: float = 1.25
+    # Range of the route shape parameter (lambda) in the savings
+    # d(0, i) + d(0, j) - lambda * d(i, j), drawn per individual if not a
+    # single value
+    route_shape: tuple[float, float] = (1.0, 1.0)
+    # Beyond this many customers only neighbouring pairs are candidates, even
+    # with a dense distance matrix
+    max_candidate_customers: int = 1_000
+
+    def __init__(
+        self,
+        population_size: int,
+        vrp_instance: VRP,
+        fitness_function_instance: BaseFitnessFunction,
+        rng: None | numpy.random.Generator = None,
+    ):
+        super().__init__(
+            population_size=population_size,
+            vrp_instance=vrp_instance,
+            fitness_function_instance=fitness_function_instance,
+            rng=rng,
+        )
+
+    def generate(self) -> Population:
+        with timed_phase("savings"):
+            first, second, to_depot, between = self._savings()
+            randomized = self.route_shape[0] != self.route_shape[1]
+            individuals = [
+                self._create_individual(first, second, to_depot, between)
+                for _ in range(self.population_size if randomized else 1)
+            ]
+        individuals = [
+            self.fitness_function_instance.evaluate(individual)
+            for individual in individuals
+        ]
+        while len(individuals) < self.population_size:
+            individuals.append(_copy_individual(individuals[0]))
+        return Population(individuals=individuals)
+
+    def _candidate_pairs(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        num_locations = self.vrp_instance.num_locations
+        customers = self.vrp_instance.customers
+        if (
+            self.vrp_instance._distance_matrix is not None
+            and len(customers) <= self.max_candidate_customers
+        ):
+            first, second = numpy.triu_indices(len(customers), k=1)
+            return customers[first], customers[second]
+        # Pairs of every customer and its nearest neighbours, without duplicates
+        k = self.vrp_instance.num_neighbors
+        neighbors = [
+            self.vrp_instance.distances.neighbors(customer, k)
+            for customer in customers
+        ]
+        first = numpy.repeat(customers, [len(row) for row in neighbors])
+        second = numpy.concatenate(neighbors).astype(numpy.intp)
+        first, second = numpy.minimum(first, second), numpy.maximum(first, second)
+        # Neighbours may be depots
+        is_customer = numpy.zeros(num_locations, dtype=bool)
+        is_customer[customers] = True
+        pairs = is_customer[first] & is_customer[second]
+        keys = numpy.unique(first[pairs] * num_locations + second[pairs])
+        return keys // num_locations, keys % num_locations
+
+    def _savings(self) -> tuple[numpy.ndarray, ...]:
+        # The candidate pairs, their distances to the (nearest) depot and
+        # between them
+        first, second = self._candidate_pairs()
+        distances = self.vrp_instance.distances
+        row = self.vrp_instance.depot_distances.min(axis=0)
+        return first, second, row[first] + row[second], distances.pairs(first, second)
+
+    def _create_individual(
+        self,
+        first: numpy.ndarray,
+        second: numpy.ndarray,
+        to_depot: numpy.ndarray,
+        between: numpy.ndarray,
+    ) -> Individual:
+        route_shape = self.rng.uniform(*self.route_shape)
+        savings = to_depot - route_shape * between
+        # heapq is a min-heap, so the savings are negated
+        heap = list(zip((-savings).tolist(), first.tolist(), second.tolist()))
+        heapq.heapify(heap)
+
+        num_salesmen = self.vrp_instance.num_salesmen
+        max_route_size = _balanced_route_size(self.vrp_instance, self.balance)
+        routes = {
+            customer: [customer] for customer in self.vrp_instance.customers.tolist()
+        }
+        route_of = list(range(self.vrp_instance.num_locations))
+        while heap and len(routes) > num_salesmen:
+            _, i, j = heapq.heappop(heap)
+            a, b = route_of[i], route_of[j]
+            if a == b or len(routes[a]) + len(routes[b]) > max_route_size:
+                continue
+            route_a, route_b = routes[a], routes[b]
+            # Both customers have to be at an end of their route (not interior)
+            if i not in (route_a[0], route_a[-1]) or j not in (route_b[0], route_b[-1]):
+                continue
+            if route_a[-1] != i:
+                route_a.reverse()
+            if route_b[0] != j:
+                route_b.reverse()
+            # Relabel the smaller route: O(N log N) relabelings in total
+            if len(route_a) < len(route_b):
+                route_b[:0] = route_a
+                merged, removed = b, a
+            else:
+                route_a.extend(route_b)
+                merged, removed = a, b
+            for customer in routes[removed]:
+                route_of[customer] = merged
+            del routes[removed]
+
+        routes = sorted(routes.values(), key=len)
+        while len(routes) > num_salesmen:
+            # Join the two smallest routes in their cheapest orientation
+            route_a, route_b = routes.pop(0), routes.pop(0)
+            route_a, route_b = min(
+                [
+                    (route_a, route_b),
+                    (route_a, route_b[::-1]),
+                    (route_a[::-1], route_b),
+                    (route_a[::-1], route_b[::-1]),
+                ],
+                key=lambda pair: self.vrp_instance.distance(pair[0][-1], pair[1][0]),
+            )
+            bisect.insort(routes, route_a + route_b, key=len)
+        routes += [[] for _ in range(num_salesmen - len(routes))]
+        return Individual(
+            chromosome=_assign_routes(self.vrp_instance, routes), generation=0
+        )
+
+
+class RandomizedSavingsPopulationInitializer(SavingsPopulationInitializer):
+    # A random route shape parameter per individual for a diverse population
+    # of savings solutions (lambda < 1 favours pairs close to the depot,
+    # lambda > 1 pairs close to each other)
+    route_shape: tuple[float, float] = (0.8, 1.5)
+
+
+class SweepPopulationInitializer(BasePopulationInitializer):
+    """Polar sweep around the depot (the centre of the depots, if several).
+
+    Customers are sorted by their angle around the depot and split into
+    'num_salesmen' sectors of equal size, starting at the largest angular gap
+    (a random customer, with sector sizes varied by up to 10%, when
+    randomized).
+    Within a sector of n customers, the customers are split by their distance
+    from the depot into about sqrt(n / 2) bands of equal size, which are
+    visited from the inside out, alternating between increasing and decreasing
+    angle. Takes O(N log N) time.
+
+    The heuristic is deterministic, so all individuals of the population are
+    the same (see 'RandomizedSweepPopulationInitializer').
+    """
+
+    randomized: bool = False
+
+    def __init__(
+        self,
+        population_size: int,
+        vrp_instance: VRP,
+        fitness_function_instance: BaseFitnessFunction,
+        rng: None | numpy.random.Generator = None,
+    ):
+        super().__init__(
+            population_size=population_size,
+            vrp_instance=vrp_instance,
+            fitness_function_instance=fitness_function_instance,
+            rng=rng,
+        )
+
+    def generate(self) -> Population:
+        coordinates = self.vrp_instance.coordinates
+        offsets = coordinates[self.vrp_instance.customers] - coordinates[
+            self.vrp_instance.depots
+        ].mean(axis=0)
+        # Locations are (latitude, longitude) pairs
+        angles = numpy.arctan2(offsets[:, 0], offsets[:, 1])
+        radii = numpy.hypot(offsets[:, 0], offsets[:, 1])
+        individuals = [
+            self._create_individual(angles, radii)
+            for _ in range(self.population_size if self.randomized else 1)
+        ]
+        individuals = [
+            self.fitness_function_instance.evaluate(individual)
+            for individual in individuals
+        ]
+        while len(individuals) < self.population_size:
+            individuals.append(_copy_individual(individuals[0]))
+        return Population(individuals=individuals)
+
+    def _create_individual(self, angles: numpy.ndarray, radii: numpy.ndarray):
+        num_customers = len(angles)
+        num_salesmen = self.vrp_instance.num_salesmen
+        order = numpy.argsort(angles, kind="stable")
+        if self.randomized:
+            # Start the sweep at a random customer
+            start = int(self.rng.integers(num_customers)) if num_customers else 0
+        else:
+            # Start the sweep after the largest gap between consecutive angles
+            gaps = numpy.diff(angles[order], append=angles[order[:1]] + 2 * numpy.pi)
+            start = (int(numpy.argmax(gaps)) + 1) % num_customers if num_customers else 0
+        order = numpy.roll(order, -start)
+        bounds = (numpy.arange(1, num_salesmen) * num_customers) // num_salesmen
+        if self.randomized:
+            # Move the sector boundaries by up to 10% of the sector size
+            jitter = num_customers // num_salesmen // 10
+            bounds = numpy.sort(
+                numpy.clip(
+                    bounds + self.rng.integers(-jitter, jitter + 1, size=len(bounds)),
+                    0,
+                    num_customers,
+                )
+            )
+        routes = []
+        for sector in numpy.split(order, bounds):
+            if len(sector) == 0:
+                routes.append([])
+                continue
+            num_bands = max(1, round(math.sqrt(len(sector) / 2)))
+            rank = numpy.empty(len(sector), dtype=numpy.intp)
+            rank[numpy.argsort(radii[sector], kind="stable")] = numpy.arange(len(sector))
+            band = rank * num_bands // len(sector)
+            # The sector is sorted by angle: alternate the direction per band
+            position = numpy.arange(len(sector))
+            order = numpy.lexsort((numpy.where(band % 2 == 0, position, -position), band))
+            routes.append(self.vrp_instance.customers[sector[order]].tolist())
+        return Individual(
+            chromosome=_assign_routes(self.vrp_instance, routes), generation=0
+        )
+
+
+class RandomizedSweepPopulationInitializer(SweepPopulationInitializer):
+    # Random start angles and sector sizes for a diverse population of sweep
+    # solutions
+    randomized: bool = True
+
+
 def parse_and_transform(tree):
     # Function to traverse the tree and collect nodes by depth
     def traverse(node, depth=0, nodes_by_depth={}):
@@ -474,25 +2092,28 @@ def individual_to_routes(individual: Individual, vrp_instance: VRP):
     # Helper function to transform a sequence of locations (identifiers)
     # into a sequence of geospatial (latitude and longitude) coordinates
     routes: list[list[float]] = []
-    for gene in individual.chromosome:
+    for salesman, gene in enumerate(individual.chromosome):
+        depot = vrp_instance.route_depot(gene, salesman)
         route: list[float] = []
         # Add depot as start location
-        route.append(vrp_instance.locations[0])
+        route.append(vrp_instance.locations[depot])
         for index in gene:
             route.append(vrp_instance.locations[index])
         # Add depot as end location
-        route.append(vrp_instance.locations[0])
+        route.append(vrp_instance.locations[depot])
         routes.append(route)
     return routes
 
 
-def plot_salesmen_routes(rotues):
+def plot_salesmen_routes(routes):
     """
     Plots the routes of salesmen.
 
     Parameters:
     - routes: A list of lists, where each sublist contains tuples of lat/long coordinates for a salesman's tour.
     """
+    import matplotlib.pyplot as plt
+
     # Set up the plot
     plt.figure(figsize=(10, 6))
 
@@ -538,6 +2159,8 @@ def plot_salesmen_routes(rotues):
 
 
 if __name__ == "__main__":
+    import pandas as pd
+
     # Central location (Bissau)
     # center_latitude = 11.845729112251885
     # center_longitude = -15.5955092933175
@@ -0,0 +1,1052 @@
+import importlib.util
+import itertools
+import numpy
+import pytest
+from benchmarks.solver_benchmark import run_case
+from vrp_solver import kernels
+from vrp_solver.distances import (
+    CSRDistances,
+    DenseDistances,
+    load_distances,
+    symmetrize_matrix_file,
+    validate_matrix_file,
+)
+from vrp_solver.alns import ALNSSolver
+from vrp_solver.vrp_solver import (
+    VRP,
+    TwoOptSolver,
+    DecompositionSolver,
+    MultiStartSolver,
+    GeneticSolver,
+    IslandSolver,
+    migration_sources,
+    KMeansRadomizedPopulationInitializer,
+    RandomPopulationInitializer,
+    SavingsPopulationInitializer,
+    RandomizedSavingsPopulationInitializer,
+    SweepPopulationInitializer,
+    RandomizedSweepPopulationInitializer,
+    FitnessFunctionMinimizeDistance,
+    TimeWindowVRP,
+    Individual,
+    ConvergenceTrace,
+    TRACE_DTYPE,
+    route_cost,
+)
+
+# Central location (Bissau)
+CENTER_LATITUDE = 11.852848336808085
+CENTER_LONGITUDE = -15.598465762669719
+
+
+def generate_locations(num_locations: int, seed: int = 2023) -> list[list[float]]:
+    # Depot at the center followed by uniformly scattered households
+    rng = numpy.random.default_rng(seed)
+    offsets = rng.uniform(-0.015, 0.015, size=(num_locations - 1, 2))
+    return [[CENTER_LATITUDE, CENTER_LONGITUDE]] + (
+        offsets + [CENTER_LATITUDE, CENTER_LONGITUDE]
+    ).tolist()
+
+
+def assert_valid_solution(individual, vrp_instance: VRP):
+    # Every customer is visited exactly once by one of the salesmen
+    assert len(individual.chromosome) == vrp_instance.num_salesmen
+    visits = sorted(index for route in individual.chromosome for index in route)
+    assert visits == vrp_instance.customers.tolist()
+
+
+def generate_multi_depot_locations(
+    num_per_depot: int, seed: int = 2023
+) -> tuple[list[list[float]], list[int]]:
+    # Three depots far apart, each followed by the households around it
+    rng = numpy.random.default_rng(seed)
+    locations, depots = [], []
+    for offset in [(-0.05, -0.05), (0.05, -0.05), (0.0, 0.05)]:
+        depot = numpy.add([CENTER_LATITUDE, CENTER_LONGITUDE], offset)
+        depots.append(len(locations))
+        locations.append(depot.tolist())
+        locations += (depot + rng.uniform(-0.01, 0.01, size=(num_per_depot, 2))).tolist()
+    return locations, depots
+
+
+def test_route_cost_without_distance_matrix():
+    locations = generate_locations(20)
+    dense = VRP(locations=locations, num_salesmen=1, precompute_distances=True)
+    lazy = VRP(locations=locations, num_salesmen=1, precompute_distances=False)
+    route = list(range(1, 20))
+    assert route_cost(lazy, route) == pytest.approx(route_cost(dense, route))
+    assert lazy.distance(3, 7) == pytest.approx(dense.distance(3, 7))
+
+
+@pytest.mark.parametrize("distance_storage", ["sparse", "none"])
+def test_distance_storage_matches_dense(distance_storage):
+    locations = generate_locations(60)
+    dense = VRP(locations=locations, num_salesmen=2)
+    other = VRP(
+        locations=locations,
+        num_salesmen=2,
+        distance_storage=distance_storage,
+        num_neighbors=5,
+    )
+    rng = numpy.random.default_rng(0)
+    rows, cols = rng.integers(0, 60, size=(2, 500))
+    numpy.testing.assert_allclose(
+        other.distances.pairs(rows, cols), dense.distances.pairs(rows, cols)
+    )
+    for loc_a, loc_b in zip(rows[:50], cols[:50]):
+        assert other.distance(loc_a, loc_b) == pytest.approx(
+            dense.distance(loc_a, loc_b)
+        )
+    numpy.testing.assert_array_equal(
+        other.distances.neighbors(7, 5), dense.distances.neighbors(7, 5)
+    )
+    numpy.testing.assert_allclose(
+        other.distances.submatrix([0, 4, 9]), dense.distances.submatrix([0, 4, 9])
+    )
+
+
+def test_sparse_distance_storage_memory():
+    vrp_instance = VRP(
+        locations=generate_locations(2000),
+        num_salesmen=2,
+        distance_storage="sparse",
+        num_neighbors=8,
+    )
+    assert vrp_instance._distance_matrix is None
+    assert vrp_instance.distances.nbytes <= 2000 * 8 * (4 + 8) + 2001 * 8
+
+
+def test_load_distances(tmp_path):
+    import scipy.sparse
+
+    locations = generate_locations(40)
+    coordinates = numpy.asarray(locations)
+    dense = VRP(locations=locations, num_salesmen=2).distances.matrix
+    # Walking distances are longer than straight lines
+    numpy.save(tmp_path / "matrix.npy", 1.5 * dense)
+    distances = load_distances(str(tmp_path / "matrix.npy"), coordinates)
+    vrp_instance = VRP(locations=locations, num_salesmen=2, distances=distances)
+    # The matrix is memory mapped and used as is
+    assert isinstance(vrp_instance._distance_matrix, numpy.memmap)
+    route = list(range(1, 40))
+    assert route_cost(vrp_instance, route) == pytest.approx(
+        1.5 * route_cost(VRP(locations=locations, num_salesmen=2), route)
+    )
+    best = TwoOptSolver(
+        vrp_instance=vrp_instance,
+        population_size=2,
+        population_initializer_class=SavingsPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        seed=2023,
+    ).run()[0]
+    assert_valid_solution(best, vrp_instance)
+
+    # Sparse matrices only hold some pairs, in rows of different lengths
+    sparse = scipy.sparse.random(40, 40, density=0.3, random_state=0, format="csr")
+    scipy.sparse.save_npz(tmp_path / "matrix.npz", sparse)
+    distances = load_distances(str(tmp_path / "matrix.npz"), coordinates)
+    assert isinstance(distances, CSRDistances)
+    stored = sparse.toarray() != 0
+    rows, cols = numpy.nonzero(stored)
+    numpy.testing.assert_allclose(
+        distances.pairs(rows, cols), sparse.toarray()[rows, cols]
+    )
+    rows, cols = numpy.nonzero(~stored)
+    numpy.testing.assert_allclose(distances.pairs(rows, cols), dense[rows, cols])
+    assert distances.distance(int(rows[0]), int(cols[0])) == pytest.approx(
+        dense[rows[0], cols[0]]
+    )
+
+    with pytest.raises(ValueError):
+        load_distances(str(tmp_path / "matrix.npy"), coordinates[:30])
+    with pytest.raises(ValueError):
+        VRP(locations=locations[:30], num_salesmen=2, distances=distances)
+
+
+def test_symmetrize_matrix_file(tmp_path):
+    import scipy.sparse
+
+    rng = numpy.random.default_rng(0)
+    matrix = rng.uniform(1.0, 2.0, size=(30, 30))
+    numpy.save(tmp_path / "matrix.npy", matrix)
+    path = str(tmp_path / "matrix.npy")
+    assert symmetrize_matrix_file(path, block_size=7)
+    numpy.testing.assert_allclose(numpy.load(path), (matrix + matrix.T) / 2)
+    assert not symmetrize_matrix_file(path)
+
+    sparse = scipy.sparse.random(30, 30, density=0.2, random_state=0, format="csr")
+    sparse.data += 1.0
+    scipy.sparse.save_npz(tmp_path / "matrix.npz", sparse)
+    path = str(tmp_path / "matrix.npz")
+    assert symmetrize_matrix_file(path)
+    symmetric = scipy.sparse.load_npz(path).toarray()
+    numpy.testing.assert_allclose(symmetric, symmetric.T)
+    dense, transposed = sparse.toarray(), sparse.toarray().T
+    # Pairs stored in both directions are averaged, others are copied
+    both = (dense != 0) & (transposed != 0)
+    numpy.testing.assert_allclose(symmetric[both], (dense + transposed)[both] / 2)
+    one = (dense != 0) & (transposed == 0)
+    numpy.testing.assert_allclose(symmetric[one], dense[one])
+    numpy.testing.assert_allclose(symmetric.T[one], dense[one])
+
+
+def test_validate_matrix_file(tmp_path):
+    import scipy.sparse
+
+    matrix = numpy.random.default_rng(0).uniform(1.0, 2.0, size=(30, 30))
+    path = str(tmp_path / "matrix.npy")
+    numpy.save(path, matrix)
+    validate_matrix_file(path, block_size=7)
+    for value in [numpy.nan, numpy.inf, -1.0]:
+        invalid = matrix.copy()
+        invalid[20, 3] = value
+        numpy.save(path, invalid)
+        with pytest.raises(ValueError):
+            validate_matrix_file(path, block_size=7)
+
+    path = str(tmp_path / "matrix.npz")
+    sparse = scipy.sparse.csr_matrix(matrix)
+    scipy.sparse.save_npz(path, sparse)
+    validate_matrix_file(path)
+    sparse.data[5] = numpy.nan
+    scipy.sparse.save_npz(path, sparse)
+    with pytest.raises(ValueError):
+        validate_matrix_file(path)
+
+
+def test_two_opt_solver_asymmetric_distances():
+    # The kernels assume symmetric distances: with asymmetric ones "improving"
+    # moves may never run out, which the move limit stops
+    locations = generate_locations(41)
+    coordinates = numpy.asarray(locations)
+    base = DenseDistances(coordinates).matrix
+    matrix = base * (1 + numpy.random.default_rng(0).uniform(size=base.shape))
+    vrp_instance = VRP(
+        locations=locations,
+        num_salesmen=1,
+        distances=DenseDistances(coordinates, matrix=matrix),
+    )
+    solver = TwoOptSolver(
+        vrp_instance=vrp_instance,
+        population_size=1,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        max_moves=500,
+        seed=2023,
+    )
+    best = solver.run()[0]
+    assert_valid_solution(best, vrp_instance)
+    assert solver.iteration <= 500
+
+
+def test_two_opt_solver_sparse_distances():
+    vrp_instance = VRP(
+        locations=generate_locations(30),
+        num_salesmen=2,
+        distance_storage="sparse",
+        num_neighbors=8,
+    )
+    solver = TwoOptSolver(
+        vrp_instance=vrp_instance,
+        population_size=3,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+    )
+    best_solution = solver.run().get_topk(k=1)[0]
+    assert_valid_solution(best_solution, vrp_instance)
+
+
+KERNEL_BACKENDS = ["numpy"] + (
+    ["numba"] if importlib.util.find_spec("numba") is not None else []
+)
+
+
+def reference_route_cost(matrix, route, depot) -> float:
+    # Pure Python cost of the closed tour depot -> route -> depot
+    path = [depot] + [int(location) for location in route] + [depot]
+    return sum(matrix[path[i]][path[i + 1]] for i in range(len(path) - 1))
+
+
+def random_kernel_instance(num_locations: int, seed: int):
+    rng = numpy.random.default_rng(seed)
+    coordinates = rng.uniform(0.0, 1.0, size=(num_locations, 2))
+    matrix = numpy.sqrt(
+        numpy.sum((coordinates[:, None, :] - coordinates[None, :, :]) ** 2, axis=2)
+    )
+    route = rng.permutation(numpy.arange(1, num_locations)).astype(numpy.int32)
+    return matrix, route
+
+
+@pytest.mark.parametrize("backend", KERNEL_BACKENDS)
+@pytest.mark.parametrize("num_locations", [2, 3, 4, 9, 25])
+def test_kernels_match_reference(backend, num_locations):
+    k = kernels.get_kernels(backend)
+    assert k.name == backend
+    matrix, route = random_kernel_instance(num_locations, seed=num_locations)
+    n = len(route)
+    cost = reference_route_cost(matrix, route, 0)
+    assert k.route_cost(matrix, route, 0) == pytest.approx(cost)
+
+    # 2-opt: the best of all reversals
+    deltas = {
+        (i, j): reference_route_cost(matrix, kernels.apply_two_opt(route, i, j), 0)
+        - cost
+        for i, j in itertools.combinations(range(n), 2)
+    }
+    delta, i, j = k.two_opt_scan(matrix, route, 0)
+    if deltas:
+        assert delta == pytest.approx(min(deltas.values()))
+        assert deltas[(i, j)] == pytest.approx(delta)
+    else:
+        assert (i, j) == (-1, -1)
+
+    # Or-opt: the best of all segment moves
+    deltas = {}
+    for length in range(1, min(3, n - 1) + 1):
+        for i in range(n - length + 1):
+            for e in range(n + 1):
+                if i <= e <= i + length:
+                    continue
+                for reverse in [False, True] if length > 1 else [False]:
+                    moved = kernels.apply_or_opt(route, i, length, e, reverse)
+                    assert sorted(moved) == sorted(route)
+                    deltas[(i, length, e, reverse)] = (
+                        reference_route_cost(matrix, moved, 0) - cost
+                    )
+    delta, *move = k.or_opt_scan(matrix, route, 0, 3)
+    if deltas:
+        assert delta == pytest.approx(min(deltas.values()))
+        assert deltas[tuple(move)] == pytest.approx(delta)
+    else:
+        assert move[0] == -1
+
+    # Relocate: the best move of a stop from one route into another
+    route_a, route_b = route[: n // 2 + 1], route[n // 2 + 1 :]
+    cost = reference_route_cost(matrix, route_a, 0) + reference_route_cost(
+        matrix, route_b, 0
+    )
+    deltas = {}
+    for i in range(len(route_a)):
+        for e in range(len(route_b) + 1):
+            moved_a, moved_b = kernels.apply_relocate(route_a, route_b, i, e)
+            deltas[(i, e)] = (
+                reference_route_cost(matrix, moved_a, 0)
+                + reference_route_cost(matrix, moved_b, 0)
+                - cost
+            )
+    delta, i, e = k.relocate_scan(matrix, route_a, route_b, 0)
+    assert delta == pytest.approx(min(deltas.values()))
+    assert deltas[(i, e)] == pytest.approx(delta)
+
+
+@pytest.mark.skipif("numba" not in KERNEL_BACKENDS, reason="numba is not installed")
+def reference_time_warp(path, times, service, earliest, latest) -> float:
+    # Simulate the tour: wait for windows to open and travel back in time
+    # (time warp) to the end of windows that are missed
+    current, warp = earliest[path[0]], 0.0
+    for previous, location in zip(path[:-1], path[1:]):
+        current = max(current + service[previous] + times[previous][location], earliest[location])
+        if current > latest[location]:
+            warp += current - latest[location]
+            current = latest[location]
+    return warp
+
+
+def random_time_windows(num_locations: int, seed: int):
+    # Asymmetric travel times, service times and windows of random widths
+    rng = numpy.random.default_rng(seed)
+    matrix, route = random_kernel_instance(num_locations, seed)
+    times = matrix * rng.uniform(1.0, 1.5, size=matrix.shape)
+    service = rng.uniform(0.0, 0.1, size=num_locations)
+    earliest = rng.uniform(0.0, 2.0, size=num_locations)
+    latest = earliest + rng.uniform(0.0, 1.5, size=num_locations)
+    earliest[0], latest[0] = 0.0, 10.0
+    return matrix, route, times, service, earliest, latest
+
+
+@pytest.mark.parametrize("backend", KERNEL_BACKENDS)
+@pytest.mark.parametrize("num_locations", [2, 3, 4, 9, 25])
+def test_time_window_kernels_match_reference(backend, num_locations):
+    selected = kernels.get_kernels(backend)
+    for seed in range(5):
+        matrix, route, times, service, earliest, latest = random_time_windows(
+            num_locations, seed
+        )
+        windows = (times, service, earliest, latest)
+        path = kernels._path(route, 0)
+        legs = times[path[:-1], path[1:]]
+        prefix, suffix = kernels.route_segments(path, legs, service, earliest, latest)
+        for j in range(len(path)):
+            assert prefix[j, 1] == pytest.approx(
+                reference_time_warp(path[: j + 1], *windows)
+            )
+            assert suffix[j, 1] == pytest.approx(
+                reference_time_warp(path[j:], *windows)
+            )
+
+        # The best 2-opt move by distance plus penalized time warp
+        penalty = 3.0
+
+        def cost(candidate):
+            candidate_path = kernels._path(candidate, 0)
+            return reference_route_cost(
+                matrix, candidate, 0
+            ) + penalty * reference_time_warp(candidate_path, *windows)
+
+        n = len(route)
+        expected = min(
+            [
+                (cost(kernels.apply_two_opt(route, i, k)) - cost(route), i, k)
+                for i in range(n)
+                for k in range(i + 1, n)
+            ],
+            default=(0.0, -1, -1),
+        )
+        delta, i, k = selected.two_opt_scan_tw(
+            matrix, route, 0, *windows, penalty
+        )
+        assert delta == pytest.approx(expected[0], abs=1e-9)
+        if i >= 0:
+            assert cost(kernels.apply_two_opt(route, i, k)) - cost(
+                route
+            ) == pytest.approx(delta, abs=1e-9)
+
+
+def test_time_window_vrp():
+    vrp_instance = TimeWindowVRP(
+        locations=[[0.0, 0.0], [0.0, 10.0], [0.0, 20.0], [0.0, -10.0]],
+        num_salesmen=1,
+        service_times=[0.0, 5.0, 5.0, 5.0],
+        time_windows=[[0.0, 100.0], [0.0, 100.0], [40.0, 50.0], [0.0, 30.0]],
+        speed=2.0,
+    )
+    # Arrive at 5 s, wait at stop 2 until 40 s and back at 70 s. Stop 3 is
+    # reached 30 s after its window closed
+    numpy.testing.assert_allclose(vrp_instance.schedule([1, 2, 3]), [5, 40, 60, 70])
+    assert vrp_instance.time_warp([1, 2, 3]) == pytest.approx(30.0)
+    assert vrp_instance.time_warp([3, 1, 2]) == 0.0
+    assert route_cost(vrp_instance, [1, 2, 3]) == pytest.approx(60.0 + 30_000.0)
+    # The time warp added by every insertion, computed in O(1) each
+    added = vrp_instance.insertion_time_warp([1, 2], numpy.array([3]))
+    for position in range(3):
+        route = [1, 2]
+        route.insert(position, 3)
+        assert added[0, position] == pytest.approx(vrp_instance.time_warp(route))
+    with pytest.raises(ValueError):
+        TimeWindowVRP(
+            locations=[[0.0, 0.0], [1.0, 1.0]],
+            num_salesmen=1,
+            time_windows=[[0.0, 10.0], [5.0, 1.0]],
+        )
+
+
+@pytest.mark.parametrize("solver_class", [TwoOptSolver, ALNSSolver])
+def test_time_window_solvers(solver_class):
+    # Windows of +/- 30 minutes around the visits of three random routes, so
+    # a solution without time warp exists
+    rng = numpy.random.default_rng(2023)
+    coordinates = rng.uniform(0.0, 2_000.0, size=(61, 2)).tolist()
+    service_times = numpy.r_[0.0, rng.integers(0, 6, size=60) * 10.0]
+    unconstrained = TimeWindowVRP(
+        locations=coordinates, num_salesmen=3, service_times=service_times, speed=1.2
+    )
+    visits = numpy.zeros(61)
+    for route in numpy.array_split(rng.permutation(numpy.arange(1, 61)), 3):
+        visits[route] = unconstrained.schedule(route.tolist())[:-1]
+    time_windows = numpy.column_stack(
+        [numpy.maximum(visits - 1_800.0, 0.0), visits + 1_800.0]
+    )
+    time_windows[0] = [0.0, numpy.inf]
+    vrp_instance = TimeWindowVRP(
+        locations=coordinates,
+        num_salesmen=3,
+        service_times=service_times,
+        time_windows=time_windows,
+        speed=1.2,
+    )
+    solver = solver_class(
+        vrp_instance=vrp_instance,
+        population_size=3,
+        population_initializer_class=KMeansRadomizedPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        seed=2023,
+    )
+    initial = solver._initialization()
+    initial = initial if isinstance(initial, Individual) else initial[0]
+    assert sum(vrp_instance.time_warp(route) for route in initial.chromosome) > 0.0
+    best = solver.run()[0]
+    assert_valid_solution(best, vrp_instance)
+    for route in best.chromosome:
+        assert vrp_instance.time_warp(route) == 0.0
+        starts = vrp_instance.schedule(route)
+        assert numpy.all(starts[:-1] >= vrp_instance.earliest[route])
+        assert numpy.all(starts[:-1] <= vrp_instance.latest[route])
+
+
+def test_multi_depot_vrp():
+    locations, depots = generate_multi_depot_locations(5)
+    vrp_instance = VRP(
+        locations=locations,
+        num_salesmen=2,
+        depots=depots,
+        worker_depots=[None, depots[2]],
+    )
+    assert vrp_instance.customers.tolist() == [
+        i for i in range(len(locations)) if i not in depots
+    ]
+    assert vrp_instance.depot_distances.shape == (3, len(locations))
+    # Households around the second depot
+    route = [7, 9, 8]
+    legs = vrp_instance.distance(6, 7) + vrp_instance.distance(8, 6)
+    path = vrp_instance.distance(7, 9) + vrp_instance.distance(9, 8)
+    # A free salesman starts at the nearest depot, the other one at its own
+    assert vrp_instance.depot_cost(route, 0) == (6, pytest.approx(legs))
+    assert vrp_instance.route_depot(route, 1) == 12
+    assert route_cost(vrp_instance, route, 0) == pytest.approx(legs + path)
+    assert route_cost(vrp_instance, route, 1) > 2 * route_cost(vrp_instance, route, 0)
+    assert route_cost(vrp_instance, route, depot=12) == pytest.approx(
+        route_cost(vrp_instance, route, 1)
+    )
+    with pytest.raises(ValueError):
+        VRP(locations=locations, num_salesmen=2, depots=[0, 0])
+    with pytest.raises(ValueError):
+        VRP(locations=locations, num_salesmen=2, depots=depots, worker_depots=[1, None])
+
+
+@pytest.mark.parametrize(
+    "solver_class,initializer_class",
+    [
+        (TwoOptSolver, KMeansRadomizedPopulationInitializer),
+        (TwoOptSolver, RandomizedSavingsPopulationInitializer),
+        (TwoOptSolver, SweepPopulationInitializer),
+        (ALNSSolver, RandomPopulationInitializer),
+    ],
+)
+def test_multi_depot_solvers(solver_class, initializer_class):
+    locations, depots = generate_multi_depot_locations(20)
+    worker_depots = [None, None, depots[2]]
+
+    def solve(depots, worker_depots):
+        vrp_instance = VRP(
+            locations=locations,
+            num_salesmen=3,
+            depots=depots,
+            worker_depots=worker_depots,
+        )
+        solver = solver_class(
+            vrp_instance=vrp_instance,
+            population_size=5,
+            population_initializer_class=initializer_class,
+            fitness_function_class=FitnessFunctionMinimizeDistance,
+            seed=2023,
+        )
+        return vrp_instance, solver.run().get_topk(k=1)[0]
+
+    vrp_instance, best = solve(depots, worker_depots)
+    # Depots are not visited as customers
+    assert_valid_solution(best, vrp_instance)
+    route = best.chromosome[2]
+    assert vrp_instance.route_depot(route, 2) == depots[2]
+    # Every salesman serves the households around one depot
+    for salesman, route in enumerate(best.chromosome):
+        depot = vrp_instance.route_depot(route, salesman)
+        assert all(depot < customer <= depot + 20 for customer in route)
+    # Starting from the first depot only is much longer
+    _, single_depot = solve(depots, [depots[0]] * 3)
+    assert best.fitness > 2 * single_depot.fitness
+
+
+def test_kernel_backends_select_same_moves():
+    matrix, route = random_kernel_instance(80, seed=7)
+    compiled, fallback = kernels.get_kernels("numba"), kernels.get_kernels("numpy")
+    for depot in [0, int(route[5])]:
+        _route = route[route != depot]
+        for scan in ["two_opt_scan", "or_opt_scan"]:
+            expected = getattr(fallback, scan)(matrix, _route, depot)
+            result = getattr(compiled, scan)(matrix, _route, depot)
+            assert result[0] == pytest.approx(expected[0])
+            assert tuple(result[1:]) == tuple(expected[1:])
+        expected = fallback.relocate_scan(matrix, _route[:30], _route[30:], depot)
+        result = compiled.relocate_scan(matrix, _route[:30], _route[30:], depot)
+        assert result[0] == pytest.approx(expected[0])
+        assert tuple(result[1:]) == tuple(expected[1:])
+
+
+@pytest.mark.parametrize("or_opt", [False, True])
+def test_two_opt_solver_improves_routes(or_opt):
+    vrp_instance = VRP(locations=generate_locations(60), num_salesmen=3)
+    solver = TwoOptSolver(
+        vrp_instance=vrp_instance,
+        population_size=3,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        or_opt=or_opt,
+    )
+    initial = solver._initialization()
+    for individual in initial.individuals:
+        improved = solver.two_opt(individual)
+        assert_valid_solution(improved, vrp_instance)
+        for before, after in zip(individual.chromosome, improved.chromosome):
+            assert sorted(before) == sorted(after)
+            assert route_cost(vrp_instance, after) <= route_cost(
+                vrp_instance, before
+            ) + 1e-12
+        # No improving 2-opt move is left
+        for route in improved.chromosome:
+            matrix = vrp_instance.distances.submatrix([0] + route)
+            local_route = numpy.arange(1, len(route) + 1, dtype=numpy.int32)
+            delta, _, _ = kernels.get_kernels().two_opt_scan(matrix, local_route, 0)
+            assert delta >= -kernels.EPSILON
+
+
+def test_solver_progress_callbacks():
+    vrp_instance = VRP(locations=generate_locations(40), num_salesmen=2)
+    reports = []
+    trace = ConvergenceTrace()
+    solver = TwoOptSolver(
+        vrp_instance=vrp_instance,
+        population_size=3,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        callbacks=[reports.append, trace],
+        progress_interval=2,
+    )
+    best_solution = solver.run().get_topk(k=1)[0]
+
+    iterations = [report.iteration for report in reports]
+    # Every second iteration is reported, along with the final state
+    assert iterations[0] == 0
+    assert all(iteration % 2 == 0 for iteration in iterations[:-1])
+    assert iterations[-1] == solver.iteration
+    assert numpy.all(numpy.diff(iterations) >= 0)
+    assert reports[-1].best_fitness == pytest.approx(best_solution.fitness)
+    assert reports[-1].evaluations == solver.evaluations
+    assert numpy.all(numpy.diff([report.elapsed for report in reports]) >= 0.0)
+
+    array = trace.to_array()
+    assert array.dtype == TRACE_DTYPE
+    assert len(array) == len(reports)
+    numpy.testing.assert_array_equal(array["iteration"], iterations)
+    assert numpy.all(numpy.diff(array["best_fitness"]) >= 0.0)
+
+
+def test_convergence_trace_max_reports():
+    vrp_instance = VRP(locations=generate_locations(40), num_salesmen=2)
+    reports = []
+    trace = ConvergenceTrace(max_reports=4)
+    solver = TwoOptSolver(
+        vrp_instance=vrp_instance,
+        population_size=3,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        callbacks=[reports.append, trace],
+    )
+    solver.run()
+    assert len(reports) > 4
+
+    iterations = trace.to_array()["iteration"]
+    assert 0 < len(iterations) <= 4
+    # The trace is thinned out, but still spans the complete run
+    assert iterations[0] == 0
+    assert iterations[-1] == solver.iteration
+    assert set(iterations) <= {report.iteration for report in reports}
+    assert numpy.all(numpy.diff(trace.to_array()["best_fitness"]) >= 0.0)
+
+
+def test_decomposition_solver():
+    vrp_instance = VRP(
+        locations=generate_locations(300),
+        num_salesmen=3,
+        precompute_distances=False,
+    )
+    kwargs = dict(
+        vrp_instance=vrp_instance,
+        population_size=2,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        subproblem_size=40,
+        subproblem_solver_class=TwoOptSolver,
+        seed=2023,
+    )
+    best_solution = DecompositionSolver(**kwargs).run().get_topk(k=1)[0]
+    assert_valid_solution(best_solution, vrp_instance)
+    assert best_solution.fitness > 0.0
+
+    # Solving the sub-problems in parallel gives the same solution
+    parallel_solution = (
+        DecompositionSolver(**kwargs, n_jobs=2).run().get_topk(k=1)[0]
+    )
+    assert parallel_solution.chromosome == best_solution.chromosome
+
+    # Several depots are not supported
+    locations, depots = generate_multi_depot_locations(10)
+    kwargs["vrp_instance"] = VRP(locations=locations, num_salesmen=3, depots=depots)
+    with pytest.raises(ValueError):
+        DecompositionSolver(**kwargs)
+
+
+@pytest.mark.parametrize(
+    "initializer_class",
+    [
+        RandomPopulationInitializer,
+        KMeansRadomizedPopulationInitializer,
+        RandomizedSavingsPopulationInitializer,
+        RandomizedSweepPopulationInitializer,
+    ],
+)
+def test_solver_seed_reproducible(initializer_class):
+    vrp_instance = VRP(locations=generate_locations(40), num_salesmen=3)
+
+    def solve(seed):
+        solver = TwoOptSolver(
+            vrp_instance=vrp_instance,
+            population_size=3,
+            population_initializer_class=initializer_class,
+            fitness_function_class=FitnessFunctionMinimizeDistance,
+            seed=seed,
+        )
+        population = solver._initialization()
+        return [individual.chromosome for individual in population.individuals]
+
+    assert solve(7) == solve(7)
+    assert solve(7) != solve(8)
+
+
+@pytest.mark.parametrize(
+    "initializer_class,randomized",
+    [
+        (SavingsPopulationInitializer, False),
+        (RandomizedSavingsPopulationInitializer, True),
+        (SweepPopulationInitializer, False),
+        (RandomizedSweepPopulationInitializer, True),
+    ],
+)
+@pytest.mark.parametrize("distance_storage", ["dense", "sparse"])
+def test_constructive_initializers(initializer_class, randomized, distance_storage):
+    vrp_instance = VRP(
+        locations=generate_locations(200),
+        num_salesmen=4,
+        distance_storage=distance_storage,
+    )
+    fitness_function = FitnessFunctionMinimizeDistance(vrp_instance=vrp_instance)
+
+    def generate(cls):
+        return cls(
+            population_size=5,
+            vrp_instance=vrp_instance,
+            fitness_function_instance=fitness_function,
+            rng=numpy.random.default_rng(2023),
+        ).generate()
+
+    population = generate(initializer_class)
+    assert len(population) == 5
+    for individual in population.individuals:
+        assert_valid_solution(individual, vrp_instance)
+    chromosomes = {str(individual.chromosome) for individual in population.individuals}
+    assert (len(chromosomes) > 1) == randomized
+    # Much shorter routes than the ones 2-opt otherwise starts from
+    kmeans = generate(KMeansRadomizedPopulationInitializer)
+    assert min(ind.fitness for ind in population.individuals) > 2 * max(
+        ind.fitness for ind in kmeans.individuals
+    )
+
+
+def test_constructive_initializers_few_customers():
+    # More salesmen than customers: some routes stay empty
+    vrp_instance = VRP(locations=generate_locations(4), num_salesmen=5)
+    fitness_function = FitnessFunctionMinimizeDistance(vrp_instance=vrp_instance)
+    for initializer_class in [SavingsPopulationInitializer, SweepPopulationInitializer]:
+        population = initializer_class(
+            population_size=2,
+            vrp_instance=vrp_instance,
+            fitness_function_instance=fitness_function,
+        ).generate()
+        assert_valid_solution(population[0], vrp_instance)
+
+
+def test_multi_start_solver():
+    vrp_instance = VRP(locations=generate_locations(50), num_salesmen=3)
+    kwargs = dict(
+        vrp_instance=vrp_instance,
+        population_size=2,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        solver_class=TwoOptSolver,
+        num_starts=4,
+        seed=2023,
+    )
+    solver = MultiStartSolver(**kwargs)
+    population = solver.run()
+    assert len(population) == 4
+    best_solution = population.get_topk(k=1)[0]
+    assert_valid_solution(best_solution, vrp_instance)
+    assert best_solution.fitness == max(ind.fitness for ind in population.individuals)
+    assert solver.iteration == 4
+    assert solver.evaluations > 0
+
+    # The starts are independent
+    assert len({str(ind.chromosome) for ind in population.individuals}) > 1
+
+    # The same master seed gives the same result, whether or not the starts
+    # run in parallel processes
+    parallel = MultiStartSolver(**kwargs, n_jobs=2).run()
+    assert [ind.chromosome for ind in parallel.individuals] == [
+        ind.chromosome for ind in population.individuals
+    ]
+
+
+def test_genetic_solver():
+    vrp_instance = VRP(locations=generate_locations(30), num_salesmen=3)
+    solver = GeneticSolver(
+        vrp_instance=vrp_instance,
+        population_size=20,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        num_generations=30,
+        seed=2023,
+    )
+    initial_best = solver._initialization()[0].fitness
+    population = solver.run()
+    assert len(population) == 20
+    for individual in population.individuals:
+        assert_valid_solution(individual, vrp_instance)
+    # Elitism: the best solution never gets worse
+    assert population[0].fitness >= initial_best
+    assert solver.iteration == 30
+
+
+def test_route_cost_cache():
+    vrp_instance = VRP(locations=generate_locations(30), num_salesmen=3)
+    fitness_function = FitnessFunctionMinimizeDistance(vrp_instance=vrp_instance)
+    individual = Individual(
+        chromosome=[list(range(1, 10)), list(range(10, 20)), list(range(20, 30))],
+        generation=0,
+    )
+    fitness = fitness_function.evaluate(individual).fitness
+    assert fitness_function.route_evaluations == 3
+    # Evaluating again only sums the cached costs
+    assert fitness_function.evaluate(individual).fitness == fitness
+    assert fitness_function.route_evaluations == 3
+    # Changing a route in place and marking it dirty only recomputes it
+    route = individual.chromosome[1]
+    route[0], route[5] = route[5], route[0]
+    individual.mark_dirty(1)
+    assert individual.fitness is None
+    fitness_function.evaluate(individual)
+    assert fitness_function.route_evaluations == 4
+    assert individual.route_costs == pytest.approx(
+        [route_cost(vrp_instance, route, s) for s, route in enumerate(individual.chromosome)]
+    )
+    assert individual.fitness != fitness
+    # Replacing a route with a known cost does not recompute it
+    reversed_route = individual.chromosome[2][::-1]
+    individual.set_route(2, reversed_route, individual.route_costs[2])
+    assert individual.fitness is None
+    fitness_function.evaluate(individual)
+    assert fitness_function.route_evaluations == 4
+    assert individual.chromosome[2] is reversed_route
+
+
+def test_two_opt_keeps_routes_of_individual():
+    vrp_instance = VRP(locations=generate_locations(30), num_salesmen=3)
+    solver = TwoOptSolver(
+        vrp_instance=vrp_instance,
+        population_size=1,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        seed=2023,
+    )
+    individual = solver.fitness_function_instance.evaluate(
+        Individual(
+            chromosome=[list(range(1, 10)), list(range(10, 20)), list(range(20, 30))],
+            generation=0,
+        )
+    )
+    routes = [route.copy() for route in individual.chromosome]
+    costs = list(individual.route_costs)
+    improved = solver.two_opt(individual)
+    assert individual.chromosome == routes
+    assert individual.route_costs == costs
+    assert improved.route_costs == pytest.approx(
+        [route_cost(vrp_instance, route, s) for s, route in enumerate(improved.chromosome)]
+    )
+
+
+@pytest.mark.parametrize("solver_class", [TwoOptSolver, GeneticSolver, ALNSSolver])
+def test_solvers_reuse_route_costs(solver_class):
+    vrp_instance = VRP(locations=generate_locations(30), num_salesmen=3)
+    solver = solver_class(
+        vrp_instance=vrp_instance,
+        population_size=10,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        seed=2023,
+    )
+    population = solver.run()
+    fitness_function = solver.fitness_function_instance
+    for individual in population.individuals:
+        # The cached costs are those of the final routes
+        assert individual.route_costs == pytest.approx(
+            [
+                route_cost(vrp_instance, route, s)
+                for s, route in enumerate(individual.chromosome)
+            ]
+        )
+    if solver_class is GeneticSolver:
+        # Routes that offspring share with their parent are not evaluated again
+        assert fitness_function.route_evaluations < 3 * fitness_function.evaluations
+    else:
+        # The final routes were costed by the solver, only the initial
+        # population was evaluated route by route
+        assert fitness_function.route_evaluations == 3 * 10
+
+
+@pytest.mark.parametrize("topology", ["ring", "fully_connected", "random"])
+def test_migration_sources(topology):
+    rng = numpy.random.default_rng(0)
+    sources = migration_sources(topology, 5, rng)
+    assert len(sources) == 5
+    for island, island_sources in enumerate(sources):
+        assert island not in island_sources
+        assert all(0 <= source < 5 for source in island_sources)
+    if topology == "ring":
+        assert sources == [[4], [0], [1], [2], [3]]
+    with pytest.raises(ValueError):
+        migration_sources("star", 5, rng)
+
+
+def test_island_solver():
+    vrp_instance = VRP(locations=generate_locations(30), num_salesmen=3)
+    reports = []
+    kwargs = dict(
+        vrp_instance=vrp_instance,
+        population_size=10,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        num_islands=3,
+        num_generations=12,
+        migration_interval=5,
+        migration_rate=0.2,
+        topology="random",
+        seed=2023,
+    )
+    solver = IslandSolver(**kwargs, callbacks=[reports.append])
+    population = solver.run()
+    # The final populations of all islands are returned, fittest first
+    assert len(population) == 30
+    assert_valid_solution(population[0], vrp_instance)
+    assert population[0].fitness == max(ind.fitness for ind in population.individuals)
+    # Progress is reported after every migration epoch (5 + 5 + 2 generations)
+    assert [report.iteration for report in reports] == [5, 10, 12, 12]
+    assert solver.evaluations > 0
+
+    # Islands evolving in separate processes give the same result
+    parallel = IslandSolver(**kwargs, n_jobs=3).run()
+    assert [ind.chromosome for ind in parallel.individuals] == [
+        ind.chromosome for ind in population.individuals
+    ]
+
+
+def test_alns_solver():
+    vrp_instance = VRP(locations=generate_locations(40), num_salesmen=3)
+    reports = []
+    solver = ALNSSolver(
+        vrp_instance=vrp_instance,
+        population_size=5,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        num_iterations=200,
+        segment_length=50,
+        callbacks=[reports.append],
+        progress_interval=50,
+        seed=2023,
+    )
+    initial_best = solver._initialization().fitness
+    population = solver.run()
+    assert len(population) == 1
+    assert_valid_solution(population[0], vrp_instance)
+    assert all(
+        len(route) <= solver.max_route_size for route in population[0].chromosome
+    )
+    assert population[0].fitness > initial_best
+    assert solver.iteration == 200
+    assert [report.iteration for report in reports] == [0, 50, 100, 150, 200, 200]
+    # Operator weights adapted to the scores of each segment
+    assert not numpy.allclose(solver.destroy_weights, 1.0)
+
+
+def reference_greedy_insertion(vrp_instance, routes, customers, max_route_size):
+    # Recompute every insertion cost after every insertion
+    routes = [route.copy() for route in routes]
+    pending = list(customers)
+    while pending:
+        best = (numpy.inf, None, None, None)
+        for customer in pending:
+            for r, route in enumerate(routes):
+                if len(route) >= max_route_size:
+                    continue
+                path = [0] + route + [0]
+                for e in range(len(path) - 1):
+                    cost = (
+                        vrp_instance.distance(path[e], customer)
+                        + vrp_instance.distance(customer, path[e + 1])
+                        - vrp_instance.distance(path[e], path[e + 1])
+                    )
+                    if cost < best[0]:
+                        best = (cost, customer, r, e)
+        _, customer, r, e = best
+        routes[r].insert(e, customer)
+        pending.remove(customer)
+    return routes
+
+
+def test_alns_cached_insertion_matches_reference():
+    vrp_instance = VRP(locations=generate_locations(30), num_salesmen=3)
+    solver = ALNSSolver(
+        vrp_instance=vrp_instance,
+        population_size=1,
+        population_initializer_class=RandomPopulationInitializer,
+        fitness_function_class=FitnessFunctionMinimizeDistance,
+        max_route_size=12,
+        seed=2023,
+    )
+    routes = [list(route) for route in solver._initialization().chromosome]
+    costs = [route_cost(vrp_instance, route) for route in routes]
+    removed = solver._random_removal(routes, costs, 10)
+    expected = reference_greedy_insertion(vrp_instance, routes, removed, 12)
+    solver._greedy_insertion(routes, costs, removed)
+    assert routes == expected
+    # The route costs are updated incrementally with the insertion costs
+    assert costs == pytest.approx([route_cost(vrp_instance, r) for r in routes])
+
+    for destroy in solver.destroy_operators:
+        for repair in solver.repair_operators:
+            removed = destroy(routes, costs, 8)
+            assert len(set(removed)) == 8
+            repair(routes, costs, removed)
+            assert sorted(c for route in routes for c in route) == list(range(1, 30))
+            assert all(len(route) <= 12 for route in routes)
+            assert costs == pytest.approx(
+                [route_cost(vrp_instance, r) for r in routes]
+            )
+
+
+@pytest.mark.parametrize("solver", ["multi_start", "decomposition"])
+def test_solver_benchmark_counts_all_evaluations(solver):
+    # Parallel solvers evaluate in worker processes (and the decomposition in
+    # sub-problem solvers), which have to be accounted for as well
+    result = run_case(
+        {
+            "solver": solver,
+            "initializer": "random",
+            "num_locations": 30,
+            "num_salesmen": 2,
+            "seed": 2023,
+            "population_size": 5,
+        }
+    )
+    assert result["status"] == "ok"
+    assert result["evaluations"] > 5
+    assert result["evaluations_per_second"] > 0.0
+    assert len(result["trace"]) > 0
+    assert result["trace"][-1][1] == pytest.approx(result["best_cost"])